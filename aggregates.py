@@ -0,0 +1,115 @@
+"""
+Per-category rollups of a project snapshot
+Row counts and the counts behind the strategic metrics cards are kept per
+category, so a card or the category pie reads a precomputed number instead of
+counting rows; a streamed update adjusts them by the rows that changed
+"""
+from typing import Dict, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# (column, op, threshold) conditions counted for the strategic metrics cards
+AGGREGATED_CONDITIONS = [
+    ('token_velocity', '>', 0.1),
+    ('revenue_per_user', '>', 1.0),
+    ('token_velocity', '>', 0.05),
+    ('percent_change_7d', '>', 0),
+]
+
+
+class CategoryAggregates:
+    """
+    Rows per category, and rows per category matching each tracked condition
+
+    Built once per snapshot from the condition masks; derive() carries the
+    counts over to a new version of the snapshot, adjusting them only by the
+    rows whose condition result flipped.
+    """
+
+    def __init__(self, categories: pd.Series,
+                 masks: Dict[Hashable, np.ndarray]):
+        codes, uniques = pd.factorize(categories)
+        self.categories = [str(c) for c in uniques]
+        self._codes = codes
+        self._positions = {c: i for i, c in enumerate(self.categories)}
+        self._masks = dict(masks)
+        self._rows = self._bincount(np.ones(len(codes), dtype=bool))
+        self._hits = {key: self._bincount(mask) for key, mask in masks.items()}
+        self._totals = {key: int(hits.sum()) for key, hits in self._hits.items()}
+        # category_counts() results; row counts never change within a snapshot
+        self._category_counts: Dict[str, pd.Series] = {}
+
+    def _bincount(self, mask: np.ndarray) -> np.ndarray:
+        # Rows without a category (code -1) count towards no category
+        codes = self._codes[mask]
+        return np.bincount(codes[codes >= 0], minlength=len(self.categories))
+
+    @property
+    def conditions(self) -> Iterable[Hashable]:
+        return self._hits.keys()
+
+    def derive(self, masks: Dict[Hashable, np.ndarray]) -> 'CategoryAggregates':
+        """
+        Aggregates for a new version of the snapshot with the same categories,
+        where the given condition masks changed
+        """
+        aggregates = CategoryAggregates.__new__(CategoryAggregates)
+        aggregates.categories = self.categories
+        aggregates._codes = self._codes
+        aggregates._positions = self._positions
+        aggregates._rows = self._rows
+        aggregates._category_counts = self._category_counts
+        aggregates._masks = {**self._masks, **masks}
+        aggregates._hits = dict(self._hits)
+        aggregates._totals = dict(self._totals)
+        for key, mask in masks.items():
+            previous = self._masks[key]
+            flipped = mask != previous
+            if not flipped.any():
+                continue
+            hits = (self._hits[key] + self._bincount(flipped & mask) -
+                    self._bincount(flipped & previous))
+            aggregates._hits[key] = hits
+            aggregates._totals[key] = int(hits.sum())
+        return aggregates
+
+    def rows(self, category: str = "All") -> int:
+        """Rows in category, or in the whole snapshot for "All" """
+        if category == "All":
+            return len(self._codes)
+        position = self._positions.get(category)
+        return 0 if position is None else int(self._rows[position])
+
+    def count(self, key: Hashable, category: str = "All") -> Optional[int]:
+        """
+        Rows in category matching a tracked condition; None if it is not tracked
+        """
+        hits = self._hits.get(key)
+        if hits is None:
+            return None
+        if category == "All":
+            return self._totals[key]
+        position = self._positions.get(category)
+        return 0 if position is None else int(hits[position])
+
+    def category_counts(self, category: str = "All") -> pd.Series:
+        """
+        Rows per category, largest first, like value_counts('category')
+
+        The Series is shared between callers and must not be modified.
+        """
+        counts = self._category_counts.get(category)
+        if counts is not None:
+            return counts
+        if category == "All":
+            names, counts = self.categories, self._rows
+        else:
+            names, counts = [category], [self.rows(category)]
+        counts = pd.Series(counts,
+                           index=pd.Index(names, name='category'),
+                           name='count',
+                           dtype=np.int64)
+        counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+        self._category_counts[category] = counts
+        return counts
@@ -0,0 +1,338 @@
+"""
+Threshold alert rules over snapshot metrics
+Rules are indexed by (metric, symbol) and sorted by threshold, so each new snapshot
+only touches the rules whose bounds a token's value actually crossed since the
+previous snapshot; fired alerts go to pluggable local sinks
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from clock import SYSTEM_CLOCK, Clock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.getenv("ALERT_RULES_PATH", "alert_rules.json")
+DEFAULT_ALERT_LOG_PATH = os.getenv("ALERT_LOG_PATH", "alerts.jsonl")
+
+ALERT_METRICS = [
+    'percent_change_1h', 'percent_change_24h', 'percent_change_7d',
+    'token_velocity', 'volume_24h', 'market_cap', 'price',
+    'revenue_per_user', 'mcap_dau_ratio', 'utility_score'
+]
+
+ALERT_OPERATORS = ('>', '>=', '<', '<=')
+
+# Rules without a symbol apply to every token
+ANY_SYMBOL = '*'
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """Fires when metric moves from not satisfying `op threshold` to satisfying it"""
+    rule_id: str
+    metric: str
+    op: str
+    threshold: float
+    symbol: str = ANY_SYMBOL
+    name: str = ''
+
+    def __post_init__(self):
+        if self.op not in ALERT_OPERATORS:
+            raise ValueError(f"Unsupported alert operator: {self.op!r}")
+
+    @property
+    def description(self) -> str:
+        target = 'any token' if self.symbol == ANY_SYMBOL else self.symbol
+        return self.name or f"{target}: {self.metric} {self.op} {self.threshold:g}"
+
+
+@dataclass
+class Alert:
+    """One rule crossing for one token"""
+    rule_id: str
+    description: str
+    symbol: str
+    metric: str
+    op: str
+    threshold: float
+    previous: float
+    value: float
+    fired_at: datetime = field(default_factory=SYSTEM_CLOCK.now)
+
+    def to_dict(self) -> Dict:
+        record = asdict(self)
+        record['fired_at'] = self.fired_at.isoformat()
+        return record
+
+
+def load_rules(path: str = DEFAULT_RULES_PATH) -> List[AlertRule]:
+    """
+    Read rules from a JSON list of {rule_id, metric, op, threshold, symbol?, name?}
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [
+            AlertRule(**{
+                **entry, 'threshold': float(entry['threshold'])
+            }) for entry in json.load(f)
+        ]
+
+
+def save_rules(rules: Iterable[AlertRule], path: str = DEFAULT_RULES_PATH):
+    partial = f"{path}.partial"
+    with open(partial, 'w') as f:
+        json.dump([asdict(rule) for rule in rules], f, indent=2)
+    os.replace(partial, path)
+
+
+class _ThresholdIndex:
+    """
+    Rules for one (metric, symbol) key, grouped by operator and sorted by threshold
+    """
+
+    def __init__(self):
+        self.rules: Dict[str, List[AlertRule]] = {op: [] for op in ALERT_OPERATORS}
+        self.thresholds: Dict[str, np.ndarray] = {}
+
+    def add(self, rule: AlertRule):
+        self.rules[rule.op].append(rule)
+        self.thresholds.clear()
+
+    def remove(self, rule: AlertRule):
+        self.rules[rule.op].remove(rule)
+        self.thresholds.clear()
+
+    def __len__(self) -> int:
+        return sum(len(rules) for rules in self.rules.values())
+
+    def build(self):
+        if self.thresholds:
+            return
+        for op, rules in self.rules.items():
+            rules.sort(key=lambda rule: rule.threshold)
+            self.thresholds[op] = np.array([rule.threshold for rule in rules],
+                                           dtype=np.float64)
+
+    def crossed_ranges(self, old: np.ndarray,
+                       new: np.ndarray) -> Iterable[Tuple[str, np.ndarray, np.ndarray]]:
+        """
+        Yield (op, lo, hi): the rules[op][lo[i]:hi[i]] crossed by token i
+
+        '>' t fires for old <= t < new and '>=' t for old < t <= new;
+        '<' t fires for new < t <= old and '<=' t for new <= t < old.
+        """
+        self.build()
+        for op, thresholds in self.thresholds.items():
+            if not len(thresholds):
+                continue
+            if op == '>':
+                lo = np.searchsorted(thresholds, old, 'left')
+                hi = np.searchsorted(thresholds, new, 'left')
+            elif op == '>=':
+                lo = np.searchsorted(thresholds, old, 'right')
+                hi = np.searchsorted(thresholds, new, 'right')
+            elif op == '<':
+                lo = np.searchsorted(thresholds, new, 'right')
+                hi = np.searchsorted(thresholds, old, 'right')
+            else:
+                lo = np.searchsorted(thresholds, new, 'left')
+                hi = np.searchsorted(thresholds, old, 'left')
+            yield op, lo, hi
+
+
+class AlertEngine:
+    """
+    Evaluates rule crossings between consecutive snapshots
+
+    Tokens whose value did not move past any threshold cost one binary search
+    per operator group; rules are only visited when they fire.
+    """
+
+    def __init__(self,
+                 rules: Iterable[AlertRule] = (),
+                 sinks=(),
+                 clock: Clock = SYSTEM_CLOCK):
+        self.sinks = list(sinks)
+        self.clock = clock
+        # metric -> symbol (or ANY_SYMBOL) -> rules sorted by threshold
+        self._indexes: Dict[str, Dict[str, _ThresholdIndex]] = {}
+        self._rules: Dict[str, AlertRule] = {}
+        self._previous: Dict[str, pd.Series] = {}
+        self._lock = threading.Lock()
+        for rule in rules:
+            self.add_rule(rule)
+
+    @property
+    def rules(self) -> List[AlertRule]:
+        return list(self._rules.values())
+
+    def add_rule(self, rule: AlertRule):
+        with self._lock:
+            if rule.rule_id in self._rules:
+                self._remove(self._rules[rule.rule_id])
+            self._rules[rule.rule_id] = rule
+            by_symbol = self._indexes.setdefault(rule.metric, {})
+            by_symbol.setdefault(rule.symbol, _ThresholdIndex()).add(rule)
+
+    def remove_rule(self, rule_id: str):
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is not None:
+                self._remove(rule)
+
+    def _remove(self, rule: AlertRule):
+        by_symbol = self._indexes[rule.metric]
+        index = by_symbol[rule.symbol]
+        index.remove(rule)
+        if not len(index):
+            del by_symbol[rule.symbol]
+        if not by_symbol:
+            del self._indexes[rule.metric]
+
+    def evaluate(self, frame: pd.DataFrame) -> List[Alert]:
+        """
+        Return alerts for rules crossed since the previously evaluated frame
+
+        The first frame only sets the baseline. Baselines are kept for every
+        alert metric, so rules added later can fire on the next frame. Tokens
+        missing from either frame, or with a missing value, never fire.
+        """
+        alerts = []
+        symbols = frame['symbol'].to_numpy()
+        with self._lock:
+            metrics = set(ALERT_METRICS) | set(self._indexes)
+            for metric in metrics:
+                if metric not in frame.columns:
+                    continue
+                current = pd.Series(frame[metric].to_numpy(dtype=np.float64,
+                                                           na_value=np.nan),
+                                    index=symbols)
+                current = current[~current.index.duplicated()]
+                previous = self._previous.get(metric)
+                self._previous[metric] = current
+                if previous is None or metric not in self._indexes:
+                    continue
+                alerts.extend(self._crossings(metric, previous, current))
+        return alerts
+
+    def _crossings(self, metric: str, previous: pd.Series,
+                   current: pd.Series) -> List[Alert]:
+        old_all = previous.reindex(current.index).to_numpy()
+        new_all = current.to_numpy()
+        moved = ~(np.isnan(old_all) | np.isnan(new_all)) & (old_all != new_all)
+        symbols = current.index.to_numpy()[moved]
+        old_all, new_all = old_all[moved], new_all[moved]
+        if not len(symbols):
+            return []
+        positions = {symbol: i for i, symbol in enumerate(symbols)}
+
+        alerts = []
+        fired_at = self.clock.now()
+        for symbol, index in self._indexes[metric].items():
+            if symbol == ANY_SYMBOL:
+                token_symbols, old, new = symbols, old_all, new_all
+            else:
+                position = positions.get(symbol)
+                if position is None:
+                    continue
+                token_symbols = symbols[position:position + 1]
+                old = old_all[position:position + 1]
+                new = new_all[position:position + 1]
+
+            for op, lo, hi in index.crossed_ranges(old, new):
+                for i in np.nonzero(hi > lo)[0]:
+                    for rule in index.rules[op][lo[i]:hi[i]]:
+                        alerts.append(
+                            Alert(rule_id=rule.rule_id,
+                                  description=rule.description,
+                                  symbol=str(token_symbols[i]),
+                                  metric=metric,
+                                  op=op,
+                                  threshold=rule.threshold,
+                                  previous=float(old[i]),
+                                  value=float(new[i]),
+                                  fired_at=fired_at))
+        return alerts
+
+    def on_snapshot(self, snapshot):
+        """
+        SnapshotStore subscriber: evaluate the new snapshot and emit any alerts
+        """
+        alerts = self.evaluate(snapshot.frame)
+        if not alerts:
+            return
+        for sink in self.sinks:
+            try:
+                sink.emit(alerts)
+            except Exception:
+                logger.exception(f"Alert sink {type(sink).__name__} failed")
+
+
+class MemorySink:
+    """Keeps the most recent alerts for the in-app panel"""
+
+    def __init__(self, capacity: int = 200):
+        self._alerts: Deque[Alert] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def emit(self, alerts: List[Alert]):
+        with self._lock:
+            self._alerts.extend(alerts)
+
+    def recent(self, n: int = 20) -> List[Alert]:
+        """
+        The n most recent alerts, newest first
+        """
+        with self._lock:
+            return list(self._alerts)[-n:][::-1]
+
+
+class JsonLinesSink:
+    """Appends alerts to a file, one JSON object per line"""
+
+    def __init__(self, path: str = DEFAULT_ALERT_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, alerts: List[Alert]):
+        with self._lock, open(self.path, 'a') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert.to_dict()) + '\n')
+
+
+class WebhookSink:
+    """POSTs each batch of alerts as JSON to a (local) webhook URL"""
+
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+
+    def emit(self, alerts: List[Alert]):
+        import requests
+
+        response = requests.post(
+            self.url,
+            json={'alerts': [alert.to_dict() for alert in alerts]},
+            timeout=self.timeout)
+        response.raise_for_status()
+
+
+def default_sinks(webhook_url: Optional[str] = None) -> list:
+    """
+    Memory and file sinks, plus a webhook sink if ALERT_WEBHOOK_URL is set
+    """
+    sinks = [MemorySink(), JsonLinesSink()]
+    webhook_url = webhook_url or os.getenv("ALERT_WEBHOOK_URL")
+    if webhook_url:
+        sinks.append(WebhookSink(webhook_url))
+    return sinks
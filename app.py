@@ -1,17 +1,28 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
-from datetime import datetime, timedelta
 import time
+import uuid
 
+from alerts import (ALERT_METRICS, ALERT_OPERATORS, ANY_SYMBOL, AlertEngine,
+                    AlertRule, MemorySink, default_sinks, load_rules,
+                    save_rules)
+from charts import TAB_BUILDERS, build_price_history_figure
+from currency import BASE_CURRENCY_CODE, CURRENCY_SYMBOLS, FxTable
 from data_fetcher import DataFetcher
+from instrumentation import counted_cache, tracer
+from news_store import DEFAULT_STORE_PATH, NewsPrefetcher, NewsStore
+from news_tagger import ProjectTagger
+from pipeline import run_pipeline
+from price_history import HISTORY_RANGES, PriceHistory, history_available
 from project_data import get_web3_projects
-from utils import (format_number, calculate_metrics, get_color_palette,
-                   calculate_token_velocity, calculate_burn_rate_estimate,
-                   calculate_market_cap_to_dau_ratio)
+from replay import DEFAULT_REPLAY_PATH, REPLAY_SPEEDS, ReplayFetcher
+from schema import deep_size, format_bytes, memory_report
+from snapshot import DEFAULT_PERSIST_PATH, SnapshotStore
+from streaming import DEFAULT_STREAM_SOURCE, StreamIngestor, open_source
+from table import DISPLAY_COLUMNS, format_display_frame, get_table_page
+
+# Time spent in this rerun, reported in the diagnostics panel
+rerun_started = time.perf_counter()
 
 # Page configuration
 st.set_page_config(page_title="Web3 Revenue Dashboard",
@@ -20,13 +31,44 @@ st.set_page_config(page_title="Web3 Revenue Dashboard",
                    initial_sidebar_state="expanded")
 
 
-# Initialize data fetcher
+# Initialize data fetcher; with REPLAY_PATH set, a recording stands in for
+# the upstream APIs (see replay.py)
 @st.cache_resource
 def init_data_fetcher():
+    if DEFAULT_REPLAY_PATH:
+        return ReplayFetcher.from_file(DEFAULT_REPLAY_PATH)
     return DataFetcher()
 
 
 data_fetcher = init_data_fetcher()
+replaying = isinstance(data_fetcher, ReplayFetcher)
+# Everything that stamps or ages data follows the fetcher's (replay) clock
+clock = data_fetcher.clock
+
+
+# News store filled by a background prefetch thread, one per process
+@st.cache_resource
+def init_news_store():
+    # Articles are tagged with the projects they mention as they are ingested
+    store = NewsStore(":memory:" if replaying else DEFAULT_STORE_PATH,
+                      tagger=ProjectTagger(get_web3_projects()),
+                      clock=clock)
+    NewsPrefetcher(data_fetcher, store, interval=900).start()
+    return store
+
+
+news_store = init_news_store()
+
+
+# FX cross rates, refreshed hourly in the background, one table per process
+@st.cache_resource
+def init_fx_table():
+    fx_table = FxTable(data_fetcher, ttl=3600)
+    fx_table.refresh()
+    return fx_table
+
+
+fx_table = init_fx_table()
 
 # Main title
 st.title("🚀 Web3 Revenue & Metrics Dashboard")
@@ -37,7 +79,7 @@ st.sidebar.header("🔧 Dashboard Controls")
 
 
 # Category filter with counts
-@st.cache_data(ttl=300)
+@counted_cache("get_category_counts", st.cache_data(ttl=300))
 def get_category_counts():
     projects = get_web3_projects()
     web3_count = len([p for p in projects if p['category'] == 'Web3'])
@@ -61,10 +103,38 @@ elif "Web3" in category_filter and "Gaming" not in category_filter:
 else:
     category_filter = "All"
 
+# Display currency: converted from the USD snapshot, no extra quote requests
+available_currencies = list(fx_table.rates())
+currency_code = st.sidebar.selectbox(
+    "Display currency",
+    available_currencies,
+    index=available_currencies.index(BASE_CURRENCY_CODE),
+    format_func=lambda code: f"{code} ({CURRENCY_SYMBOLS.get(code, code)})",
+    help="Prices, market caps and volumes are converted from USD with "
+    "cached exchange rates; more currencies appear once rates are loaded")
+display_currency = fx_table.currency(currency_code)
+
 # Refresh data button
-if st.sidebar.button("🔄 Refresh Data", type="primary"):
-    st.cache_data.clear()
-    st.rerun()
+refresh_requested = st.sidebar.button("🔄 Refresh Data", type="primary")
+
+# Replay controls: the clock is shared, so a change applies to every viewer
+if replaying:
+    st.sidebar.subheader("Replay")
+    speeds = sorted(set(REPLAY_SPEEDS) | {clock.speed})
+    st.sidebar.select_slider(
+        "Replay speed",
+        speeds,
+        value=clock.speed,
+        format_func=lambda s: "Step" if s <= 0 else f"{s:g}×",
+        key="replay_speed",
+        on_change=lambda: clock.set_speed(st.session_state.replay_speed),
+        help="Recorded seconds per second; at Step, each data refresh moves "
+        "to the next recorded quotes response")
+    quote_times = data_fetcher.recording.times['quotes']
+    st.sidebar.caption(
+        f"Replay time {clock.now():%Y-%m-%d %H:%M:%S} · quotes "
+        f"{data_fetcher.served + 1} of {len(quote_times)}" +
+        (" · finished" if data_fetcher.finished else ""))
 
 # Auto-refresh controls
 st.sidebar.subheader("Auto-refresh Settings")
@@ -83,59 +153,388 @@ search_term = st.sidebar.text_input(
     placeholder="Type project name or symbol...",
     help="Search supports partial matches")
 
+# Lazy tab rendering: only the selected analytics view is computed
+lazy_tabs = st.sidebar.checkbox(
+    "Lazy tab rendering",
+    value=True,
+    help="Build and send only the selected analytics view; other views are "
+    "built on demand and cached")
+
+# Paginated table: sort and page server-side, send only the visible rows
+paginated_table = st.sidebar.checkbox(
+    "Paginated project table",
+    value=True,
+    help="Sort and page the Project Details table on the server and send "
+    "only the visible page")
+
+# Large-data charts: reduce dense scatters server-side before sending
+decimate_scatters = st.sidebar.checkbox(
+    "Decimate large scatter charts",
+    value=False,
+    help="Bin scatters with thousands of points into a representative "
+    "sample that keeps outliers; large charts always render with WebGL")
+
+# Diagnostics: timing spans, cache and upstream counters for this process
+show_diagnostics = st.sidebar.checkbox(
+    "Show diagnostics",
+    value=tracer.enabled,
+    help="Record timing spans and cache/upstream counters for this server "
+    "process and show them in the sidebar; tracing stays on for the process "
+    "once enabled")
+if show_diagnostics:
+    tracer.enabled = True
+
 
 # Load project data
-@st.cache_data(ttl=300)  # Cache for 5 minutes
 def load_project_data():
-    projects = get_web3_projects()
-    market_data = data_fetcher.get_market_data([p['symbol'] for p in projects])
-
-    # Combine project info with market data
-    combined_data = []
-    for project in projects:
-        symbol = project['symbol']
-        if symbol in market_data:
-            market_info = market_data[symbol]
-            project_data = {
-                **project,
-                **market_info, 'revenue_per_user':
-                calculate_metrics(market_info),
-                'token_velocity':
-                calculate_token_velocity(market_info.get('volume_24h', 0),
-                                         market_info.get('market_cap', 0)),
-                'burn_rate_estimate':
-                calculate_burn_rate_estimate(market_info),
-                'mcap_dau_ratio':
-                calculate_market_cap_to_dau_ratio(
-                    market_info.get('market_cap', 0),
-                    market_info.get('volume_24h', 0),
-                    market_info.get('price', 0))
-            }
-            combined_data.append(project_data)
-
-    return pd.DataFrame(combined_data)
+    return run_pipeline(data_fetcher, get_web3_projects())
 
 
-# Load data
-try:
-    with st.spinner("Loading project data..."):
-        df = load_project_data()
+# Alert rules from alert_rules.json, checked against every new snapshot
+@st.cache_resource
+def init_alert_engine():
+    # Replayed crossings stay in the dashboard, off the alert log and webhook
+    sinks = [MemorySink()] if replaying else default_sinks()
+    return AlertEngine(load_rules(), sinks, clock=clock)
 
-    if df.empty:
-        st.error("No data available. Please check API connectivity.")
-        st.stop()
 
-    # Apply filters
-    filtered_df = df.copy()
+alert_engine = init_alert_engine()
+
+
+@st.cache_resource
+def get_snapshot_store():
+    # One read-only snapshot per process, shared by reference across sessions
+    store = SnapshotStore(load_project_data,
+                          ttl=300,  # Refresh every 5 minutes
+                          persist_path=None if replaying else DEFAULT_PERSIST_PATH,
+                          clock=clock)
+    store.subscribe(alert_engine.on_snapshot)
+    return store
+
+
+# Backfilled price history (see `cli.py backfill`), cached per symbol
+@st.cache_resource
+def init_price_history():
+    return PriceHistory()
+
+
+price_history = init_price_history()
+
+TAB_NAMES = list(TAB_BUILDERS)
 
-    if category_filter != "All":
-        filtered_df = filtered_df[filtered_df['category'] == category_filter]
+# How often the live market sections rerun while prices are streamed
+LIVE_REFRESH_SECONDS = 1.0
 
-    if search_term:
-        filtered_df = filtered_df[filtered_df['name'].str.
-                                  contains(search_term, case=False, na=False)
-                                  | filtered_df['symbol'].str.
-                                  contains(search_term, case=False, na=False)]
+
+@counted_cache("build_tab_figures", st.cache_data(ttl=300, max_entries=64))
+def build_tab_figures(tab_name, snapshot_key, selection_key, _view,
+                      decimate=False, currency=None):
+    with tracer.span("charts.build", tab=tab_name):
+        return TAB_BUILDERS[tab_name](_view,
+                                      decimate=decimate,
+                                      currency=currency)
+
+
+def render_market_overview(figures):
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(figures['scatter'], use_container_width=True)
+    with col2:
+        st.plotly_chart(figures['pie'], use_container_width=True)
+
+
+def render_revenue_metrics(figures):
+    # Revenue Metrics Section
+    st.subheader("📊 Revenue & User Metrics")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(figures['revenue'], use_container_width=True)
+    with col2:
+        st.plotly_chart(figures['mcap_dau'], use_container_width=True)
+
+    # Burn Rate Analysis
+    col3, col4 = st.columns(2)
+    with col3:
+        if figures['burn'] is not None:
+            st.plotly_chart(figures['burn'], use_container_width=True)
+        else:
+            st.info("Burn rate data not available for current selection")
+    with col4:
+        st.plotly_chart(figures['heatmap'], use_container_width=True)
+
+
+def render_token_analysis(figures):
+    # Token Analysis Section
+    st.subheader("🔄 Token Velocity & Supply Analysis")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(figures['velocity'], use_container_width=True)
+    with col2:
+        st.plotly_chart(figures['supply'], use_container_width=True)
+
+    # Additional token metrics
+    col3, col4 = st.columns(2)
+    with col3:
+        if figures['supply_ratio'] is not None:
+            st.plotly_chart(figures['supply_ratio'], use_container_width=True)
+        else:
+            st.info("Supply data not available for current selection")
+    with col4:
+        st.plotly_chart(figures['velocity_scatter'], use_container_width=True)
+
+
+def render_performance(figures):
+    # Enhanced Performance heatmap
+    st.subheader("📊 Price Performance Analysis")
+
+    if figures['heatmap'] is not None:
+        st.plotly_chart(figures['heatmap'], use_container_width=True)
+    else:
+        st.info("Performance data not available for selected projects")
+
+
+TAB_RENDERERS = {
+    "Market Overview": render_market_overview,
+    "Revenue Metrics": render_revenue_metrics,
+    "Token Analysis": render_token_analysis,
+    "Performance": render_performance
+}
+
+
+def render_tab(tab_name, view):
+    with tracer.span("app.tab", tab=tab_name):
+        TAB_RENDERERS[tab_name](build_tab_figures(tab_name, view.index.key,
+                                                  view.key, view,
+                                                  decimate_scatters,
+                                                  display_currency))
+
+
+def render_price_history(view):
+    st.header("📉 Price History")
+
+    symbols = price_history.symbols()
+    in_view = set(view.frame_for(['symbol'])['symbol'])
+    # Tokens in the current selection first
+    symbols = sorted(symbols, key=lambda s: (s not in in_view, s))
+    symbol_col, range_col = st.columns([1, 2])
+    with symbol_col:
+        symbol = st.selectbox("Token", symbols, key="history_symbol")
+    with range_col:
+        # The range picks the resolution: raw ticks, then 1h, 1d or 1w bars
+        range_name = st.radio("Range",
+                              list(HISTORY_RANGES),
+                              index=list(HISTORY_RANGES).index('3M'),
+                              horizontal=True,
+                              key="history_range")
+
+    with tracer.span("charts.history", range=range_name):
+        window = price_history.window(symbol, HISTORY_RANGES[range_name])
+        if window.frame.empty:
+            st.info(f"No price history stored for {symbol}")
+            return
+        figure = build_price_history_figure(window, display_currency)
+    st.plotly_chart(figure, use_container_width=True)
+
+
+TABLE_COLUMN_LABELS = {
+    "name": "Project Name",
+    "symbol": "Symbol",
+    "category": "Category",
+    "price": "Price",
+    "market_cap": "Market Cap",
+    "volume_24h": "24h Volume",
+    "revenue_per_user": "Revenue/User",
+    "token_velocity": "Token Velocity",
+    "burn_rate_estimate": "Burn Rate %",
+    "mcap_dau_ratio": "Market Cap/DAU",
+    "percent_change_24h": "24h Change",
+    "circulating_supply": "Circulating Supply"
+}
+
+TABLE_COLUMN_CONFIG = {
+    "name":
+    st.column_config.TextColumn("Project Name", width="medium"),
+    "symbol":
+    st.column_config.TextColumn("Symbol", width="small"),
+    "category":
+    st.column_config.TextColumn("Category", width="small"),
+    "price":
+    st.column_config.NumberColumn("Price", format="$%.4f", width="small"),
+    "market_cap":
+    st.column_config.TextColumn("Market Cap", width="medium"),
+    "volume_24h":
+    st.column_config.TextColumn("24h Volume", width="medium"),
+    "revenue_per_user":
+    st.column_config.TextColumn("Revenue/User", width="small"),
+    "token_velocity":
+    st.column_config.TextColumn("Token Velocity", width="small"),
+    "burn_rate_estimate":
+    st.column_config.TextColumn("Burn Rate %", width="small"),
+    "mcap_dau_ratio":
+    st.column_config.TextColumn("Market Cap/DAU", width="medium"),
+    "percent_change_24h":
+    st.column_config.TextColumn("24h Change", width="small"),
+    "circulating_supply":
+    st.column_config.TextColumn("Circulating Supply", width="medium")
+}
+
+
+@counted_cache("load_table_page", st.cache_data(ttl=300, max_entries=256))
+def load_table_page(snapshot_key, selection_key, sort_by, descending, page,
+                    page_size, currency, _view):
+    return get_table_page(_view, sort_by, descending, page, page_size,
+                          currency)
+
+
+def render_diagnostics(snapshot, view):
+    with st.sidebar.expander("🩺 Diagnostics", expanded=True):
+        elapsed_ms = (time.perf_counter() - rerun_started) * 1000
+        st.caption(f"This rerun so far: {elapsed_ms:.0f} ms")
+
+        spans = tracer.span_summary()
+        if spans:
+            st.markdown("**Stage timings**")
+            st.dataframe(pd.DataFrame(spans).round(2), hide_index=True)
+        else:
+            st.caption("No spans recorded yet; rerun to collect timings.")
+
+        caches = tracer.cache_summary()
+        if caches:
+            st.markdown("**Cache hit rates**")
+            st.dataframe(pd.DataFrame(caches).round(2), hide_index=True)
+
+        breakers = [b.snapshot() for b in data_fetcher.breakers.values()]
+        if breakers:
+            st.markdown("**Upstream circuit breakers**")
+            st.dataframe(pd.DataFrame(breakers).round(1), hide_index=True)
+
+        # The snapshot is held once per process; a session adds its own state
+        # and selection on top, which bounds the viewers a replica can hold
+        report = memory_report(snapshot.frame)
+        session_bytes = (deep_size(dict(st.session_state)) + view.mask.nbytes +
+                         view.positions.nbytes)
+        st.markdown("**Memory**")
+        st.caption(f"Snapshot, shared: {format_bytes(report['bytes'].sum())} "
+                   f"data + {format_bytes(snapshot.index.nbytes)} indexes · "
+                   f"This session: {format_bytes(session_bytes)}")
+        st.dataframe(report.round(1), hide_index=True)
+
+        st.download_button("Export Prometheus text",
+                           tracer.to_prometheus(),
+                           file_name="dashboard_metrics.prom",
+                           mime="text/plain")
+        st.download_button("Export JSON lines",
+                           tracer.to_json_lines(),
+                           file_name="dashboard_traces.jsonl",
+                           mime="application/x-ndjson")
+
+
+def render_alerts_panel():
+    memory_sink = next(sink for sink in alert_engine.sinks
+                       if isinstance(sink, MemorySink))
+    with st.sidebar.expander(f"🔔 Alerts ({len(alert_engine.rules)} rules)"):
+        recent = memory_sink.recent(20)
+        if recent:
+            for alert in recent:
+                st.write(f"**{alert.symbol}** {alert.metric} "
+                         f"{alert.previous:,.4g} → {alert.value:,.4g} "
+                         f"({alert.description}) · {alert.fired_at:%H:%M}")
+        else:
+            st.caption("No alerts fired yet; rules are checked on each "
+                       "data refresh.")
+
+        with st.form("add_alert_rule", clear_on_submit=True):
+            metric = st.selectbox("Metric", ALERT_METRICS)
+            op = st.selectbox("Condition", ALERT_OPERATORS)
+            threshold = st.number_input("Threshold", value=5.0)
+            symbol = st.text_input("Symbol", placeholder="Any token")
+            if st.form_submit_button("Add rule"):
+                alert_engine.add_rule(
+                    AlertRule(rule_id=uuid.uuid4().hex[:12],
+                              metric=metric,
+                              op=op,
+                              threshold=float(threshold),
+                              symbol=symbol.strip().upper() or ANY_SYMBOL))
+                save_rules(alert_engine.rules)
+                st.success("Rule added")
+
+
+def format_age(seconds):
+    if seconds < 60:
+        return "just now"
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes} min ago"
+    return f"{minutes // 60} h {minutes % 60} min ago"
+
+
+def render_news_feed():
+    # News feed section
+    st.header("📰 Web3 News Feed")
+
+    project_names = {
+        p['symbol']: f"{p['name']} ({p['symbol']})"
+        for p in get_web3_projects()
+    }
+    news_project = st.selectbox(
+        "Filter news by project", [None] + list(project_names),
+        format_func=lambda s: "All projects" if s is None else project_names[s])
+
+    try:
+        if news_project is None:
+            news_articles = news_store.latest(10)
+        else:
+            news_articles = news_store.latest_for_project(news_project, 10)
+
+        if news_articles:
+            for article in news_articles:  # Show top 10 news
+                with st.expander(f"📄 {article['title']}", expanded=False):
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.write(article['description'])
+                        if article.get('url'):
+                            st.link_button("Read Full Article", article['url'])
+                    with col2:
+                        st.write(
+                            f"**Source:** {', '.join(article['sources'])}")
+                        st.write(
+                            f"**Published:** {article.get('published_at', 'Unknown')}"
+                        )
+                        if article['projects']:
+                            st.write(
+                                f"**Projects:** {', '.join(article['projects'])}"
+                            )
+        else:
+            st.info("No recent news articles available yet. "
+                    "The news feed refreshes in the background.")
+
+    except Exception as e:
+        st.error(f"Error loading news: {str(e)}")
+
+
+def render_market_sections(category_filter, search_term):
+    # Reads the current snapshot itself: as a live fragment it reruns on its
+    # own and picks up each streamed version
+    snapshot = snapshot_store.current
+    freshness = (f"Market data as of {snapshot.created_at:%H:%M:%S} "
+                 f"({format_age(snapshot.age_seconds)})")
+    if snapshot.updated_at is not None:
+        freshness += f" · streamed prices as of {snapshot.updated_at:%H:%M:%S}"
+    if snapshot_store.refreshing:
+        freshness += " · refreshing in the background"
+    if snapshot.stale or snapshot_store.last_errors:
+        # One banner per failure, with the upstream errors behind it
+        details = "".join(f" {error.message}."
+                          for error in snapshot_store.last_errors)
+        st.warning(f"⚠️ Stale data: upstream is unavailable. {freshness}."
+                   f"{details}")
+    else:
+        st.caption(freshness)
+
+    # Apply filters as cached masks over the shared snapshot; no rows are copied
+    view = snapshot.index.view().category(category_filter).search(search_term)
 
     # Key metrics overview
     st.header("📈 Strategic Business Metrics")
@@ -143,24 +542,22 @@ try:
     col1, col2, col3, col4 = st.columns(4)
 
     # Calculate meaningful metrics
-    high_velocity_projects = len(
-        filtered_df[filtered_df['token_velocity'] > 0.1])
-    total_projects = len(filtered_df)
+    high_velocity_projects = view.count('token_velocity', '>', 0.1)
+    total_projects = len(view)
     velocity_adoption_rate = (high_velocity_projects / total_projects *
                               100) if total_projects > 0 else 0
 
-    profitable_projects = len(
-        filtered_df[filtered_df['revenue_per_user'] > 1.0])
+    profitable_projects = view.count('revenue_per_user', '>', 1.0)
     profitability_rate = (profitable_projects / total_projects *
                           100) if total_projects > 0 else 0
 
     # Market efficiency: Volume/Market Cap ratio
-    efficient_projects = len(filtered_df[filtered_df['token_velocity'] > 0.05])
+    efficient_projects = view.count('token_velocity', '>', 0.05)
     efficiency_rate = (efficient_projects / total_projects *
                        100) if total_projects > 0 else 0
 
     # Growth momentum: positive performers in last 7 days
-    growth_projects = len(filtered_df[filtered_df['percent_change_7d'] > 0])
+    growth_projects = view.count('percent_change_7d', '>', 0)
     growth_momentum = (growth_projects / total_projects *
                        100) if total_projects > 0 else 0
 
@@ -201,8 +598,8 @@ try:
 
     with insight_col1:
         # Top performers by actual utility
-        top_utility = filtered_df.nlargest(
-            3, 'token_velocity')[['name', 'token_velocity']]
+        top_utility = view.nlargest(3,
+                                    'token_velocity')[['name', 'token_velocity']]
         st.subheader("🚀 Highest Utility Projects")
         for idx, row in top_utility.iterrows():
             st.write(
@@ -211,19 +608,17 @@ try:
 
     with insight_col2:
         # Most capital efficient
-        capital_efficient = filtered_df[
-            filtered_df['revenue_per_user'] > 0].nlargest(
-                3, 'revenue_per_user')[['name', 'revenue_per_user']]
+        capital_efficient = view.nlargest(
+            3, 'revenue_per_user', above=0)[['name', 'revenue_per_user']]
         st.subheader("💡 Most Capital Efficient")
         for idx, row in capital_efficient.iterrows():
-            st.write(f"**{row['name']}**: ${row['revenue_per_user']:.2f}/user")
+            revenue = display_currency.convert(row['revenue_per_user'])
+            st.write(f"**{row['name']}**: {display_currency.format(revenue)}/user")
 
     with insight_col3:
         # Undervalued opportunities (high utility, lower market cap)
-        filtered_df['utility_score'] = filtered_df['token_velocity'] / (
-            filtered_df['market_cap'] / 1e9)  # Utility per $1B market cap
-        undervalued = filtered_df[filtered_df['utility_score'] > 0].nlargest(
-            3, 'utility_score')[['name', 'utility_score']]
+        undervalued = view.nlargest(3, 'utility_score',
+                                    above=0)[['name', 'utility_score']]
         st.subheader("💎 Potential Value Plays")
         for idx, row in undervalued.iterrows():
             st.write(
@@ -236,454 +631,135 @@ try:
     st.header("📊 Interactive Analytics")
 
     # Create tabs for different views
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "Market Overview", "Revenue Metrics", "Token Analysis", "Performance"
-    ])
-
-    with tab1:
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # Market cap vs volume scatter plot with enhanced tooltips
-            fig_scatter = px.scatter(
-                filtered_df,
-                x="market_cap",
-                y="volume_24h",
-                size="circulating_supply",
-                color="category",
-                hover_name="name",
-                hover_data={
-                    "market_cap": ":$,.0f",
-                    "volume_24h": ":$,.0f",
-                    "price": ":$.4f",
-                    "revenue_per_user": ":$.2f",
-                    "token_velocity": ":.4f",
-                    "circulating_supply": ":,.0f"
-                },
-                title="Market Cap vs 24h Volume (Log-Log Scale)",
-                labels={
-                    "market_cap": "Market Cap ($) - Log Scale",
-                    "volume_24h": "24h Volume ($) - Log Scale",
-                    "circulating_supply": "Bubble Size: Circulating Supply"
-                },
-                color_discrete_map={
-                    "Web3": "#1f77b4",
-                    "Web3 Gaming": "#ff7f0e"
-                })
-            fig_scatter.update_layout(xaxis_type="log",
-                                      yaxis_type="log",
-                                      legend=dict(orientation="h",
-                                                  yanchor="bottom",
-                                                  y=1.02,
-                                                  xanchor="right",
-                                                  x=1))
-            # Add size legend annotation
-            fig_scatter.add_annotation(text="Bubble Size = Circulating Supply",
-                                       xref="paper",
-                                       yref="paper",
-                                       x=0.02,
-                                       y=0.98,
-                                       showarrow=False,
-                                       font=dict(size=10, color="gray"))
-            st.plotly_chart(fig_scatter, use_container_width=True)
-
-        with col2:
-            # Enhanced category distribution with counts
-            category_counts = filtered_df['category'].value_counts()
-            total_projects = len(filtered_df)
-
-            # Create labels with counts and percentages
-            labels_with_counts = [
-                f"{cat}: {count} projects ({count/total_projects*100:.1f}%)"
-                for cat, count in category_counts.items()
-            ]
-
-            fig_pie = px.pie(
-                values=category_counts.values,
-                names=labels_with_counts,
-                title="Projects by Category Distribution",
-                color_discrete_map={
-                    f"Web3: {category_counts.get('Web3', 0)} projects ({category_counts.get('Web3', 0)/total_projects*100:.1f}%)":
-                    "#1f77b4",
-                    f"Web3 Gaming: {category_counts.get('Web3 Gaming', 0)} projects ({category_counts.get('Web3 Gaming', 0)/total_projects*100:.1f}%)":
-                    "#ff7f0e"
-                })
-            fig_pie.update_traces(textposition='inside',
-                                  textinfo='percent+label')
-            st.plotly_chart(fig_pie, use_container_width=True)
-
-    with tab2:
-        # Revenue Metrics Section
-        st.subheader("📊 Revenue & User Metrics")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # Revenue per user with improved formatting
-            revenue_data = filtered_df.nlargest(20, 'revenue_per_user')
-            fig_revenue = px.bar(
-                revenue_data,
-                x="name",
-                y="revenue_per_user",
-                color="category",
-                title="Revenue per User (Top 20 Projects)",
-                labels={"revenue_per_user": "Revenue per User ($)"},
-                color_discrete_map={
-                    "Web3": "#1f77b4",
-                    "Web3 Gaming": "#ff7f0e"
-                },
-                hover_data={
-                    "revenue_per_user": ":$.2f",
-                    "market_cap": ":$,.0f",
-                    "volume_24h": ":$,.0f"
-                })
-            fig_revenue.update_layout(xaxis_tickangle=-45,
-                                      xaxis_title="Project Name",
-                                      yaxis_title="Revenue per User ($)",
-                                      showlegend=True,
-                                      legend=dict(orientation="h",
-                                                  yanchor="bottom",
-                                                  y=1.02,
-                                                  xanchor="right",
-                                                  x=1))
-            st.plotly_chart(fig_revenue, use_container_width=True)
-
-        with col2:
-            # Market Cap to DAU Ratio with reference lines
-            mcap_dau_data = filtered_df[filtered_df['mcap_dau_ratio'] >
-                                        0].nlargest(20, 'mcap_dau_ratio')
-            fig_mcap_dau = px.scatter(
-                mcap_dau_data,
-                x="volume_24h",
-                y="mcap_dau_ratio",
-                size="market_cap",
-                color="category",
-                hover_name="name",
-                title="Market Cap/DAU Ratio - User Value Assessment",
-                labels={
-                    "volume_24h": "24h Volume ($) - Log Scale",
-                    "mcap_dau_ratio": "Market Cap per Daily Active User ($)"
-                },
-                color_discrete_map={
-                    "Web3": "#1f77b4",
-                    "Web3 Gaming": "#ff7f0e"
-                },
-                hover_data={
-                    "mcap_dau_ratio": ":$,.0f",
-                    "volume_24h": ":$,.0f",
-                    "market_cap": ":$,.0f"
-                })
-            fig_mcap_dau.update_layout(xaxis_type="log",
-                                       legend=dict(orientation="h",
-                                                   yanchor="bottom",
-                                                   y=1.02,
-                                                   xanchor="right",
-                                                   x=1))
-            # Add reference line at $1 per user
-            fig_mcap_dau.add_hline(y=1,
-                                   line_dash="dash",
-                                   line_color="red",
-                                   annotation_text="$1 per DAU baseline")
-            st.plotly_chart(fig_mcap_dau, use_container_width=True)
-
-        # Burn Rate Analysis
-        col3, col4 = st.columns(2)
-
-        with col3:
-            # Burn rate estimates
-            burn_data = filtered_df[filtered_df['burn_rate_estimate'] >
-                                    0].nlargest(15, 'burn_rate_estimate')
-            if not burn_data.empty:
-                fig_burn = px.bar(
-                    burn_data,
-                    x="name",
-                    y="burn_rate_estimate",
-                    color="category",
-                    title="Token Burn Rate Estimates (%)",
-                    labels={"burn_rate_estimate": "Estimated Burn Rate (%)"})
-                fig_burn.update_xaxes(tickangle=45)
-                st.plotly_chart(fig_burn, use_container_width=True)
-            else:
-                st.info("Burn rate data not available for current selection")
-
-        with col4:
-            # Revenue efficiency heatmap
-            top_projects = filtered_df.nlargest(15, 'revenue_per_user')
-            metrics_for_heatmap = top_projects[[
-                'name', 'revenue_per_user', 'token_velocity', 'mcap_dau_ratio'
-            ]]
-
-            fig_heatmap = px.imshow(metrics_for_heatmap.set_index('name').T,
-                                    title="Revenue Metrics Heatmap (Top 15)",
-                                    color_continuous_scale="Viridis",
-                                    aspect="auto")
-            fig_heatmap.update_xaxes(tickangle=45)
-            st.plotly_chart(fig_heatmap, use_container_width=True)
-
-    with tab3:
-        # Token Analysis Section
-        st.subheader("🔄 Token Velocity & Supply Analysis")
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            # Token velocity horizontal bar chart for better readability
-            velocity_data = filtered_df[filtered_df['token_velocity'] >
-                                        0].nlargest(15, 'token_velocity')
-            fig_velocity = px.bar(
-                velocity_data,
-                x="token_velocity",
-                y="name",
-                color="category",
-                orientation='h',
-                title="Token Velocity - How Many Times Token Turns Over in 24h",
-                labels={
-                    "token_velocity": "Token Velocity (Volume/Market Cap)",
-                    "name": "Project"
-                },
-                color_discrete_map={
-                    "Web3": "#1f77b4",
-                    "Web3 Gaming": "#ff7f0e"
-                },
-                hover_data={
-                    "token_velocity": ":.4f",
-                    "volume_24h": ":$,.0f",
-                    "market_cap": ":$,.0f"
-                })
-            fig_velocity.update_layout(
-                height=500,
-                yaxis={'categoryorder': 'total ascending'},
-                legend=dict(orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1))
-            # Add reference line at velocity = 1
-            fig_velocity.add_vline(x=1,
-                                   line_dash="dash",
-                                   line_color="gray",
-                                   annotation_text="High Velocity Threshold")
-            st.plotly_chart(fig_velocity, use_container_width=True)
-
-        with col2:
-            # Price vs circulating supply
-            fig_supply = px.scatter(filtered_df,
-                                    x="circulating_supply",
-                                    y="price",
-                                    color="category",
-                                    size="market_cap",
-                                    hover_name="name",
-                                    title="Price vs Circulating Supply",
-                                    labels={
-                                        "circulating_supply":
-                                        "Circulating Supply",
-                                        "price": "Price ($)"
-                                    })
-            fig_supply.update_layout(xaxis_type="log")
-            st.plotly_chart(fig_supply, use_container_width=True)
-
-        # Additional token metrics
-        col3, col4 = st.columns(2)
-
-        with col3:
-            # Supply utilization
-            supply_data = filtered_df[(filtered_df['total_supply'] > 0) & (
-                filtered_df['circulating_supply'] > 0)].copy()
-
-            if not supply_data.empty:
-                supply_data['supply_ratio'] = supply_data[
-                    'circulating_supply'] / supply_data['total_supply']
-                supply_data = supply_data.nlargest(15, 'supply_ratio')
-
-                fig_supply_ratio = px.bar(
-                    supply_data,
-                    x="name",
-                    y="supply_ratio",
-                    color="category",
-                    title="Supply Utilization Ratio (Top 15)",
-                    labels={"supply_ratio": "Circulating/Total Supply Ratio"})
-                fig_supply_ratio.update_xaxes(tickangle=45)
-                st.plotly_chart(fig_supply_ratio, use_container_width=True)
-            else:
-                st.info("Supply data not available for current selection")
-
-        with col4:
-            # Token velocity vs Market Cap
-            velocity_vs_mcap = filtered_df[filtered_df['token_velocity'] > 0]
-            fig_velocity_scatter = px.scatter(
-                velocity_vs_mcap,
-                x="market_cap",
-                y="token_velocity",
-                color="category",
-                size="volume_24h",
-                hover_name="name",
-                title="Token Velocity vs Market Cap",
-                labels={
-                    "market_cap": "Market Cap ($)",
-                    "token_velocity": "Token Velocity"
-                })
-            fig_velocity_scatter.update_layout(xaxis_type="log")
-            st.plotly_chart(fig_velocity_scatter, use_container_width=True)
-
-    with tab4:
-        # Enhanced Performance heatmap
-        st.subheader("📊 Price Performance Analysis")
-
-        performance_cols = [
-            'percent_change_1h', 'percent_change_24h', 'percent_change_7d'
-        ]
-        if all(col in filtered_df.columns for col in performance_cols):
-            # Sort by 24h performance for better ordering
-            performance_data = filtered_df.nlargest(
-                20, 'percent_change_24h')[['name'] + performance_cols]
-
-            # Create heatmap matrix
-            heatmap_matrix = performance_data[performance_cols].T.values
-
-            fig_heatmap = px.imshow(
-                heatmap_matrix,
-                labels={
-                    'x': 'Projects (sorted by 24h performance)',
-                    'y': 'Time Period',
-                    'color': 'Price Change (%)'
-                },
-                x=performance_data['name'].tolist(),
-                y=['1 Hour', '24 Hours', '7 Days'],  # Logical time ordering
-                title=
-                "Price Performance Heatmap - Top 20 Projects by 24h Change",
-                color_continuous_scale="RdYlGn",
-                color_continuous_midpoint=0,
-                zmin=-10,
-                zmax=10  # Better scale for percentage changes
-            )
+    if lazy_tabs:
+        # Only the selected view is built and sent to the browser
+        active_tab = st.radio("Analytics view",
+                              TAB_NAMES,
+                              horizontal=True,
+                              label_visibility="collapsed",
+                              key="active_tab")
+        render_tab(active_tab, view)
+    else:
+        for tab, tab_name in zip(st.tabs(TAB_NAMES), TAB_NAMES):
+            with tab:
+                render_tab(tab_name, view)
+
+
+snapshot_store = get_snapshot_store()
+if refresh_requested and snapshot_store.current is not None:
+    # Rebuild in the background; cached figures and pages are keyed by
+    # snapshot, so nothing needs clearing and this rerun stays instant
+    snapshot_store.refresh()
+
+
+# Streamed prices (PRICE_STREAM), applied to the shared snapshot between refreshes
+@st.cache_resource
+def init_price_stream():
+    if not DEFAULT_STREAM_SOURCE:
+        return None
+    return StreamIngestor(open_source(DEFAULT_STREAM_SOURCE),
+                          snapshot_store).start()
 
-            fig_heatmap.update_layout(xaxis_tickangle=-45,
-                                      height=400,
-                                      font=dict(size=10))
-
-            # Add annotations for extreme values
-            for i, (idx, row) in enumerate(performance_data.iterrows()):
-                for j, col in enumerate(performance_cols):
-                    value = row[col]
-                    if abs(value) > 5:  # Highlight significant changes
-                        fig_heatmap.add_annotation(
-                            x=i,
-                            y=j,
-                            text=f"{value:.1f}%",
-                            showarrow=False,
-                            font=dict(
-                                color="white" if abs(value) > 7 else "black",
-                                size=8))
-
-            st.plotly_chart(fig_heatmap, use_container_width=True)
-        else:
-            st.info("Performance data not available for selected projects")
 
-    # Project table
-    st.header("📋 Project Details")
+try:
+    price_stream = init_price_stream()
+except (ValueError, OSError) as e:
+    price_stream = None
+    st.sidebar.warning(f"Price stream unavailable: {e}")
+live_prices = price_stream is not None and st.sidebar.checkbox(
+    "Live prices",
+    value=True,
+    help="Update metrics and the visible charts from the price stream every "
+    f"{LIVE_REFRESH_SECONDS:g} s without reloading the page")
 
-    # Prepare display columns with key metrics
-    display_columns = [
-        'name', 'symbol', 'category', 'price', 'market_cap', 'volume_24h',
-        'revenue_per_user', 'token_velocity', 'burn_rate_estimate',
-        'mcap_dau_ratio', 'percent_change_24h', 'circulating_supply'
-    ]
-
-    display_df = filtered_df[display_columns].copy()
-
-    # Format columns for display
-    display_df['price'] = display_df['price'].apply(
-        lambda x: f"${x:.4f}" if pd.notnull(x) else "N/A")
-    display_df['market_cap'] = display_df['market_cap'].apply(
-        lambda x: f"${format_number(float(x))}" if pd.notnull(x) else "N/A")
-    display_df['volume_24h'] = display_df['volume_24h'].apply(
-        lambda x: f"${format_number(float(x))}" if pd.notnull(x) else "N/A")
-    display_df['revenue_per_user'] = display_df['revenue_per_user'].apply(
-        lambda x: f"${x:.2f}" if pd.notnull(x) and x > 0 else "N/A")
-    display_df['token_velocity'] = display_df['token_velocity'].apply(
-        lambda x: f"{x:.4f}" if pd.notnull(x) and x > 0 else "N/A")
-    display_df['burn_rate_estimate'] = display_df['burn_rate_estimate'].apply(
-        lambda x: f"{x:.2f}%" if pd.notnull(x) and x > 0 else "N/A")
-    display_df['mcap_dau_ratio'] = display_df['mcap_dau_ratio'].apply(
-        lambda x: f"${format_number(float(x))}"
-        if pd.notnull(x) and x > 0 else "N/A")
-    display_df['percent_change_24h'] = display_df['percent_change_24h'].apply(
-        lambda x: f"{x:.2f}%" if pd.notnull(x) else "N/A")
-    display_df['circulating_supply'] = display_df['circulating_supply'].apply(
-        lambda x: format_number(float(x)) if pd.notnull(x) else "N/A")
-
-    st.dataframe(display_df,
-                 column_config={
-                     "name":
-                     st.column_config.TextColumn("Project Name",
-                                                 width="medium"),
-                     "symbol":
-                     st.column_config.TextColumn("Symbol", width="small"),
-                     "category":
-                     st.column_config.TextColumn("Category", width="small"),
-                     "price":
-                     st.column_config.NumberColumn("Price",
-                                                   format="$%.4f",
-                                                   width="small"),
-                     "market_cap":
-                     st.column_config.TextColumn("Market Cap", width="medium"),
-                     "volume_24h":
-                     st.column_config.TextColumn("24h Volume", width="medium"),
-                     "revenue_per_user":
-                     st.column_config.TextColumn("Revenue/User",
-                                                 width="small"),
-                     "token_velocity":
-                     st.column_config.TextColumn("Token Velocity",
-                                                 width="small"),
-                     "burn_rate_estimate":
-                     st.column_config.TextColumn("Burn Rate %", width="small"),
-                     "mcap_dau_ratio":
-                     st.column_config.TextColumn("Market Cap/DAU",
-                                                 width="medium"),
-                     "percent_change_24h":
-                     st.column_config.TextColumn("24h Change", width="small"),
-                     "circulating_supply":
-                     st.column_config.TextColumn("Circulating Supply",
-                                                 width="medium")
-                 },
-                 use_container_width=True,
-                 height=600,
-                 hide_index=True)
+# Load data
+try:
+    with st.spinner("Loading project data..."), tracer.span("app.load"):
+        snapshot = snapshot_store.get()
+
+    if snapshot is None:
+        # With a snapshot to show, the freshness banner reports the errors
+        for error in snapshot_store.last_errors:
+            st.error(error.message)
+        # Nothing fetched yet and no saved copy: keep the rest of the page up
+        st.error("No market data available yet. Please check API connectivity.")
+        render_news_feed()
+        st.stop()
 
-    # News feed section
-    st.header("📰 Web3 News Feed")
+    if live_prices:
+        # Metrics and the visible charts follow streamed prices every second
+        # without rerunning the rest of the page
+        st.fragment(render_market_sections,
+                    run_every=LIVE_REFRESH_SECONDS)(category_filter,
+                                                    search_term)
+    else:
+        render_market_sections(category_filter, search_term)
 
-    @st.cache_data(ttl=1800)  # Cache for 30 minutes
-    def load_news():
-        return data_fetcher.get_web3_news()
+    filter_index = snapshot.index
+    view = filter_index.view().category(category_filter).search(search_term)
 
-    try:
-        news_articles = load_news()
+    if history_available(price_history.path):
+        render_price_history(view)
 
-        if news_articles:
-            for article in news_articles[:10]:  # Show top 10 news
-                with st.expander(f"📄 {article['title']}", expanded=False):
-                    col1, col2 = st.columns([3, 1])
-                    with col1:
-                        st.write(article['description'])
-                        if article.get('url'):
-                            st.link_button("Read Full Article", article['url'])
-                    with col2:
-                        st.write(
-                            f"**Source:** {article.get('source', 'Unknown')}")
-                        st.write(
-                            f"**Published:** {article.get('published_at', 'Unknown')}"
-                        )
-        else:
-            st.info("No recent news articles available.")
+    # Project table
+    st.header("📋 Project Details")
 
-    except Exception as e:
-        st.error(f"Error loading news: {str(e)}")
+    if paginated_table:
+        # Sort, filter and slice server-side; only the visible page is sent
+        sort_col, order_col, size_col, page_col = st.columns([3, 2, 2, 2])
+        with sort_col:
+            sort_by = st.selectbox(
+                "Sort by",
+                DISPLAY_COLUMNS,
+                index=DISPLAY_COLUMNS.index('market_cap'),
+                format_func=lambda col: TABLE_COLUMN_LABELS[col])
+        with order_col:
+            sort_order = st.radio("Order", ["Descending", "Ascending"],
+                                  horizontal=True)
+        with size_col:
+            page_size = st.selectbox("Rows per page", [25, 50, 100], index=1)
+
+        total_rows = len(view)
+        page_count = max(1, -(-total_rows // page_size))
+        with page_col:
+            page = st.number_input("Page",
+                                   min_value=1,
+                                   max_value=page_count,
+                                   value=1,
+                                   step=1)
+
+        with tracer.span("app.table"):
+            display_df, total_rows = load_table_page(
+                filter_index.key, view.key, sort_by,
+                sort_order == "Descending", int(page), page_size,
+                display_currency, view)
+        st.dataframe(display_df,
+                     column_config=TABLE_COLUMN_CONFIG,
+                     use_container_width=True,
+                     hide_index=True)
+        st.caption(f"Page {int(page)} of {page_count} · {total_rows} projects")
+    else:
+        with tracer.span("app.table"):
+            display_df = format_display_frame(view.frame_for(DISPLAY_COLUMNS),
+                                              display_currency)
+        st.dataframe(display_df,
+                     column_config=TABLE_COLUMN_CONFIG,
+                     use_container_width=True,
+                     height=600,
+                     hide_index=True)
+
+    render_news_feed()
 
     # Footer with last update time
     st.markdown("---")
     st.caption(
-        f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+        f"Last updated: {clock.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
+
+    tracer.observe("rerun_duration_seconds",
+                   time.perf_counter() - rerun_started)
+    render_alerts_panel()
+    if show_diagnostics:
+        render_diagnostics(snapshot, view)
 
     # Auto-refresh functionality
     if auto_refresh:
@@ -0,0 +1,296 @@
+"""
+Parallel, resumable backfill of historical quotes
+The (symbol, time range) space is split into fixed-size work units that run on a
+thread pool within a credit budget; each finished unit is written as its own
+Parquet part and recorded in a checkpoint, so an interrupted run resumes where it
+stopped and the output directory reads back as one partitioned dataset
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from data_fetcher import HISTORICAL_INTERVALS, DataFetcher, FetchError
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = '_checkpoint.json'
+
+# CoinMarketCap bills historical quotes per 100 data points returned
+POINTS_PER_CREDIT = 100
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    """One symbol over one [start, end) window"""
+    symbol: str
+    start: datetime
+    end: datetime
+    interval: str
+
+    @property
+    def unit_id(self) -> str:
+        return f"{self.interval}/{self.symbol}/{self.start:%Y%m%dT%H%M}"
+
+    @property
+    def points(self) -> int:
+        return math.ceil((self.end - self.start) / HISTORICAL_INTERVALS[self.interval])
+
+    @property
+    def credits(self) -> int:
+        return max(1, math.ceil(self.points / POINTS_PER_CREDIT))
+
+    def part_path(self, output_dir: str) -> str:
+        # Hive-style partition, so readers get `symbol` back as a column
+        return os.path.join(output_dir, f"symbol={self.symbol}",
+                            f"{self.interval}-{self.start:%Y%m%dT%H%M}.parquet")
+
+
+def plan_units(symbols: Iterable[str],
+               start: datetime,
+               end: datetime,
+               interval: str = 'daily',
+               points_per_unit: int = 500) -> List[WorkUnit]:
+    """
+    Split symbols × [start, end) into windows of at most points_per_unit quotes
+
+    Window boundaries are aligned to start, so the same arguments always plan
+    the same units and a rerun finds its checkpointed work.
+    """
+    if interval not in HISTORICAL_INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval!r} "
+                         f"(expected one of {', '.join(HISTORICAL_INTERVALS)})")
+    if end <= start:
+        raise ValueError("Backfill end must be after its start")
+    span = HISTORICAL_INTERVALS[interval] * points_per_unit
+
+    units = []
+    for symbol in dict.fromkeys(symbols):
+        window_start = start
+        while window_start < end:
+            window_end = min(window_start + span, end)
+            units.append(WorkUnit(symbol, window_start, window_end, interval))
+            window_start = window_end
+    return units
+
+
+class CreditBudget:
+    """
+    Caps the credits a run may spend and paces calls to the plan's rate limit
+    """
+
+    def __init__(self,
+                 credits: Optional[int] = None,
+                 calls_per_minute: Optional[float] = None):
+        self.credits = credits
+        self.spent = 0
+        self.min_interval = 60 / calls_per_minute if calls_per_minute else 0.0
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> Optional[int]:
+        return None if self.credits is None else self.credits - self.spent
+
+    def reserve(self, credits: int) -> bool:
+        """
+        Set aside credits for a unit; False once the budget cannot cover it
+        """
+        with self._lock:
+            if self.credits is not None and self.spent + credits > self.credits:
+                return False
+            self.spent += credits
+            return True
+
+    def refund(self, credits: int):
+        with self._lock:
+            self.spent -= credits
+
+    def wait_for_call(self):
+        """
+        Block until the next upstream call fits the calls-per-minute limit
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_call)
+            self._next_call = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Checkpoint:
+    """
+    Completed unit ids and their row counts, rewritten atomically after each unit
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, CHECKPOINT_NAME)
+        self.done: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.done = json.load(f).get('done', {})
+
+    def mark_done(self, unit: WorkUnit, rows: int):
+        with self._lock:
+            self.done[unit.unit_id] = rows
+            partial = f"{self.path}.partial"
+            with open(partial, 'w') as f:
+                json.dump({'updated_at': datetime.now().isoformat(),
+                           'done': self.done}, f, indent=1, sort_keys=True)
+            os.replace(partial, self.path)
+
+
+@dataclass
+class BackfillReport:
+    """Outcome of one backfill run"""
+    planned: int = 0
+    resumed: int = 0
+    completed: int = 0
+    rows: int = 0
+    credits_spent: int = 0
+    over_budget: int = 0
+    errors: List[FetchError] = field(default_factory=list)
+
+    @property
+    def pending(self) -> int:
+        """Units left for the next run"""
+        return self.planned - self.resumed - self.completed
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class Backfill:
+    """
+    Runs planned work units on a thread pool, skipping any already checkpointed
+
+    Failed units are retried with backoff up to max_attempts times and
+    otherwise left pending; units the budget cannot cover are not started.
+    """
+
+    def __init__(self,
+                 fetcher: DataFetcher,
+                 output_dir: str,
+                 workers: int = 8,
+                 budget: Optional[CreditBudget] = None,
+                 max_attempts: int = 3):
+        self.fetcher = fetcher
+        self.output_dir = output_dir
+        self.workers = workers
+        self.budget = budget or CreditBudget()
+        self.max_attempts = max_attempts
+        self._stop = threading.Event()
+        os.makedirs(output_dir, exist_ok=True)
+        self.checkpoint = Checkpoint(output_dir)
+
+    def run(self, units: Sequence[WorkUnit]) -> BackfillReport:
+        report = BackfillReport(planned=len(units))
+        pending = []
+        for unit in units:
+            if unit.unit_id in self.checkpoint.done:
+                report.resumed += 1
+            else:
+                pending.append(unit)
+
+        pool = ThreadPoolExecutor(self.workers, thread_name_prefix='backfill')
+        try:
+            futures = {}
+            for unit in pending:
+                if not self.budget.reserve(unit.credits):
+                    report.over_budget += 1
+                    continue
+                futures[pool.submit(self._run_unit, unit)] = unit
+
+            for future in as_completed(futures):
+                unit = futures[future]
+                rows, error = future.result()
+                if error is None:
+                    report.completed += 1
+                    report.rows += rows
+                else:
+                    self.budget.refund(unit.credits)
+                    report.errors.append(error)
+        except KeyboardInterrupt:
+            # Finished units are already checkpointed; drop the queued ones
+            self._stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            pool.shutdown(wait=True)
+        report.credits_spent = self.budget.spent
+        return report
+
+    def _run_unit(self, unit: WorkUnit):
+        """
+        Fetch and write one unit; returns (rows, None) or (0, FetchError)
+        """
+        error = None
+        for attempt in range(self.max_attempts):
+            if self._stop.is_set():
+                break
+            if attempt:
+                # Wait out an open breaker rather than failing fast through it
+                breaker = self.fetcher.breakers.get('quotes/historical')
+                retry_in = breaker.snapshot()['retry_in'] if breaker else 0
+                time.sleep(max(retry_in, min(2**attempt, 30)))
+
+            self.budget.wait_for_call()
+            result = self.fetcher.fetch_historical_quotes(
+                unit.symbol, unit.start, unit.end, unit.interval)
+            if result.ok:
+                self._write_part(unit, result.data)
+                self.checkpoint.mark_done(unit, len(result.data))
+                return len(result.data), None
+            error = result.error
+            logger.warning(f"Backfill {unit.unit_id} attempt {attempt + 1} "
+                           f"failed: {error.message}")
+        return 0, FetchError('backfill',
+                             f"{unit.unit_id}: {error.message if error else 'stopped'}",
+                             error.status_code if error else None)
+
+    def _write_part(self, unit: WorkUnit, quotes: List[Dict]):
+        frame = pd.DataFrame(quotes,
+                             columns=['timestamp', 'price', 'volume_24h',
+                                      'market_cap'])
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], utc=True)
+        frame = frame.astype({'price': 'float64', 'volume_24h': 'float64',
+                              'market_cap': 'float64'})
+        path = unit.part_path(self.output_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Dot-prefixed, so dataset readers skip a part that is still being written
+        partial = os.path.join(os.path.dirname(path),
+                               f".{os.path.basename(path)}.partial")
+        frame.to_parquet(partial, index=False)
+        os.replace(partial, path)
+
+
+def read_history(output_dir: str,
+                 symbols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Read a backfill directory back as one frame sorted by symbol and timestamp
+    """
+    filters = [('symbol', 'in', list(symbols))] if symbols else None
+    frame = pd.read_parquet(output_dir, filters=filters)
+    frame['symbol'] = frame['symbol'].astype(str)
+    frame = frame.drop_duplicates(['symbol', 'timestamp'])
+    return frame.sort_values(['symbol', 'timestamp'], ignore_index=True)
+
+
+def parse_time(value: str) -> datetime:
+    """
+    ISO date or datetime, as UTC when no offset is given
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
@@ -0,0 +1,301 @@
+"""
+Vectorized portfolio backtests over stored price history
+History from the backfill directory becomes a time × asset panel; a strategy ranks
+assets by one of the dashboard metrics at each rebalance, holds the top N until the
+next one, and is evaluated with array operations over the whole panel at once.
+Parameter sweeps fan out across processes
+"""
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backfill import read_history
+from utils import (calculate_metrics_batch, calculate_market_cap_to_dau_ratio_batch,
+                   calculate_sharpe_ratio, calculate_token_velocity_batch)
+
+WEIGHTINGS = ('equal', 'market_cap')
+
+
+@dataclass
+class Panel:
+    """Aligned time × asset arrays; NaN where an asset has no quote"""
+    timestamps: np.ndarray
+    symbols: List[str]
+    price: np.ndarray
+    volume_24h: np.ndarray
+    market_cap: np.ndarray
+    periods_per_year: float
+    _growth: Optional[np.ndarray] = field(default=None, repr=False)
+    _rankings: Dict = field(default_factory=dict, repr=False)
+
+    @property
+    def shape(self):
+        return self.price.shape
+
+    def growth(self) -> np.ndarray:
+        """
+        Cumulative growth of each asset since the first row, flat where unquoted
+        """
+        if self._growth is None:
+            price = pd.DataFrame(self.price).ffill().to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns = np.nan_to_num(price[1:] / price[:-1] - 1, nan=0.0,
+                                        posinf=0.0, neginf=0.0)
+            self._growth = np.vstack([np.ones(self.shape[1]),
+                                      np.cumprod(1 + returns, axis=0)])
+        return self._growth
+
+    def ranking(self, signal: str, ascending: bool = False):
+        """
+        (order, valid): assets of each row best-first by signal, and which rows
+        × assets have a usable score; shared by every config on this signal
+        """
+        key = (signal, ascending)
+        if key not in self._rankings:
+            scores = SIGNALS[signal](self)
+            # The batch metrics report 0.0 where inputs are missing
+            valid = np.isfinite(scores) & (scores != 0)
+            ranked = np.where(valid, scores if ascending else -scores, np.inf)
+            order = np.argsort(ranked, axis=1, kind='stable')
+            self._rankings[key] = (order, valid)
+        return self._rankings[key]
+
+
+def load_panel(path: str,
+               frequency: str = '1D',
+               symbols: Optional[Sequence[str]] = None) -> Panel:
+    """
+    Resample backfilled history to one row per frequency period (last quote)
+    """
+    history = read_history(path, symbols)
+    history['timestamp'] = history['timestamp'].dt.floor(frequency)
+    last = history.groupby(['timestamp', 'symbol']).last()
+
+    def column(name: str) -> pd.DataFrame:
+        return last[name].unstack('symbol').sort_index()
+
+    price = column('price')
+    step = pd.Timedelta(frequency)
+    return Panel(timestamps=price.index.to_numpy(),
+                 symbols=list(price.columns),
+                 price=price.to_numpy(dtype=np.float64),
+                 volume_24h=column('volume_24h').reindex_like(price).to_numpy(
+                     dtype=np.float64),
+                 market_cap=column('market_cap').reindex_like(price).to_numpy(
+                     dtype=np.float64),
+                 periods_per_year=pd.Timedelta(days=365) / step)
+
+
+def _utility_score(panel: Panel) -> np.ndarray:
+    # As in the pipeline: velocity per $1B of market cap
+    velocity = calculate_token_velocity_batch(panel.volume_24h, panel.market_cap)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return velocity / (panel.market_cap / 1e9)
+
+
+# Ranking metrics, computed for the whole panel with the utils batch functions
+SIGNALS: Dict[str, Callable[[Panel], np.ndarray]] = {
+    'token_velocity':
+    lambda p: calculate_token_velocity_batch(p.volume_24h, p.market_cap),
+    'revenue_per_user':
+    lambda p: calculate_metrics_batch(p.market_cap, p.volume_24h, p.price),
+    'utility_score': _utility_score,
+    'mcap_dau_ratio':
+    lambda p: calculate_market_cap_to_dau_ratio_batch(p.market_cap,
+                                                       p.volume_24h, p.price),
+    'market_cap': lambda p: p.market_cap
+}
+
+
+@dataclass(frozen=True)
+class StrategyConfig:
+    """Hold the top_n assets by signal, rebalanced every rebalance_every periods"""
+    signal: str = 'token_velocity'
+    top_n: int = 10
+    rebalance_every: int = 7
+    ascending: bool = False
+    weighting: str = 'equal'
+    cost_bps: float = 0.0
+
+    @property
+    def label(self) -> str:
+        order = 'bottom' if self.ascending else 'top'
+        return (f"{order}-{self.top_n} by {self.signal}, {self.weighting}-weighted, "
+                f"rebalanced every {self.rebalance_every}")
+
+
+@dataclass
+class BacktestResult:
+    """Summary statistics of one strategy run"""
+    config: StrategyConfig
+    total_return: float
+    cagr: float
+    volatility: float
+    sharpe: float
+    max_drawdown: float
+    turnover: float
+    equity: Optional[np.ndarray] = None
+
+    def to_record(self) -> Dict:
+        return {**asdict(self.config), 'total_return': self.total_return,
+                'cagr': self.cagr, 'volatility': self.volatility,
+                'sharpe': self.sharpe, 'max_drawdown': self.max_drawdown,
+                'turnover': self.turnover}
+
+
+def _target_weights(panel: Panel, rows: np.ndarray,
+                    config: StrategyConfig) -> np.ndarray:
+    """
+    Weights at the given rows: top_n valid scores, equal or cap weighted
+    """
+    order, valid = panel.ranking(config.signal, config.ascending)
+    top = order[rows, :config.top_n]
+    chosen = np.zeros((len(rows), panel.shape[1]), dtype=bool)
+    chosen[np.arange(len(rows))[:, None], top] = valid[rows[:, None], top]
+
+    if config.weighting == 'market_cap':
+        raw = np.where(chosen, np.nan_to_num(panel.market_cap[rows]), 0.0)
+    else:
+        raw = chosen.astype(np.float64)
+    totals = raw.sum(axis=1, keepdims=True)
+    return np.divide(raw, totals, out=np.zeros_like(raw), where=totals > 0)
+
+
+def run_backtest(panel: Panel,
+                 config: StrategyConfig,
+                 risk_free_rate: float = 0.02,
+                 keep_equity: bool = False) -> BacktestResult:
+    """
+    Evaluate one strategy over the panel without a per-period loop
+
+    Weights chosen at a rebalance apply from the next period, so a signal never
+    sees the returns it is traded on; between rebalances holdings drift with
+    prices. Missing quotes count as flat prices.
+    """
+    if config.weighting not in WEIGHTINGS:
+        raise ValueError(f"Unsupported weighting: {config.weighting!r}")
+    periods, _ = panel.shape
+    k = max(int(config.rebalance_every), 1)
+
+    growth = panel.growth()
+    starts = np.arange(0, periods - 1, k)
+    weights = _target_weights(panel, starts, config)
+
+    # Period t > 0 belongs to the holding period that started at starts[j];
+    # its value is sum(w * growth[t] / growth[start]), so scale w once per period
+    t = np.arange(1, periods)
+    j = (t - 1) // k
+    scaled = weights / growth[starts]
+    factor = np.einsum('ij,ij->i', scaled[j], growth[1:])
+    # Uninvested periods (nothing passed the filter) hold cash
+    factor = np.where(weights.sum(axis=1)[j] > 0, factor, 1.0)
+
+    # Turnover: target weights against the drifted weights they replace
+    ends = np.minimum(starts + k, periods - 1)
+    drifted = weights * growth[ends] / growth[starts]
+    totals = drifted.sum(axis=1, keepdims=True)
+    drifted = np.divide(drifted, totals, out=np.zeros_like(drifted),
+                        where=totals > 0)
+    turnover = np.abs(weights - np.vstack([np.zeros(panel.shape[1]),
+                                           drifted[:-1]])).sum(axis=1)
+    costs = 1 - turnover * config.cost_bps * 1e-4
+
+    # Equity at each period start, then within each period
+    period_end = factor[np.minimum(starts + k, periods - 1) - 1]
+    start_equity = np.concatenate([[1.0], np.cumprod(period_end * costs)[:-1]])
+    equity = np.concatenate([[1.0], start_equity[j] * costs[j] * factor])
+
+    period_returns = equity[1:] / equity[:-1] - 1
+    peaks = np.maximum.accumulate(equity)
+    years = (periods - 1) / panel.periods_per_year
+    total_return = float(equity[-1] - 1)
+    per_period_rf = risk_free_rate / panel.periods_per_year
+    return BacktestResult(
+        config=config,
+        total_return=total_return,
+        cagr=float(equity[-1]**(1 / years) - 1) if years > 0 and equity[-1] > 0
+        else 0.0,
+        volatility=float(np.std(period_returns) *
+                         math.sqrt(panel.periods_per_year)),
+        # utils' per-period Sharpe ratio, annualized
+        sharpe=calculate_sharpe_ratio(period_returns, per_period_rf) *
+        math.sqrt(panel.periods_per_year),
+        max_drawdown=float((equity / peaks - 1).min()),
+        turnover=float(turnover.sum() / max(years, 1e-9)),
+        equity=equity if keep_equity else None)
+
+
+def parameter_grid(signals: Iterable[str],
+                   top_ns: Iterable[int],
+                   rebalance_every: Iterable[int],
+                   weightings: Iterable[str] = ('equal',),
+                   ascending: Iterable[bool] = (False,),
+                   cost_bps: float = 0.0) -> List[StrategyConfig]:
+    return [
+        StrategyConfig(signal, top_n, every, order, weighting, cost_bps)
+        for signal, top_n, every, weighting, order in itertools.product(
+            signals, top_ns, rebalance_every, weightings, ascending)
+    ]
+
+
+# Per worker process: the panel, which caches its rankings and growth
+_worker_panel: Optional[Panel] = None
+
+
+def _init_worker(panel: Panel):
+    global _worker_panel
+    _worker_panel = panel
+
+
+def _run_chunk(configs: List[StrategyConfig],
+               risk_free_rate: float) -> List[BacktestResult]:
+    return [
+        run_backtest(_worker_panel, config, risk_free_rate)
+        for config in configs
+    ]
+
+
+def run_sweep(panel: Panel,
+              configs: Sequence[StrategyConfig],
+              workers: Optional[int] = None,
+              risk_free_rate: float = 0.02) -> List[BacktestResult]:
+    """
+    Run every config, in worker processes when workers > 1; results keep config order
+
+    Configs are grouped by signal so each worker ranks a signal once.
+    """
+    workers = workers or os.cpu_count() or 1
+    unknown = {c.signal for c in configs} - set(SIGNALS)
+    if unknown:
+        raise ValueError(f"Unknown signals: {', '.join(sorted(unknown))} "
+                         f"(expected one of {', '.join(SIGNALS)})")
+
+    order = sorted(range(len(configs)),
+                   key=lambda i: (configs[i].signal, configs[i].ascending))
+    if workers == 1 or len(configs) < 2 * workers:
+        _init_worker(panel)
+        results = _run_chunk([configs[i] for i in order], risk_free_rate)
+    else:
+        size = -(-len(order) // (workers * 4))
+        chunks = [[configs[i] for i in order[lo:lo + size]]
+                  for lo in range(0, len(order), size)]
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(panel,)) as pool:
+            results = [
+                result for chunk in pool.map(_run_chunk, chunks,
+                                             itertools.repeat(risk_free_rate))
+                for result in chunk
+            ]
+
+    by_position = dict(zip(order, results))
+    return [by_position[i] for i in range(len(configs))]
+
+
+def results_frame(results: Iterable[BacktestResult]) -> pd.DataFrame:
+    return pd.DataFrame([result.to_record() for result in results])
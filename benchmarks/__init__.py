@@ -0,0 +1,3 @@
+"""
+Benchmark suite for the dashboard pipeline; run with `python -m benchmarks.run`
+"""
@@ -0,0 +1,127 @@
+"""
+Import-time profile of the dashboard entry points
+
+Runs each entry point's imports in a fresh interpreter under `python -X importtime`
+and reports the total import time and the heaviest top-level packages.
+
+Usage:
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --top 20 --json imports.json
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class ImportRecord:
+    """One line of -X importtime output, times in microseconds"""
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def module_imports(path: str) -> List[str]:
+    """
+    Top-level import statements of a script, e.g. app.py, as source lines
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    return [
+        ast.unparse(node) for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def entry_points() -> Dict[str, str]:
+    """
+    Import statements to profile, keyed by entry point name
+
+    'app' is everything app.py imports at the top of the script, i.e. what runs
+    before its first element can paint; 'streamlit' alone is the floor.
+    """
+    return {
+        'streamlit': 'import streamlit',
+        'app': '; '.join(module_imports(os.path.join(REPO_DIR, 'app.py'))),
+        'cli': 'import cli',
+        'pipeline': 'import pipeline'
+    }
+
+
+def profile_imports(statement: str) -> List[ImportRecord]:
+    """
+    Import records for a statement run in a fresh interpreter
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+        check=True)
+    records = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        records.append(
+            ImportRecord(name=name.strip(),
+                         self_us=int(self_us),
+                         cumulative_us=int(cumulative_us),
+                         depth=(len(name) - len(name.lstrip()) - 1) // 2))
+    return records
+
+
+def total_seconds(records: List[ImportRecord]) -> float:
+    return sum(r.cumulative_us for r in records if r.depth == 0) / 1e6
+
+
+def heaviest_packages(records: List[ImportRecord],
+                      top: int = 10) -> List[ImportRecord]:
+    """
+    Top-level packages (no dot in the name) by cumulative import time
+    """
+    packages = [r for r in records if '.' not in r.name]
+    return sorted(packages, key=lambda r: r.cumulative_us, reverse=True)[:top]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Profile import time of the dashboard entry points")
+    parser.add_argument('--top',
+                        type=int,
+                        default=10,
+                        help="Packages listed per entry point")
+    parser.add_argument('--json', help="Also write the raw records to this file")
+    args = parser.parse_args(argv)
+
+    report = {}
+    for entry, statement in entry_points().items():
+        records = profile_imports(statement)
+        report[entry] = records
+        print(f"{entry}: {total_seconds(records) * 1e3:.0f} ms")
+        for record in heaviest_packages(records, args.top):
+            print(f"    {record.name:<32} {record.cumulative_us / 1e3:>8.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                entry: [asdict(r) for r in records]
+                for entry, records in report.items()
+            },
+                      f,
+                      indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
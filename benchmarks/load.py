@@ -0,0 +1,554 @@
+"""
+Concurrent-session load test of an app.py replica against the local mock upstream
+
+Starts mock_upstream.py and `streamlit run app.py` as subprocesses, then opens N
+websocket sessions on the server, as N browser tabs would, and drives them with a
+behaviour mix:
+
+    browse        switch categories and analytics views
+    search        type and clear search terms
+    auto_refresh  turn on the app's auto-refresh and let the server rerun it
+
+For each session count the run reports rerun latency percentiles and the CPU and
+resident memory of the server process. Latency runs from sending a rerun to the
+server's script_finished message; for auto_refresh sessions it is the time between
+server-driven reruns less the refresh interval.
+
+Needs the websockets package (installed with Streamlit's server dependencies, or
+`pip install websockets`) and Linux /proc for the server's CPU and RSS.
+
+Usage:
+    python -m benchmarks.load --sessions 1 5 10 20 --duration 60
+    python -m benchmarks.load --mix browse=1 --sessions 8 --p99-budget 1500
+    python -m benchmarks.load --upstream-latency 0.2 --json load.json
+
+Exits with status 1 when --p99-budget is given and any session count exceeds it.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+
+BEHAVIOURS = ('browse', 'search', 'auto_refresh')
+DEFAULT_MIX = 'browse=0.5,search=0.3,auto_refresh=0.2'
+# The app's auto-refresh interval choices, in seconds
+REFRESH_INTERVALS = (15, 30, 60)
+
+SEARCH_TERMS = ['uni', 'eth', 'sol', 'link', 'game', 'ax', 'doge', 'a']
+CATEGORY_LABEL = "Select Category"
+SEARCH_LABEL = "🔍 Search Projects"
+VIEW_LABEL = "Analytics view"
+AUTO_REFRESH_LABEL = "Enable auto-refresh"
+INTERVAL_LABEL = "Refresh interval"
+
+# ScriptFinishedStatus: a run cut short because another rerun was requested
+FINISHED_EARLY_FOR_RERUN = 2
+# Alert.Format.ERROR, i.e. st.error
+ALERT_ERROR = 1
+
+
+@dataclass
+class LevelResult:
+    """Measurements for one session count"""
+    sessions: int
+    duration: float
+    reruns: int
+    errors: int
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+    first_load_p50_ms: float
+    reruns_per_second: float
+    # Server CPU seconds per wall second; 1.0 is one core fully busy
+    cpu_cores: float
+    rss_mb: float
+    rss_per_session_mb: float
+    by_behaviour: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    'browse=0.5,search=0.3' -> normalized weights per behaviour
+    """
+    weights = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in BEHAVIOURS:
+            raise ValueError(f"Unknown behaviour: {name!r} "
+                             f"(expected one of {', '.join(BEHAVIOURS)})")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Behaviour weights must sum to more than zero")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def assign_behaviours(n: int, mix: Dict[str, float]) -> List[str]:
+    """
+    n behaviours in proportion to mix, largest remainders first
+    """
+    quotas = {name: weight * n for name, weight in mix.items()}
+    counts = {name: int(quota) for name, quota in quotas.items()}
+    by_remainder = sorted(quotas, key=lambda name: quotas[name] - counts[name],
+                          reverse=True)
+    for name in by_remainder[:n - sum(counts.values())]:
+        counts[name] += 1
+    return [name for name in mix for _ in range(counts[name])]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[rank]
+
+
+def process_cpu_seconds(pid: int) -> float:
+    """
+    User plus system CPU time of a process; NaN without /proc
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the parenthesised command name; utime and stime
+            # are fields 14 and 15 of the whole line
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return float('nan')
+
+
+def process_rss_mb(pid: int) -> float:
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        return float('nan')
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(process: subprocess.Popen, url: str, what: str,
+                   timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            urllib.request.urlopen(url, timeout=1).close()
+            return
+        except OSError as e:
+            # The mock answers unknown paths with an HTTP error: it is up
+            if getattr(e, 'code', None):
+                return
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{what} did not start")
+
+
+def start_upstream(latency: float,
+                   error_rate: float) -> Tuple[subprocess.Popen, str]:
+    """
+    Run mock_upstream.py in a subprocess; returns it and its /v1 base URL
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, 'mock_upstream.py', '--port', str(port),
+         '--latency', str(latency), '--error-rate', str(error_rate)],
+        cwd=REPO_DIR, stdout=subprocess.DEVNULL)
+    _wait_until_up(process, f"http://127.0.0.1:{port}/", "Mock upstream")
+    return process, f"http://127.0.0.1:{port}/v1"
+
+
+def start_app(env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    """
+    Run `streamlit run app.py` headless; returns it and its websocket URL
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', 'app.py',
+         '--server.headless', 'true',
+         '--server.port', str(port),
+         # The harness is not a browser and holds no XSRF cookie
+         '--server.enableXsrfProtection', 'false',
+         '--server.fileWatcherType', 'none',
+         '--browser.gatherUsageStats', 'false'],
+        cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL)
+    _wait_until_up(process, f"http://127.0.0.1:{port}/_stcore/health",
+                   "Streamlit server")
+    return process, f"ws://127.0.0.1:{port}/_stcore/stream"
+
+
+class Session:
+    """
+    One browser tab: sends reruns with widget states, reads the rendered page
+
+    Only the widget kinds the behaviours touch are tracked, keyed by label.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.websocket = None
+        self.widgets: Dict[str, Tuple[str, object]] = {}
+        self.values: Dict[str, object] = {}
+        self.finished_at: List[float] = []
+
+    async def open(self):
+        import websockets
+
+        self.websocket = await websockets.connect(self.url,
+                                                  subprotocols=['streamlit'],
+                                                  max_size=None)
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+
+    def set(self, label: str, value) -> bool:
+        """
+        Change a widget for the next rerun; False if it is not on the page
+        """
+        if label not in self.widgets:
+            return False
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        kind, proto = self.widgets[label]
+        state = WidgetState(id=proto.id)
+        if kind in ('selectbox', 'radio'):
+            if 'raw_value' in proto.DESCRIPTOR.fields_by_name:
+                state.string_value = value
+            else:
+                # Older releases send the option index
+                state.int_value = list(proto.options).index(value)
+        elif kind == 'checkbox':
+            state.bool_value = value
+        else:
+            state.string_value = value
+        self.values[label] = state
+        return True
+
+    def options(self, label: str) -> List[str]:
+        return list(self.widgets[label][1].options)
+
+    def value(self, label: str):
+        state = self.values.get(label)
+        return None if state is None else getattr(state,
+                                                   state.WhichOneof('value'))
+
+    async def send(self):
+        """
+        Request a rerun with the current widget states
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.widget_states.widgets.extend(self.values.values())
+        await self.websocket.send(message.SerializeToString())
+
+    async def rerun(self) -> Tuple[float, bool]:
+        """
+        Request a rerun and wait for it to finish; returns (seconds, ok)
+        """
+        start = time.perf_counter()
+        await self.send()
+        ok = await self.read_run()
+        return time.perf_counter() - start, ok
+
+    async def read_run(self, complete: bool = True) -> bool:
+        """
+        Read messages up to the end of a script run; False on errors
+
+        With complete, runs cut short by a newer rerun request are read through.
+        """
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        ok = True
+        while True:
+            message = ForwardMsg()
+            message.ParseFromString(await self.websocket.recv())
+            kind = message.WhichOneof('type')
+            if kind == 'delta' and message.delta.WhichOneof('type') == 'new_element':
+                element = message.delta.new_element
+                element_kind = element.WhichOneof('type')
+                if element_kind in ('selectbox', 'radio', 'text_input',
+                                    'checkbox'):
+                    proto = getattr(element, element_kind)
+                    self.widgets[proto.label] = (element_kind, proto)
+                elif element_kind == 'exception' or (
+                        element_kind == 'alert'
+                        and element.alert.format == ALERT_ERROR):
+                    ok = False
+            elif kind == 'script_finished':
+                self.finished_at.append(time.perf_counter())
+                if (not complete
+                        or message.script_finished != FINISHED_EARLY_FOR_RERUN):
+                    return ok
+
+
+@dataclass
+class ViewerStats:
+    behaviour: str
+    first_load: Optional[float] = None
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+
+async def drive(session: Session, stats: ViewerStats, deadline: float,
+                think: float, refresh_interval: int, rng: random.Random):
+    """
+    Run one viewer's behaviour until the deadline
+    """
+    await session.open()
+    elapsed, ok = await session.rerun()
+    stats.first_load = elapsed
+    stats.errors += not ok
+
+    if stats.behaviour == 'auto_refresh':
+        # Every run now ends by sleeping and rerunning itself, so each run's
+        # end is read as it comes; the interval selectbox appears with the first
+        session.set(AUTO_REFRESH_LABEL, True)
+        await session.send()
+        interval_set = False
+        last = None
+        while time.monotonic() < deadline:
+            try:
+                ok = await asyncio.wait_for(session.read_run(complete=False),
+                                            deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                break
+            stats.errors += not ok
+            if not interval_set:
+                # Picked up once the current run's sleep ends
+                interval_set = session.set(INTERVAL_LABEL,
+                                           f"{refresh_interval} seconds")
+                await session.send()
+                continue
+            if last is not None:
+                cycle = session.finished_at[-1] - last
+                stats.latencies.append(max(cycle - refresh_interval, 0.0))
+            last = session.finished_at[-1]
+        return
+
+    while True:
+        pause = rng.expovariate(1 / think) if think > 0 else 0
+        if time.monotonic() + pause >= deadline:
+            break
+        await asyncio.sleep(pause)
+        if stats.behaviour == 'browse':
+            if rng.random() < 0.5:
+                session.set(CATEGORY_LABEL,
+                            rng.choice(session.options(CATEGORY_LABEL)))
+            else:
+                session.set(VIEW_LABEL, rng.choice(session.options(VIEW_LABEL)))
+        else:
+            term = '' if session.value(SEARCH_LABEL) else rng.choice(SEARCH_TERMS)
+            session.set(SEARCH_LABEL, term)
+        elapsed, ok = await session.rerun()
+        stats.latencies.append(elapsed)
+        stats.errors += not ok
+
+
+async def _run_level(url: str, behaviours: List[str], duration: float,
+                     think: float, refresh_interval: int, pid: int,
+                     seed: int) -> Tuple[List[ViewerStats], List[float]]:
+    sessions = [Session(url) for _ in behaviours]
+    stats = [ViewerStats(behaviour) for behaviour in behaviours]
+    deadline = time.monotonic() + duration
+    tasks = [
+        asyncio.ensure_future(
+            drive(session, own, deadline, think, refresh_interval,
+                  random.Random(seed + i)))
+        for i, (session, own) in enumerate(zip(sessions, stats))
+    ]
+    rss_samples = []
+    while not all(task.done() for task in tasks):
+        rss_samples.append(process_rss_mb(pid))
+        await asyncio.wait(tasks, timeout=1.0)
+    for session, own, task in zip(sessions, stats, tasks):
+        if task.exception() is not None:
+            own.errors += 1
+        await session.close()
+    return stats, rss_samples
+
+
+def run_level(url: str, pid: int, sessions: int, mix: Dict[str, float],
+              duration: float, think: float, refresh_interval: int,
+              baseline_rss: float, seed: int = 0) -> LevelResult:
+    cpu_start = process_cpu_seconds(pid)
+    wall_start = time.perf_counter()
+    stats, rss_samples = asyncio.run(
+        _run_level(url, assign_behaviours(sessions, mix), duration, think,
+                   refresh_interval, pid, seed))
+    wall = time.perf_counter() - wall_start
+    cpu = process_cpu_seconds(pid) - cpu_start
+
+    latencies = [t for own in stats for t in own.latencies]
+    by_behaviour = {}
+    for behaviour in mix:
+        own = [t for viewer in stats if viewer.behaviour == behaviour
+               for t in viewer.latencies]
+        if own:
+            by_behaviour[behaviour] = {
+                'reruns': len(own),
+                'p50_ms': percentile(own, 50) * 1e3,
+                'p99_ms': percentile(own, 99) * 1e3
+            }
+    first_loads = [own.first_load for own in stats if own.first_load is not None]
+    rss = max(rss_samples, default=float('nan'))
+    return LevelResult(
+        sessions=sessions,
+        duration=wall,
+        reruns=len(latencies),
+        errors=sum(own.errors for own in stats),
+        p50_ms=percentile(latencies, 50) * 1e3,
+        p99_ms=percentile(latencies, 99) * 1e3,
+        max_ms=max(latencies, default=float('nan')) * 1e3,
+        first_load_p50_ms=(statistics.median(first_loads) * 1e3
+                           if first_loads else float('nan')),
+        reruns_per_second=len(latencies) / wall,
+        cpu_cores=cpu / wall,
+        rss_mb=rss,
+        rss_per_session_mb=(rss - baseline_rss) / sessions,
+        by_behaviour=by_behaviour)
+
+
+def print_header():
+    print(f"{'sessions':>8} {'reruns':>7} {'err':>4} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8} {'first ms':>9} {'reruns/s':>9} "
+          f"{'cpu':>5} {'rss MB':>8} {'MB/sess':>8}")
+
+
+def print_row(r: LevelResult):
+    print(f"{r.sessions:>8} {r.reruns:>7} {r.errors:>4} {r.p50_ms:>8.0f} "
+          f"{r.p99_ms:>8.0f} {r.max_ms:>8.0f} {r.first_load_p50_ms:>9.0f} "
+          f"{r.reruns_per_second:>9.1f} {r.cpu_cores:>5.2f} "
+          f"{r.rss_mb:>8.1f} {r.rss_per_session_mb:>8.2f}", flush=True)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Load-test an app.py replica with concurrent sessions")
+    parser.add_argument('--sessions',
+                        nargs='+',
+                        type=int,
+                        default=[1, 5, 10, 20],
+                        help="Concurrent session counts, run in turn")
+    parser.add_argument('--duration',
+                        type=float,
+                        default=60,
+                        help="Seconds to run each session count")
+    parser.add_argument('--mix',
+                        default=DEFAULT_MIX,
+                        help="Behaviour weights, e.g. browse=0.5,search=0.5")
+    parser.add_argument('--think',
+                        type=float,
+                        default=2.0,
+                        help="Mean seconds between a viewer's actions")
+    parser.add_argument('--refresh-interval',
+                        type=int,
+                        choices=REFRESH_INTERVALS,
+                        default=REFRESH_INTERVALS[0],
+                        help="Auto-refresh interval of auto_refresh sessions")
+    parser.add_argument('--upstream-latency',
+                        type=float,
+                        default=0.0,
+                        help="Seconds added to every mock upstream response")
+    parser.add_argument('--upstream-error-rate', type=float, default=0.0)
+    parser.add_argument('--p99-budget',
+                        type=float,
+                        help="Fail when p99 rerun latency exceeds this many ms")
+    parser.add_argument('--json', help="Also write the results to this file")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if importlib.util.find_spec('websockets') is None:
+        print(json.dumps({'error': "The load test needs the websockets "
+                          "package: pip install websockets"}), file=sys.stderr)
+        return 2
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(json.dumps({'error': str(e)}), file=sys.stderr)
+        return 2
+
+    # Keep the app's files out of the working tree
+    state_dir = tempfile.mkdtemp(prefix='load-')
+    upstream, base_url = start_upstream(args.upstream_latency,
+                                        args.upstream_error_rate)
+    app = None
+    try:
+        app, url = start_app({
+            **os.environ,
+            'CMC_BASE_URL': base_url,
+            'NEWS_STORE_PATH': os.path.join(state_dir, 'news.sqlite3'),
+            'SNAPSHOT_CACHE_PATH': os.path.join(state_dir, 'snapshot.parquet'),
+            'ALERT_RULES_PATH': os.path.join(state_dir, 'alert_rules.json'),
+            'ALERT_LOG_PATH': os.path.join(state_dir, 'alerts.jsonl'),
+            'PRICE_HISTORY_PATH': os.path.join(state_dir, 'history')
+        })
+        # One page load warms the process-wide caches and the snapshot, so the
+        # first session count is not measured against a cold start
+        warmup = run_level(url, app.pid, 1, {'browse': 1.0}, 0, 0,
+                           REFRESH_INTERVALS[0], 0)
+        if warmup.errors:
+            print(json.dumps({'error': "Warm-up page load of app.py failed"}),
+                  file=sys.stderr)
+            return 2
+        baseline_rss = process_rss_mb(app.pid)
+
+        results = []
+        print_header()
+        for sessions in args.sessions:
+            results.append(run_level(url, app.pid, sessions, mix, args.duration,
+                                     args.think, args.refresh_interval,
+                                     baseline_rss))
+            print_row(results[-1])
+    except KeyboardInterrupt:
+        print(json.dumps({'error': 'Interrupted'}), file=sys.stderr)
+        return 130
+    finally:
+        for process in (app, upstream):
+            if process is not None:
+                process.terminate()
+                process.wait(10)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'baseline_rss_mb': baseline_rss,
+                       'mix': mix,
+                       'results': [asdict(r) for r in results]}, f, indent=2)
+    if args.p99_budget is not None:
+        over = [r.sessions for r in results if r.p99_ms > args.p99_budget]
+        if over:
+            print(f"p99 over {args.p99_budget:.0f} ms at "
+                  f"{', '.join(map(str, over))} sessions")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
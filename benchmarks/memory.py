@@ -0,0 +1,139 @@
+"""
+Per-token memory of parsed quotes: dict-of-dicts against the compact QuoteTable
+
+Measures, with tracemalloc, the bytes still held after decoding and parsing a
+quotes/latest body once the decoded payload is gone (retained), and the peak
+while going from parsed quotes to the snapshot frame; also reports the size of
+the snapshot frame itself, with float64 and float32 measures.
+
+Usage:
+    python -m benchmarks.memory
+    python -m benchmarks.memory --sizes 1000 5000 --json memory.json
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from benchmarks.synthetic import make_projects, make_quotes_body
+from data_fetcher import DataFetcher
+from pipeline import build_project_frame
+from schema import conform, memory_report
+
+DEFAULT_SIZES = (1000, 5000, 50000)
+
+
+def parse_quotes_as_dicts(data: Dict) -> Dict[str, Dict]:
+    """
+    The previous quotes/latest parser, one 12-key dict per token, for comparison
+    """
+    market_data = {}
+    for symbol, info in data.get('data', {}).items():
+        quote = info['quote']['USD']
+        market_data[symbol] = {
+            'name': info['name'],
+            'symbol': info['symbol'],
+            'price': quote['price'],
+            'market_cap': quote['market_cap'] or 0,
+            'volume_24h': quote['volume_24h'] or 0,
+            'percent_change_1h': quote['percent_change_1h'] or 0,
+            'percent_change_24h': quote['percent_change_24h'] or 0,
+            'percent_change_7d': quote['percent_change_7d'] or 0,
+            'circulating_supply': info['circulating_supply'] or 0,
+            'total_supply': info['total_supply'] or 0,
+            'max_supply': info['max_supply'],
+            'last_updated': quote['last_updated']
+        }
+    return market_data
+
+
+def traced(func: Callable[[], object]) -> Tuple[object, int, int]:
+    """
+    (result, bytes retained by the result, peak bytes during the call)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, retained, peak
+
+
+def measure_size(n: int) -> List[Dict]:
+    projects = make_projects(n)
+    body = make_quotes_body(projects)
+    rows = []
+    for label, parse in (('dicts', parse_quotes_as_dicts),
+                         ('quote_table', DataFetcher._parse_quotes)):
+        # Everything the parsed form keeps alive counts, strings included
+        parsed, retained, _ = traced(lambda: parse(json.loads(body)))
+        if label == 'dicts':
+            # The previous pipeline went through a list of row dicts
+            def to_frame(parsed=parsed):
+                return pd.DataFrame([{**p, **parsed[p['symbol']]}
+                                     for p in projects])
+        else:
+            def to_frame(parsed=parsed):
+                return build_project_frame(projects, parsed)
+        frame, _, frame_peak = traced(to_frame)
+        rows.append({
+            'tokens': n,
+            'representation': label,
+            'retained_bytes_per_token': retained / n,
+            'frame_peak_bytes_per_token': frame_peak / n
+        })
+        del parsed
+    # The last frame is the schema snapshot frame
+    for float32 in (False, True):
+        rows.append({
+            'tokens': n,
+            'representation': 'snapshot_float32' if float32 else 'snapshot',
+            'frame_bytes_per_token':
+            memory_report(conform(frame, float32))['bytes'].sum() / n
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure per-token memory of parsed quotes")
+    parser.add_argument('--sizes',
+                        nargs='+',
+                        type=int,
+                        default=list(DEFAULT_SIZES),
+                        help="Synthetic universe sizes")
+    parser.add_argument('--json', help="Also write the measurements to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'tokens':>8} {'representation':<14} {'retained B/token':>17} "
+          f"{'to-frame peak B/token':>22}")
+    for n in sorted(args.sizes):
+        rows = measure_size(n)
+        results.extend(rows)
+        before, after, snapshot, snapshot32 = rows
+        for row in (before, after):
+            print(f"{row['tokens']:>8} {row['representation']:<14} "
+                  f"{row['retained_bytes_per_token']:>17.0f} "
+                  f"{row['frame_peak_bytes_per_token']:>22.0f}")
+        print(f"{'':>8} {'reduction':<14} "
+              f"{before['retained_bytes_per_token'] / after['retained_bytes_per_token']:>16.1f}x "
+              f"{before['frame_peak_bytes_per_token'] / after['frame_peak_bytes_per_token']:>21.1f}x")
+        print(f"{'':>8} snapshot frame {snapshot['frame_bytes_per_token']:.0f} B/token, "
+              f"float32 {snapshot32['frame_bytes_per_token']:.0f} B/token")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
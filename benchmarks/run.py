@@ -0,0 +1,359 @@
+"""
+Benchmark runner with stored baselines and regression flagging
+
+Usage:
+    python -m benchmarks.run                        # run all, compare to baseline
+    python -m benchmarks.run --only utils fetcher --sizes 100 1000
+    python -m benchmarks.run --save                 # store results as the baseline
+    python -m benchmarks.run --payload recorded_quotes.json
+    python -m benchmarks.run --only imports          # see also benchmarks.import_profile
+    python -m benchmarks.memory                     # per-token quote memory
+    python -m benchmarks.load --sessions 1 5 10     # concurrent sessions on a server
+
+Exits with status 1 when any benchmark is slower than its baseline by more than
+--threshold, so it can gate CI on a fixed runner.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.import_profile import entry_points, profile_imports, total_seconds
+from benchmarks.synthetic import UNIVERSE_SIZES, make_projects, make_quotes_body
+from data_fetcher import DataFetcher, FetchResult
+from pipeline import build_project_frame
+from utils import (calculate_metrics, calculate_metrics_batch,
+                   calculate_token_velocity, calculate_token_velocity_batch,
+                   calculate_burn_rate_estimate,
+                   calculate_burn_rate_estimate_batch,
+                   calculate_market_cap_to_dau_ratio,
+                   calculate_market_cap_to_dau_ratio_batch)
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# Full script runs above this universe size take minutes; skipped by default
+APP_MAX_SIZE = 10000
+
+Measurement = Dict[str, float]
+
+
+def measure(func: Callable[[], object], repeat: int = 5) -> Measurement:
+    """
+    Median and best seconds per call over `repeat` timing rounds of ~0.2 s
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    rounds = [total / number for total in timer.repeat(repeat, number)]
+    return {
+        'seconds': statistics.median(rounds),
+        'best': min(rounds),
+        'calls': number * repeat
+    }
+
+
+def measure_once(func: Callable[[], object], repeat: int = 3) -> Measurement:
+    """
+    Like measure(), for slow calls that must run exactly once per round
+    """
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        rounds.append(time.perf_counter() - start)
+    return {
+        'seconds': statistics.median(rounds),
+        'best': min(rounds),
+        'calls': repeat
+    }
+
+
+def _market_data(n: int) -> Dict[str, Dict]:
+    return DataFetcher._parse_quotes(json.loads(make_quotes_body(make_projects(n))))
+
+
+def bench_utils(sizes: List[int], args) -> Iterator[Tuple[str, Measurement]]:
+    """
+    Scalar utils metric loop (as in the pipeline) against the batch functions
+    """
+    for n in sizes:
+        quotes = list(_market_data(n).values())
+        frame = pd.DataFrame(quotes)
+        columns = {
+            column: frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            for column in ('market_cap', 'volume_24h', 'price',
+                           'total_supply', 'max_supply')
+        }
+
+        def scalar():
+            for info in quotes:
+                calculate_metrics(info)
+                calculate_token_velocity(info.get('volume_24h', 0),
+                                         info.get('market_cap', 0))
+                calculate_burn_rate_estimate(info)
+                calculate_market_cap_to_dau_ratio(info.get('market_cap', 0),
+                                                  info.get('volume_24h', 0),
+                                                  info.get('price', 0))
+
+        def batch():
+            calculate_metrics_batch(columns['market_cap'],
+                                    columns['volume_24h'], columns['price'])
+            calculate_token_velocity_batch(columns['volume_24h'],
+                                           columns['market_cap'])
+            calculate_burn_rate_estimate_batch(columns['total_supply'],
+                                               columns['max_supply'])
+            calculate_market_cap_to_dau_ratio_batch(columns['market_cap'],
+                                                    columns['volume_24h'],
+                                                    columns['price'])
+
+        yield f"utils.scalar/{n}", measure(scalar)
+        yield f"utils.batch/{n}", measure(batch)
+
+
+def bench_fetcher(sizes: List[int], args) -> Iterator[Tuple[str, Measurement]]:
+    """
+    Response parsing and the project/market merge, on synthetic or recorded bodies
+    """
+    bodies = [(f"synthetic/{n}", make_quotes_body(make_projects(n)),
+               make_projects(n)) for n in sizes]
+    for path in args.payload:
+        with open(path, 'rb') as f:
+            body = f.read()
+        symbols = json.loads(body).get('data', {})
+        name = os.path.splitext(os.path.basename(path))[0]
+        projects = [{
+            'name': info.get('name', symbol),
+            'symbol': symbol,
+            'category': 'Web3'
+        } for symbol, info in symbols.items()]
+        bodies.append((f"recorded:{name}/{len(projects)}", body, projects))
+
+    for label, body, projects in bodies:
+        yield f"fetcher.parse.{label}", measure(
+            lambda: DataFetcher._parse_quotes(json.loads(body)))
+        market_data = DataFetcher._parse_quotes(json.loads(body))
+        yield f"fetcher.merge.{label}", measure(
+            lambda: build_project_frame(projects, market_data))
+
+
+def bench_app(sizes: List[int], args) -> Iterator[Tuple[str, Measurement]]:
+    """
+    Full headless script runs of app.py against a canned quotes response
+
+    'cold' clears every Streamlit cache first, so it includes the pipeline;
+    'warm' reruns the same session with the snapshot already loaded.
+    """
+    from unittest import mock
+
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import project_data
+
+    # Keep the app's files out of the working tree; read when app.py first
+    # imports the modules, so they must be set before the first run
+    state_dir = tempfile.mkdtemp(prefix='bench-app-')
+    os.environ.update({
+        'NEWS_STORE_PATH': os.path.join(state_dir, 'news.sqlite3'),
+        'SNAPSHOT_CACHE_PATH': os.path.join(state_dir, 'snapshot.parquet'),
+        'ALERT_RULES_PATH': os.path.join(state_dir, 'alert_rules.json'),
+        'ALERT_LOG_PATH': os.path.join(state_dir, 'alerts.jsonl'),
+        'PRICE_HISTORY_PATH': os.path.join(state_dir, 'history')
+    })
+    app_path = os.path.join(REPO_DIR, 'app.py')
+
+    for n in sizes:
+        if n > args.app_max_size:
+            continue
+        projects = make_projects(n)
+        market_data = DataFetcher._parse_quotes(
+            json.loads(make_quotes_body(projects)))
+
+        def fetch_market_data(self, symbols):
+            return FetchResult(market_data.select(symbols))
+
+        with mock.patch.object(project_data, 'get_web3_projects',
+                               lambda: projects), \
+                mock.patch.object(DataFetcher, 'fetch_market_data',
+                                  fetch_market_data), \
+                mock.patch.object(DataFetcher, 'get_news_from_all_sources',
+                                  lambda self: []), \
+                mock.patch.object(DataFetcher, 'fetch_fx_rates',
+                                  lambda self, currencies: FetchResult(
+                                      {c: 1.0 for c in currencies})):
+            session = {}
+
+            def cold():
+                st.cache_data.clear()
+                st.cache_resource.clear()
+                at = AppTest.from_file(app_path, default_timeout=300)
+                at.run()
+                if at.exception:
+                    raise RuntimeError(at.exception[0].value)
+                session['app'] = at
+
+            def warm():
+                session['app'].run()
+
+            yield f"app.cold/{n}", measure_once(cold)
+            yield f"app.warm/{n}", measure_once(warm, repeat=5)
+
+
+def bench_imports(sizes: List[int], args) -> Iterator[Tuple[str, Measurement]]:
+    """
+    Import time of each entry point in a fresh interpreter (-X importtime)
+    """
+    for entry, statement in entry_points().items():
+        rounds = [total_seconds(profile_imports(statement)) for _ in range(5)]
+        yield f"imports.{entry}", {
+            'seconds': statistics.median(rounds),
+            'best': min(rounds),
+            'calls': len(rounds)
+        }
+
+
+BENCHMARKS = {
+    'utils': bench_utils,
+    'fetcher': bench_fetcher,
+    'app': bench_app,
+    'imports': bench_imports
+}
+
+
+def environment() -> Dict[str, str]:
+    import streamlit
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': str(os.cpu_count()),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'streamlit': streamlit.__version__,
+        'created': datetime.now().isoformat(timespec='seconds')
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, Measurement], baseline: Optional[Dict],
+            threshold: float) -> List[str]:
+    """
+    Print a results table against the baseline; returns regressed benchmark names
+
+    Best-of-rounds times are compared, as they are the least noisy.
+    """
+    previous = baseline['results'] if baseline else {}
+    regressions = []
+    print(f"{'benchmark':<44} {'best':>12} {'baseline':>12} {'change':>9}")
+    for name, result in results.items():
+        current = result['best']
+        line = f"{name:<44} {_format_seconds(current):>12}"
+        if name in previous:
+            reference = previous[name]['best']
+            change = current / reference - 1 if reference else 0.0
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append(name)
+            line += (f" {_format_seconds(reference):>12} "
+                     f"{change:>+8.1%}{flag}")
+        print(line)
+    return regressions
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run the dashboard benchmarks and compare to a baseline")
+    parser.add_argument('--only',
+                        nargs='+',
+                        choices=list(BENCHMARKS),
+                        default=list(BENCHMARKS),
+                        help="Benchmark groups to run")
+    parser.add_argument('--sizes',
+                        nargs='+',
+                        type=int,
+                        default=list(UNIVERSE_SIZES),
+                        help="Synthetic universe sizes")
+    parser.add_argument('--app-max-size',
+                        type=int,
+                        default=APP_MAX_SIZE,
+                        help="Largest universe for full script runs")
+    parser.add_argument('--payload',
+                        action='append',
+                        default=[],
+                        help="Recorded quotes/latest response body to parse "
+                        "(repeatable)")
+    parser.add_argument('--baseline',
+                        default=DEFAULT_BASELINE,
+                        help="Baseline results file")
+    parser.add_argument('--save',
+                        action='store_true',
+                        help="Store these results as the new baseline")
+    parser.add_argument('--output', help="Also write results to this file")
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=0.25,
+                        help="Relative slowdown flagged as a regression")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    sizes = sorted(args.sizes)
+
+    results: Dict[str, Measurement] = {}
+    for group in args.only:
+        for name, result in BENCHMARKS[group](sizes, args):
+            results[name] = result
+
+    report = {'environment': environment(), 'results': results}
+    regressions = compare(results, load_baseline(args.baseline),
+                          args.threshold)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save:
+        baseline = load_baseline(args.baseline) or {'results': {}}
+        # Merge, so a partial run only replaces the benchmarks it ran
+        baseline['results'].update(results)
+        baseline['environment'] = report['environment']
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond "
+              f"{args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
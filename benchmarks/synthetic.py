@@ -0,0 +1,77 @@
+"""
+Deterministic synthetic project universes and CoinMarketCap-shaped payloads
+"""
+import json
+from typing import Dict, List
+
+import numpy as np
+
+CATEGORIES = ['Web3', 'Web3 Gaming']
+
+UNIVERSE_SIZES = (100, 1000, 10000, 50000)
+
+
+def make_projects(n: int, seed: int = 0) -> List[Dict]:
+    """
+    Project universe entries shaped like project_data.get_web3_projects()
+    """
+    rng = np.random.default_rng(seed)
+    categories = rng.choice(CATEGORIES, size=n, p=[0.7, 0.3])
+    return [{
+        'name': f"Synthetic Token {i}",
+        'symbol': f"SYN{i:05d}",
+        'category': str(categories[i])
+    } for i in range(n)]
+
+
+def make_quotes_payload(projects: List[Dict], seed: int = 0) -> Dict:
+    """
+    A quotes/latest response for the given projects
+
+    Distributions roughly follow the live market: log-normal caps, volumes
+    and prices, a share of missing supply fields and null changes.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(projects)
+    market_cap = rng.lognormal(18, 3, n)
+    volume = market_cap * rng.lognormal(-3, 1.5, n)
+    price = rng.lognormal(0, 3, n)
+    circulating = market_cap / price
+    total = circulating * rng.uniform(1, 3, n)
+    has_max = rng.random(n) < 0.6
+    max_supply = total * rng.uniform(1, 2, n)
+    changes = rng.normal(0, [2, 6, 15], (n, 3))
+    missing = rng.random((n, 3)) < 0.02
+
+    data = {}
+    for i, project in enumerate(projects):
+        change_1h, change_24h, change_7d = (None if missing[i, k] else
+                                            float(changes[i, k])
+                                            for k in range(3))
+        data[project['symbol']] = {
+            'id': i + 1,
+            'name': project['name'],
+            'symbol': project['symbol'],
+            'circulating_supply': float(circulating[i]),
+            'total_supply': float(total[i]),
+            'max_supply': float(max_supply[i]) if has_max[i] else None,
+            'quote': {
+                'USD': {
+                    'price': float(price[i]),
+                    'market_cap': float(market_cap[i]),
+                    'volume_24h': float(volume[i]),
+                    'percent_change_1h': change_1h,
+                    'percent_change_24h': change_24h,
+                    'percent_change_7d': change_7d,
+                    'last_updated': '2025-06-12T10:00:00.000Z'
+                }
+            }
+        }
+    return {'status': {'error_code': 0}, 'data': data}
+
+
+def make_quotes_body(projects: List[Dict], seed: int = 0) -> bytes:
+    """
+    Encoded quotes/latest response body, as recorded from the wire
+    """
+    return json.dumps(make_quotes_payload(projects, seed)).encode('utf-8')
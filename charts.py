@@ -0,0 +1,480 @@
+"""
+Plotly figure builders for the Web3 dashboard
+Each builder takes a filter view over the project snapshot and returns the figures
+for one analytics tab, with money columns converted into the display currency;
+Plotly is imported on the first build, not at app start
+"""
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+from currency import BASE_CURRENCY, DisplayCurrency
+from downsampling import decimate_scatter
+from filters import FilterView
+
+CATEGORY_COLORS = {
+    "Web3": "#1f77b4",
+    "Web3 Gaming": "#ff7f0e"
+}
+
+HORIZONTAL_LEGEND = dict(orientation="h",
+                         yanchor="bottom",
+                         y=1.02,
+                         xanchor="right",
+                         x=1)
+
+# Above this many points scatters switch from SVG to WebGL traces
+WEBGL_THRESHOLD = 2000
+
+# Point budget for a scatter when server-side decimation is enabled
+DECIMATION_MAX_POINTS = 5000
+
+PERFORMANCE_COLUMNS = [
+    'percent_change_1h', 'percent_change_24h', 'percent_change_7d'
+]
+
+
+def large_scatter(data: pd.DataFrame,
+                  x: str,
+                  y: str,
+                  log_x: bool = False,
+                  log_y: bool = False,
+                  decimate: bool = False,
+                  **kwargs) -> Any:
+    """
+    px.scatter that stays interactive for large universes
+
+    Uses WebGL traces above WEBGL_THRESHOLD points and, when decimate is set,
+    reduces the points server-side with outliers preserved.
+    """
+    import plotly.express as px
+
+    total_points = len(data)
+    if decimate and total_points > DECIMATION_MAX_POINTS:
+        size = kwargs.get('size')
+        positions = decimate_scatter(
+            data[x].to_numpy(dtype=float, na_value=np.nan),
+            data[y].to_numpy(dtype=float, na_value=np.nan),
+            max_points=DECIMATION_MAX_POINTS,
+            log_x=log_x,
+            log_y=log_y,
+            weights=data[size].to_numpy(dtype=float, na_value=np.nan)
+            if size else None)
+        data = data.iloc[positions]
+
+    render_mode = "webgl" if len(data) > WEBGL_THRESHOLD else "svg"
+    fig = px.scatter(data, x=x, y=y, render_mode=render_mode, **kwargs)
+    if log_x:
+        fig.update_layout(xaxis_type="log")
+    if log_y:
+        fig.update_layout(yaxis_type="log")
+    if len(data) < total_points:
+        fig.add_annotation(
+            text=f"Showing {len(data):,} of {total_points:,} points",
+            xref="paper",
+            yref="paper",
+            x=1,
+            y=0,
+            xanchor="right",
+            yanchor="bottom",
+            showarrow=False,
+            font=dict(size=10, color="gray"))
+    return fig
+
+
+def build_market_overview_figures(
+        view: FilterView,
+        decimate: bool = False,
+        currency: DisplayCurrency = BASE_CURRENCY) -> Dict[str, Any]:
+    """
+    Build the market cap vs volume scatter and the category distribution pie
+    """
+    import plotly.express as px
+
+    # Market cap vs volume scatter plot with enhanced tooltips
+    fig_scatter = large_scatter(
+        currency.convert_frame(
+            view.frame_for([
+                'name', 'category', 'market_cap', 'volume_24h', 'price',
+                'revenue_per_user', 'token_velocity', 'circulating_supply'
+            ])),
+        x="market_cap",
+        y="volume_24h",
+        log_x=True,
+        log_y=True,
+        decimate=decimate,
+        size="circulating_supply",
+        color="category",
+        hover_name="name",
+        hover_data={
+            "market_cap": currency.hover(",.0f"),
+            "volume_24h": currency.hover(",.0f"),
+            "price": currency.hover(f".{currency.price_decimals}f"),
+            "revenue_per_user": currency.hover(
+                f".{currency.amount_decimals}f"),
+            "token_velocity": ":.4f",
+            "circulating_supply": ":,.0f"
+        },
+        title="Market Cap vs 24h Volume (Log-Log Scale)",
+        labels={
+            "market_cap": currency.label("Market Cap") + " - Log Scale",
+            "volume_24h": currency.label("24h Volume") + " - Log Scale",
+            "price": currency.label("Price"),
+            "revenue_per_user": currency.label("Revenue per User"),
+            "circulating_supply": "Bubble Size: Circulating Supply"
+        },
+        color_discrete_map=CATEGORY_COLORS)
+    fig_scatter.update_layout(legend=HORIZONTAL_LEGEND)
+    # Add size legend annotation
+    fig_scatter.add_annotation(text="Bubble Size = Circulating Supply",
+                               xref="paper",
+                               yref="paper",
+                               x=0.02,
+                               y=0.98,
+                               showarrow=False,
+                               font=dict(size=10, color="gray"))
+
+    # Enhanced category distribution with counts
+    category_counts = view.value_counts('category')
+    # An empty search result still renders an (empty) pie
+    total_projects = max(len(view), 1)
+
+    # Create labels with counts and percentages
+    labels_with_counts = [
+        f"{cat}: {count} projects ({count/total_projects*100:.1f}%)"
+        for cat, count in category_counts.items()
+    ]
+
+    fig_pie = px.pie(
+        values=category_counts.values,
+        names=labels_with_counts,
+        title="Projects by Category Distribution",
+        color_discrete_map={
+            f"Web3: {category_counts.get('Web3', 0)} projects ({category_counts.get('Web3', 0)/total_projects*100:.1f}%)":
+            "#1f77b4",
+            f"Web3 Gaming: {category_counts.get('Web3 Gaming', 0)} projects ({category_counts.get('Web3 Gaming', 0)/total_projects*100:.1f}%)":
+            "#ff7f0e"
+        })
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+
+    return {'scatter': fig_scatter, 'pie': fig_pie}
+
+
+def build_revenue_figures(
+        view: FilterView,
+        decimate: bool = False,
+        currency: DisplayCurrency = BASE_CURRENCY) -> Dict[str, Any]:
+    """
+    Build the revenue per user, market cap/DAU, burn rate and revenue heatmap figures
+    """
+    import plotly.express as px
+
+    # Revenue per user with improved formatting
+    revenue_data = currency.convert_frame(view.nlargest(20, 'revenue_per_user'))
+    fig_revenue = px.bar(
+        revenue_data,
+        x="name",
+        y="revenue_per_user",
+        color="category",
+        title="Revenue per User (Top 20 Projects)",
+        labels={
+            "revenue_per_user": currency.label("Revenue per User"),
+            "market_cap": currency.label("Market Cap"),
+            "volume_24h": currency.label("24h Volume")
+        },
+        color_discrete_map=CATEGORY_COLORS,
+        hover_data={
+            "revenue_per_user": currency.hover(f".{currency.amount_decimals}f"),
+            "market_cap": currency.hover(",.0f"),
+            "volume_24h": currency.hover(",.0f")
+        })
+    fig_revenue.update_layout(xaxis_tickangle=-45,
+                              xaxis_title="Project Name",
+                              yaxis_title=currency.label("Revenue per User"),
+                              showlegend=True,
+                              legend=HORIZONTAL_LEGEND)
+
+    # Market Cap to DAU Ratio with reference lines
+    mcap_dau_data = currency.convert_frame(
+        view.nlargest(20, 'mcap_dau_ratio', above=0))
+    fig_mcap_dau = px.scatter(
+        mcap_dau_data,
+        x="volume_24h",
+        y="mcap_dau_ratio",
+        size="market_cap",
+        color="category",
+        hover_name="name",
+        title="Market Cap/DAU Ratio - User Value Assessment",
+        labels={
+            "volume_24h": currency.label("24h Volume") + " - Log Scale",
+            "mcap_dau_ratio": currency.label("Market Cap per Daily Active User"),
+            "market_cap": currency.label("Market Cap")
+        },
+        color_discrete_map=CATEGORY_COLORS,
+        hover_data={
+            "mcap_dau_ratio": currency.hover(",.0f"),
+            "volume_24h": currency.hover(",.0f"),
+            "market_cap": currency.hover(",.0f")
+        })
+    fig_mcap_dau.update_layout(xaxis_type="log", legend=HORIZONTAL_LEGEND)
+    # Add reference line at $1 per user
+    baseline = currency.convert(1.0)
+    fig_mcap_dau.add_hline(
+        y=baseline,
+        line_dash="dash",
+        line_color="red",
+        annotation_text=f"{currency.format(baseline)} per DAU baseline")
+
+    # Burn rate estimates
+    burn_data = view.nlargest(15, 'burn_rate_estimate', above=0)
+    fig_burn = None
+    if not burn_data.empty:
+        fig_burn = px.bar(
+            burn_data,
+            x="name",
+            y="burn_rate_estimate",
+            color="category",
+            title="Token Burn Rate Estimates (%)",
+            labels={"burn_rate_estimate": "Estimated Burn Rate (%)"})
+        fig_burn.update_xaxes(tickangle=45)
+
+    # Revenue efficiency heatmap
+    top_projects = currency.convert_frame(view.nlargest(15, 'revenue_per_user'))
+    metrics_for_heatmap = top_projects[[
+        'name', 'revenue_per_user', 'token_velocity', 'mcap_dau_ratio'
+    ]]
+
+    fig_heatmap = px.imshow(metrics_for_heatmap.set_index('name').T,
+                            title="Revenue Metrics Heatmap (Top 15)",
+                            color_continuous_scale="Viridis",
+                            aspect="auto")
+    fig_heatmap.update_xaxes(tickangle=45)
+
+    return {
+        'revenue': fig_revenue,
+        'mcap_dau': fig_mcap_dau,
+        'burn': fig_burn,
+        'heatmap': fig_heatmap
+    }
+
+
+def build_token_figures(
+        view: FilterView,
+        decimate: bool = False,
+        currency: DisplayCurrency = BASE_CURRENCY) -> Dict[str, Any]:
+    """
+    Build the token velocity, supply and velocity vs market cap figures
+    """
+    import plotly.express as px
+
+    # Token velocity horizontal bar chart for better readability
+    velocity_data = currency.convert_frame(
+        view.nlargest(15, 'token_velocity', above=0))
+    fig_velocity = px.bar(
+        velocity_data,
+        x="token_velocity",
+        y="name",
+        color="category",
+        orientation='h',
+        title="Token Velocity - How Many Times Token Turns Over in 24h",
+        labels={
+            "token_velocity": "Token Velocity (Volume/Market Cap)",
+            "name": "Project",
+            "volume_24h": currency.label("24h Volume"),
+            "market_cap": currency.label("Market Cap")
+        },
+        color_discrete_map=CATEGORY_COLORS,
+        hover_data={
+            "token_velocity": ":.4f",
+            "volume_24h": currency.hover(",.0f"),
+            "market_cap": currency.hover(",.0f")
+        })
+    fig_velocity.update_layout(height=500,
+                               yaxis={'categoryorder': 'total ascending'},
+                               legend=HORIZONTAL_LEGEND)
+    # Add reference line at velocity = 1
+    fig_velocity.add_vline(x=1,
+                           line_dash="dash",
+                           line_color="gray",
+                           annotation_text="High Velocity Threshold")
+
+    # Price vs circulating supply
+    fig_supply = large_scatter(currency.convert_frame(
+        view.frame_for(
+            ['name', 'category', 'circulating_supply', 'price', 'market_cap'])),
+                               x="circulating_supply",
+                               y="price",
+                               log_x=True,
+                               decimate=decimate,
+                               color="category",
+                               size="market_cap",
+                               hover_name="name",
+                               title="Price vs Circulating Supply",
+                               labels={
+                                   "circulating_supply": "Circulating Supply",
+                                   "price": currency.label("Price")
+                               })
+
+    # Supply utilization
+    supply_data = view.nlargest(15, 'supply_ratio')
+    fig_supply_ratio = None
+    if not supply_data.empty:
+        fig_supply_ratio = px.bar(
+            supply_data,
+            x="name",
+            y="supply_ratio",
+            color="category",
+            title="Supply Utilization Ratio (Top 15)",
+            labels={"supply_ratio": "Circulating/Total Supply Ratio"})
+        fig_supply_ratio.update_xaxes(tickangle=45)
+
+    # Token velocity vs Market Cap
+    velocity_vs_mcap = currency.convert_frame(
+        view.where('token_velocity', '>', 0).frame_for(
+            ['name', 'category', 'market_cap', 'token_velocity', 'volume_24h']))
+    fig_velocity_scatter = large_scatter(velocity_vs_mcap,
+                                         x="market_cap",
+                                         y="token_velocity",
+                                         log_x=True,
+                                         decimate=decimate,
+                                         color="category",
+                                         size="volume_24h",
+                                         hover_name="name",
+                                         title="Token Velocity vs Market Cap",
+                                         labels={
+                                             "market_cap":
+                                             currency.label("Market Cap"),
+                                             "token_velocity": "Token Velocity"
+                                         })
+
+    return {
+        'velocity': fig_velocity,
+        'supply': fig_supply,
+        'supply_ratio': fig_supply_ratio,
+        'velocity_scatter': fig_velocity_scatter
+    }
+
+
+def build_performance_figures(
+        view: FilterView,
+        decimate: bool = False,
+        currency: DisplayCurrency = BASE_CURRENCY) -> Dict[str, Any]:
+    """
+    Build the price performance heatmap, or return no figure if change columns are missing
+    """
+    import plotly.express as px
+
+    if not all(col in view.index.frame.columns for col in PERFORMANCE_COLUMNS):
+        return {'heatmap': None}
+
+    # Sort by 24h performance for better ordering
+    performance_data = view.nlargest(
+        20, 'percent_change_24h')[['name'] + PERFORMANCE_COLUMNS]
+
+    # Create heatmap matrix
+    heatmap_matrix = performance_data[PERFORMANCE_COLUMNS].T.values
+
+    fig_heatmap = px.imshow(
+        heatmap_matrix,
+        labels={
+            'x': 'Projects (sorted by 24h performance)',
+            'y': 'Time Period',
+            'color': 'Price Change (%)'
+        },
+        x=performance_data['name'].tolist(),
+        y=['1 Hour', '24 Hours', '7 Days'],  # Logical time ordering
+        title="Price Performance Heatmap - Top 20 Projects by 24h Change",
+        color_continuous_scale="RdYlGn",
+        color_continuous_midpoint=0,
+        zmin=-10,
+        zmax=10  # Better scale for percentage changes
+    )
+
+    fig_heatmap.update_layout(xaxis_tickangle=-45,
+                              height=400,
+                              font=dict(size=10))
+
+    # Add annotations for extreme values
+    for i, (idx, row) in enumerate(performance_data.iterrows()):
+        for j, col in enumerate(PERFORMANCE_COLUMNS):
+            value = row[col]
+            if abs(value) > 5:  # Highlight significant changes
+                fig_heatmap.add_annotation(
+                    x=i,
+                    y=j,
+                    text=f"{value:.1f}%",
+                    showarrow=False,
+                    font=dict(color="white" if abs(value) > 7 else "black",
+                              size=8))
+
+    return {'heatmap': fig_heatmap}
+
+
+def build_price_history_figure(
+        window, currency: DisplayCurrency = BASE_CURRENCY) -> Any:
+    """
+    Close price line for a price_history.HistoryWindow, with the high-low range
+    shaded when the window is an OHLCV rollup
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    data = currency.convert_frame(window.frame,
+                                  ['open', 'high', 'low', 'close', 'volume'])
+    resolution = "raw ticks" if window.resolution == 'raw' else \
+        f"{window.resolution} bars"
+    fig = px.line(data,
+                  x='timestamp',
+                  y='close',
+                  render_mode="webgl" if len(data) > WEBGL_THRESHOLD else "svg",
+                  title=f"{window.symbol} Price ({resolution})",
+                  labels={
+                      'timestamp': 'Time',
+                      'close': currency.label('Price')
+                  })
+    price_format = currency.hover(f",.{currency.price_decimals}f")
+    # d3 formats only prefix dollars themselves
+    prefix = '' if currency.is_base else currency.symbol
+    fig.update_traces(
+        hovertemplate=f"%{{x}}<br>{prefix}%{{y{price_format}}}<extra></extra>")
+
+    if window.resolution != 'raw':
+        # Low edge first, then the high edge filled down to it
+        fig.add_trace(go.Scatter(x=data['timestamp'],
+                                 y=data['low'],
+                                 mode='lines',
+                                 line=dict(width=0),
+                                 hoverinfo='skip',
+                                 showlegend=False))
+        fig.add_trace(go.Scatter(x=data['timestamp'],
+                                 y=data['high'],
+                                 mode='lines',
+                                 line=dict(width=0),
+                                 fill='tonexty',
+                                 fillcolor='rgba(31, 119, 180, 0.15)',
+                                 hoverinfo='skip',
+                                 name='High-low range'))
+
+    if window.reduced:
+        fig.add_annotation(
+            text=f"Showing {len(data):,} of {window.total_points:,} points",
+            xref="paper",
+            yref="paper",
+            x=1,
+            y=0,
+            xanchor="right",
+            yanchor="bottom",
+            showarrow=False,
+            font=dict(size=10, color="gray"))
+    fig.update_layout(height=400, legend=HORIZONTAL_LEGEND)
+    return fig
+
+
+# Tab label -> figure builder, in display order
+TAB_BUILDERS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "Market Overview": build_market_overview_figures,
+    "Revenue Metrics": build_revenue_figures,
+    "Token Analysis": build_token_figures,
+    "Performance": build_performance_figures
+}
@@ -0,0 +1,114 @@
+"""
+Circuit breakers for upstream endpoints
+After repeated failures an endpoint's breaker opens and calls fail fast without
+touching the network; once the reset timeout passes a single probe is let through
+(half-open), and its outcome closes the breaker or opens it again for longer
+"""
+import threading
+from typing import Dict
+
+from clock import SYSTEM_CLOCK, Clock
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable after repeated failures; "
+                         f"retrying in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Failure counter and state machine for one endpoint
+
+    Opens after failure_threshold consecutive failures. Each failed half-open
+    probe doubles the reset timeout, up to max_reset_timeout; a success closes
+    the breaker and restores the initial timeout.
+    """
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = 3,
+                 reset_timeout: float = 30,
+                 max_reset_timeout: float = 600,
+                 clock: Clock = SYSTEM_CLOCK):
+        self.name = name
+        # Reset timeouts run on this clock, so a replay times probes in replay time
+        self.clock = clock
+        self.failure_threshold = failure_threshold
+        self.initial_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._retry_in() <= 0:
+                return HALF_OPEN
+            return self._state
+
+    def _retry_in(self) -> float:
+        return self._opened_at + self.reset_timeout - self.clock.monotonic()
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError unless a call may go through now
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            retry_in = self._retry_in()
+            if retry_in > 0 or self._probing:
+                raise CircuitOpenError(self.name, max(retry_in, 0))
+            # Half-open: this caller is the single probe
+            self._state = HALF_OPEN
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self.failures = 0
+            self.reset_timeout = self.initial_reset_timeout
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """
+        Count a failed call; returns True if the breaker opened because of it
+        """
+        with self._lock:
+            self.failures += 1
+            was_open = self._state != CLOSED
+            if was_open:
+                self.reset_timeout = min(self.reset_timeout * 2,
+                                         self.max_reset_timeout)
+            elif self.failures < self.failure_threshold:
+                return False
+            self._state = OPEN
+            self._opened_at = self.clock.monotonic()
+            self._probing = False
+            return True
+
+    def snapshot(self) -> Dict:
+        """
+        State summary for diagnostics
+        """
+        state = self.state
+        with self._lock:
+            return {
+                'endpoint': self.name,
+                'state': state,
+                'failures': self.failures,
+                'retry_in': max(self._retry_in(), 0) if state == OPEN else 0.0
+            }
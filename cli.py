@@ -0,0 +1,378 @@
+"""
+Command-line entry point for the headless dashboard pipeline
+
+Usage:
+    python cli.py export snapshot.parquet
+    python cli.py export snapshot.json --category "Web3 Gaming"
+    python cli.py backfill history/ --start 2024-01-01 --interval daily
+    python cli.py backfill history/ --start 2024-01-01 --base-url http://127.0.0.1:8765/v1
+    python cli.py backtest history/ --signal token_velocity --top 10 --rebalance 7
+    python cli.py backtest history/ --top 5 10 20 --rebalance 1 7 30 --output sweep.csv
+    python cli.py record day.jsonl --interval 300 --count 288
+    python cli.py replay day.jsonl
+    REPLAY_PATH=day.jsonl REPLAY_SPEED=100 streamlit run app.py
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from alerts import AlertEngine, load_rules
+from backfill import Backfill, CreditBudget, parse_time, plan_units
+from backtest import (SIGNALS, WEIGHTINGS, load_panel, parameter_grid,
+                      results_frame, run_sweep)
+from currency import BASE_CURRENCY_CODE, SUPPORTED_CURRENCIES
+from data_fetcher import HISTORICAL_INTERVALS, DataFetcher
+from pipeline import SNAPSHOT_FORMATS, run_pipeline, write_snapshot
+from project_data import get_projects_by_category
+from replay import Recording, RecordingFetcher, ReplayFetcher
+from snapshot import SnapshotStore
+
+
+def _report_errors(errors) -> None:
+    # One JSON object per line so schedulers can parse failures
+    for error in errors:
+        print(json.dumps(asdict(error)), file=sys.stderr)
+
+
+def export_command(args: argparse.Namespace) -> int:
+    result = run_pipeline(projects=get_projects_by_category(args.category))
+    _report_errors(result.errors)
+    if not result.ok:
+        print(json.dumps({'source': 'pipeline', 'message': 'No data available'}),
+              file=sys.stderr)
+        return 1
+
+    try:
+        fmt = write_snapshot(result.frame, args.output, args.format)
+    except (ValueError, ImportError, OSError) as e:
+        print(json.dumps({'source': 'export', 'message': str(e)}),
+              file=sys.stderr)
+        return 1
+
+    print(json.dumps({
+        'output': args.output,
+        'format': fmt,
+        'rows': len(result.frame),
+        'fetched_at': result.fetched_at.isoformat()
+    }))
+    return 0
+
+
+def backfill_command(args: argparse.Namespace) -> int:
+    fetcher = DataFetcher()
+    if args.base_url:
+        fetcher.cmc_base_url = args.base_url.rstrip('/')
+    symbols = args.symbols or [
+        p['symbol'] for p in get_projects_by_category(args.category)
+    ]
+
+    try:
+        end = parse_time(args.end) if args.end else datetime.now(timezone.utc)
+        units = plan_units(symbols, parse_time(args.start), end, args.interval,
+                           args.points_per_unit)
+        backfill = Backfill(fetcher,
+                            args.output,
+                            workers=args.workers,
+                            budget=CreditBudget(args.credits,
+                                                args.calls_per_minute))
+        report = backfill.run(units)
+    except (ValueError, ImportError, OSError) as e:
+        print(json.dumps({'source': 'backfill', 'message': str(e)}),
+              file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print(json.dumps({'source': 'backfill',
+                          'message': "Interrupted; rerun the same command "
+                          f"to resume into {args.output}"}),
+              file=sys.stderr)
+        return 130
+
+    _report_errors(report.errors)
+    print(json.dumps({
+        'output': args.output,
+        'units': report.planned,
+        'resumed': report.resumed,
+        'completed': report.completed,
+        'pending': report.pending,
+        'over_budget': report.over_budget,
+        'rows': report.rows,
+        'credits_spent': report.credits_spent
+    }))
+    # Pending units are left for the next run, which resumes from the checkpoint
+    return 0 if report.pending == 0 else 2
+
+
+def backtest_command(args: argparse.Namespace) -> int:
+    try:
+        panel = load_panel(args.history, args.frequency, args.symbols)
+        configs = parameter_grid(args.signal, args.top, args.rebalance,
+                                 args.weighting,
+                                 [True] if args.ascending else [False],
+                                 args.cost_bps)
+        results = results_frame(
+            run_sweep(panel, configs, args.workers, args.risk_free_rate))
+        results = results.sort_values('sharpe', ascending=False,
+                                      ignore_index=True)
+        if args.output:
+            write_snapshot(results, args.output)
+    except (ValueError, ImportError, OSError) as e:
+        print(json.dumps({'source': 'backtest', 'message': str(e)}),
+              file=sys.stderr)
+        return 1
+
+    print(json.dumps({
+        'periods': panel.shape[0],
+        'assets': panel.shape[1],
+        'configs': len(results),
+        'output': args.output,
+        'best': results.iloc[0].to_dict()
+    }, default=float))
+    return 0
+
+
+def record_command(args: argparse.Namespace) -> int:
+    fetcher = RecordingFetcher(args.output)
+    if args.base_url:
+        fetcher.cmc_base_url = args.base_url.rstrip('/')
+    projects = get_projects_by_category(args.category)
+    news_due = fx_due = 0.0
+    try:
+        for cycle in range(args.count):
+            if cycle:
+                time.sleep(args.interval)
+            started = time.monotonic()
+            result = run_pipeline(fetcher, projects)
+            _report_errors(result.errors)
+            # News and FX at the pace the dashboard refreshes them
+            if started >= news_due:
+                fetcher.get_news_from_all_sources()
+                news_due = started + args.news_interval
+            if started >= fx_due:
+                fetcher.fetch_fx_rates([
+                    c for c in SUPPORTED_CURRENCIES if c != BASE_CURRENCY_CODE
+                ])
+                fx_due = started + args.fx_interval
+    except OSError as e:
+        print(json.dumps({'source': 'record', 'message': str(e)}),
+              file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+
+    recording = Recording.load(args.output)
+    print(json.dumps({
+        'output': args.output,
+        'quotes': len(recording.times['quotes']),
+        'news': len(recording.times['news']),
+        'fx': len(recording.times['fx']),
+        'start': recording.start.isoformat() if recording.start else None,
+        'end': recording.end.isoformat() if recording.end else None
+    }))
+    return 0
+
+
+def replay_command(args: argparse.Namespace) -> int:
+    try:
+        fetcher = ReplayFetcher(Recording.load(args.recording), speed=0)
+    except (ValueError, OSError) as e:
+        print(json.dumps({'source': 'replay', 'message': str(e)}),
+              file=sys.stderr)
+        return 1
+    projects = get_projects_by_category(args.category)
+    # The refresh path of the dashboard: pipeline, publish and alert checks
+    store = SnapshotStore(lambda: run_pipeline(fetcher, projects),
+                          clock=fetcher.clock)
+    engine = AlertEngine(load_rules(), clock=fetcher.clock)
+    alerts = []
+    store.subscribe(lambda snapshot: alerts.extend(engine.evaluate(snapshot.frame)))
+
+    digest = hashlib.sha256()
+    durations = []
+    while True:
+        started = time.perf_counter()
+        result = run_pipeline(fetcher, projects)
+        snapshot = store.publish(result.frame, result.fetched_at)
+        durations.append(time.perf_counter() - started)
+        _report_errors(result.errors)
+        # Same recording, same frames and timestamps: runs can be compared
+        digest.update(snapshot.created_at.isoformat().encode())
+        digest.update(
+            pd.util.hash_pandas_object(snapshot.frame, index=False).to_numpy())
+        if fetcher.finished:
+            break
+
+    durations = np.array(durations)
+    print(json.dumps({
+        'recording': args.recording,
+        'snapshots': len(durations),
+        'seconds': round(float(durations.sum()), 4),
+        'snapshots_per_second': round(len(durations) / durations.sum(), 1),
+        'p50_ms': round(float(np.percentile(durations, 50)) * 1000, 2),
+        'p99_ms': round(float(np.percentile(durations, 99)) * 1000, 2),
+        'replay_start': fetcher.recording.times['quotes'][0].isoformat(),
+        'replay_end': fetcher.clock.now().isoformat(),
+        'alerts': len(alerts),
+        'digest': digest.hexdigest()
+    }))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Headless Web3 dashboard pipeline")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export = subparsers.add_parser(
+        'export', help="Fetch market data, compute metrics and write a snapshot")
+    export.add_argument('output', help="Output path (.csv, .parquet or .json)")
+    export.add_argument('--format',
+                        choices=SNAPSHOT_FORMATS,
+                        help="Output format (default: from file extension)")
+    export.add_argument('--category',
+                        default='All',
+                        choices=['All', 'Web3', 'Web3 Gaming'],
+                        help="Project category to export")
+    export.set_defaults(handler=export_command)
+
+    backfill = subparsers.add_parser(
+        'backfill',
+        help="Fetch historical quotes into a partitioned Parquet directory, "
+        "resuming any earlier run into the same directory")
+    backfill.add_argument('output', help="Output directory")
+    backfill.add_argument('--start',
+                          required=True,
+                          help="First timestamp (ISO date or datetime, UTC)")
+    backfill.add_argument('--end', help="End timestamp, exclusive (default: now)")
+    backfill.add_argument('--interval',
+                          default='daily',
+                          choices=list(HISTORICAL_INTERVALS),
+                          help="Spacing of the historical quotes")
+    backfill.add_argument('--symbols',
+                          nargs='+',
+                          help="Symbols to backfill (default: the --category "
+                          "universe)")
+    backfill.add_argument('--category',
+                          default='All',
+                          choices=['All', 'Web3', 'Web3 Gaming'],
+                          help="Project category to backfill")
+    backfill.add_argument('--workers',
+                          type=int,
+                          default=8,
+                          help="Parallel upstream requests")
+    backfill.add_argument('--points-per-unit',
+                          type=int,
+                          default=500,
+                          help="Quotes per work unit (one request each)")
+    backfill.add_argument('--credits',
+                          type=int,
+                          help="API credits this run may spend")
+    backfill.add_argument('--calls-per-minute',
+                          type=float,
+                          help="Request rate limit of the API plan")
+    backfill.add_argument('--base-url',
+                          help="CoinMarketCap API base URL, e.g. a local "
+                          "mock_upstream.py (default: $CMC_BASE_URL)")
+    backfill.set_defaults(handler=backfill_command)
+
+    backtest = subparsers.add_parser(
+        'backtest',
+        help="Backtest top-N strategies over backfilled history; every "
+        "combination of the given parameters is run")
+    backtest.add_argument('history', help="Backfill output directory")
+    backtest.add_argument('--signal',
+                          nargs='+',
+                          default=['token_velocity'],
+                          choices=list(SIGNALS),
+                          help="Metric to rank assets by")
+    backtest.add_argument('--top',
+                          nargs='+',
+                          type=int,
+                          default=[10],
+                          help="Assets held")
+    backtest.add_argument('--rebalance',
+                          nargs='+',
+                          type=int,
+                          default=[7],
+                          help="Periods between rebalances")
+    backtest.add_argument('--weighting',
+                          nargs='+',
+                          default=['equal'],
+                          choices=WEIGHTINGS)
+    backtest.add_argument('--ascending',
+                          action='store_true',
+                          help="Hold the lowest-ranked assets instead")
+    backtest.add_argument('--cost-bps',
+                          type=float,
+                          default=0.0,
+                          help="Trading cost per unit of turnover, in basis points")
+    backtest.add_argument('--frequency',
+                          default='1D',
+                          help="Panel period, e.g. 1h or 1D (default: 1D)")
+    backtest.add_argument('--symbols', nargs='+', help="Restrict the universe")
+    backtest.add_argument('--risk-free-rate', type=float, default=0.02)
+    backtest.add_argument('--workers',
+                          type=int,
+                          help="Worker processes (default: one per core)")
+    backtest.add_argument('--output',
+                          help="Write all results (.csv, .parquet or .json)")
+    backtest.set_defaults(handler=backtest_command)
+
+    record = subparsers.add_parser(
+        'record',
+        help="Fetch quotes on an interval, with news and FX rates, and append "
+        "every response to a recording for replay")
+    record.add_argument('output', help="Recording file (JSON lines)")
+    record.add_argument('--interval',
+                        type=float,
+                        default=300,
+                        help="Seconds between quotes fetches")
+    record.add_argument('--count',
+                        type=int,
+                        default=288,
+                        help="Quotes fetches to record (default: a day at 5 min)")
+    record.add_argument('--news-interval',
+                        type=float,
+                        default=900,
+                        help="Seconds between news fetches")
+    record.add_argument('--fx-interval',
+                        type=float,
+                        default=3600,
+                        help="Seconds between FX rate fetches")
+    record.add_argument('--category',
+                        default='All',
+                        choices=['All', 'Web3', 'Web3 Gaming'],
+                        help="Project category to record")
+    record.add_argument('--base-url',
+                        help="CoinMarketCap API base URL, e.g. a local "
+                        "mock_upstream.py (default: $CMC_BASE_URL)")
+    record.set_defaults(handler=record_command)
+
+    replay = subparsers.add_parser(
+        'replay',
+        help="Step through a recording as fast as the refresh path allows and "
+        "report its throughput, with a digest of every snapshot built")
+    replay.add_argument('recording', help="Recording made by the record command")
+    replay.add_argument('--category',
+                        default='All',
+                        choices=['All', 'Web3', 'Web3 Gaming'],
+                        help="Project category to replay")
+    replay.set_defaults(handler=replay_command)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
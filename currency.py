@@ -0,0 +1,164 @@
+"""
+Display currencies for the dashboard
+Market data is fetched once in USD; a small FX table of USD cross rates is refreshed
+rarely in the background, and money columns are converted with one vectorized
+multiply at render time, so switching currency never calls the quotes endpoint
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BASE_CURRENCY_CODE = 'USD'
+
+CURRENCY_SYMBOLS = {
+    'USD': '$',
+    'EUR': '€',
+    'GBP': '£',
+    'JPY': '¥',
+    'BTC': '₿',
+    'ETH': 'Ξ'
+}
+
+CRYPTO_CURRENCIES = ('BTC', 'ETH')
+
+SUPPORTED_CURRENCIES = tuple(CURRENCY_SYMBOLS)
+
+# Snapshot columns denominated in the base currency
+MONEY_COLUMNS = ('price', 'market_cap', 'volume_24h', 'revenue_per_user',
+                 'mcap_dau_ratio')
+
+
+@dataclass(frozen=True)
+class DisplayCurrency:
+    """A currency to show money columns in, with its rate per 1 USD"""
+    code: str = BASE_CURRENCY_CODE
+    rate: float = 1.0
+
+    @property
+    def symbol(self) -> str:
+        return CURRENCY_SYMBOLS.get(self.code, self.code + ' ')
+
+    @property
+    def is_base(self) -> bool:
+        return self.code == BASE_CURRENCY_CODE
+
+    @property
+    def amount_decimals(self) -> int:
+        # Per-user amounts in BTC or ETH are tiny
+        return 8 if self.code in CRYPTO_CURRENCIES else 2
+
+    @property
+    def price_decimals(self) -> int:
+        return 8 if self.code in CRYPTO_CURRENCIES else 4
+
+    def convert(self, values):
+        """
+        Convert USD values (scalar, array or Series) into this currency
+        """
+        return values if self.is_base else values * self.rate
+
+    def convert_frame(self,
+                      frame: pd.DataFrame,
+                      columns: Sequence[str] = MONEY_COLUMNS) -> pd.DataFrame:
+        """
+        Return frame with its money columns converted; other columns are shared
+        """
+        present = [column for column in columns if column in frame.columns]
+        if self.is_base or not present:
+            return frame
+        return frame.assign(
+            **{column: frame[column] * self.rate
+               for column in present})
+
+    def hover(self, spec: str) -> str:
+        """
+        Plotly hover format for a money value; d3's '$' only knows dollars
+        """
+        return f":${spec}" if self.is_base else f":{spec}"
+
+    def label(self, text: str) -> str:
+        return f"{text} ({self.symbol})"
+
+    def format(self, value: float, decimals: Optional[int] = None) -> str:
+        decimals = self.amount_decimals if decimals is None else decimals
+        return f"{self.symbol}{value:,.{decimals}f}"
+
+
+BASE_CURRENCY = DisplayCurrency()
+
+
+class FxTable:
+    """
+    USD cross rates, refreshed in the background at most once per ttl
+
+    The table starts with USD only; other currencies become available once
+    the first background fetch succeeds, so no viewer ever waits on it.
+    """
+
+    def __init__(self,
+                 fetcher,
+                 currencies: Sequence[str] = SUPPORTED_CURRENCIES,
+                 ttl: float = 3600,
+                 retry_interval: float = 60):
+        self.fetcher = fetcher
+        self.currencies = [c for c in currencies if c != BASE_CURRENCY_CODE]
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.fetched_at: Optional[datetime] = None
+        self.last_error = None
+        self._rates: Dict[str, float] = {BASE_CURRENCY_CODE: 1.0}
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def rates(self) -> Dict[str, float]:
+        """
+        Current rates per 1 USD; starts a background refresh when due
+        """
+        if self.fetcher.clock.monotonic() >= self._next_refresh:
+            self.refresh()
+        return self._rates
+
+    def currency(self, code: str) -> DisplayCurrency:
+        """
+        DisplayCurrency for code, or USD if its rate is not available
+        """
+        rate = self.rates().get(code)
+        if rate is None:
+            return BASE_CURRENCY
+        return DisplayCurrency(code, rate)
+
+    def refresh(self) -> bool:
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self._refresh_worker,
+                         name="fx-refresh",
+                         daemon=True).start()
+        return True
+
+    def _refresh_worker(self):
+        try:
+            result = self.fetcher.fetch_fx_rates(self.currencies)
+            self.last_error = result.error
+            if result.data:
+                # Keep previously known rates for currencies that failed
+                self._rates = {**self._rates, **result.data}
+                self.fetched_at = self.fetcher.clock.now()
+            complete = result.ok and len(result.data) == len(self.currencies)
+            self._next_refresh = self.fetcher.clock.monotonic() + (
+                self.ttl if complete else self.retry_interval)
+        except Exception:
+            logger.exception("FX rate refresh failed")
+            self._next_refresh = (self.fetcher.clock.monotonic() +
+                                  self.retry_interval)
+        finally:
+            with self._lock:
+                self._refreshing = False
@@ -1,24 +1,119 @@
-import requests
+import logging
 import os
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-import streamlit as st
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from clock import SYSTEM_CLOCK, Clock
+from instrumentation import tracer
+from quotes import LISTING_DTYPE, QuoteTable, parse_timestamp
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+# CoinMarketCap id of the US dollar, the base of every conversion
+USD_CMC_ID = 2781
+
+# Point it at a local stand-in (see mock_upstream.py) for tests and backfill dry runs
+DEFAULT_CMC_BASE_URL = os.getenv("CMC_BASE_URL",
+                                 "https://pro-api.coinmarketcap.com/v1")
+
+# Historical quote intervals and the spacing of their data points
+HISTORICAL_INTERVALS = {
+    '5m': timedelta(minutes=5),
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1)
+}
+
+
+@dataclass
+class FetchError:
+    """A failed upstream call, reported to the caller instead of the UI"""
+    source: str
+    message: str
+    status_code: Optional[int] = None
+
+
+@dataclass
+class FetchResult:
+    """Data returned by an upstream call, plus the error if it failed"""
+    data: Any
+    error: Optional[FetchError] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
 
 class DataFetcher:
-    def __init__(self):
+    def __init__(self, clock: Optional[Clock] = None):
         self.cmc_api_key = "d073cbe0-a085-4d6f-8d8d-b3cf0ef9d7e3"
         self.news_api_key = os.getenv("NEWS_API_KEY", "")
         
-        self.cmc_base_url = "https://pro-api.coinmarketcap.com/v1"
+        self.cmc_base_url = DEFAULT_CMC_BASE_URL
         self.news_base_url = "https://newsapi.org/v2"
         
         self.headers_cmc = {
             'Accepts': 'application/json',
             'X-CMC_PRO_API_KEY': self.cmc_api_key,
         }
+        
+        # Seconds before an upstream request is abandoned
+        self.timeout = 10
+        # One circuit breaker per endpoint, shared by every caller of this fetcher
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # Source of "now" for request windows and placeholder timestamps
+        self.clock = clock or SYSTEM_CLOCK
+    
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers.setdefault(
+                endpoint, CircuitBreaker(endpoint, clock=self.clock))
+        return breaker
+    
+    def _request(self, endpoint: str, url: str, **kwargs) -> 'requests.Response':
+        """
+        GET an upstream endpoint through its circuit breaker, recording latency
+        
+        Raises CircuitOpenError without calling the endpoint while its breaker
+        is open. Network errors and non-2xx responses count as failures.
+        """
+        # Imported on first use: requests is slow to import and only needed
+        # once a fetch actually runs
+        import requests
+        
+        breaker = self._breaker(endpoint)
+        breaker.before_call()
+        
+        start = time.perf_counter()
+        status = 'error'
+        succeeded = False
+        try:
+            response = requests.get(url, timeout=self.timeout, **kwargs)
+            status = response.status_code
+            succeeded = response.ok
+            return response
+        finally:
+            tracer.observe('upstream_latency_seconds',
+                           time.perf_counter() - start, endpoint=endpoint)
+            tracer.inc('upstream_requests_total', endpoint=endpoint, status=status)
+            if succeeded:
+                breaker.record_success()
+            elif breaker.record_failure():
+                tracer.inc('circuit_opened_total', endpoint=endpoint)
+                logger.warning(f"Circuit opened for {endpoint} after "
+                               f"{breaker.failures} failures")
     
-    def get_market_data(self, symbols: List[str]) -> Dict:
+    def fetch_market_data(self, symbols: List[str]) -> FetchResult:
         """Fetch market data for given cryptocurrency symbols from CoinMarketCap"""
+        import requests
+        
         try:
             # Convert symbols to comma-separated string
             symbol_string = ','.join(symbols)
@@ -29,43 +124,61 @@ class DataFetcher:
                 'convert': 'USD'
             }
             
-            response = requests.get(url, headers=self.headers_cmc, params=parameters)
+            response = self._request('quotes/latest', url,
+                                     headers=self.headers_cmc, params=parameters)
             
             if response.status_code == 200:
-                data = response.json()
-                market_data = {}
+                with tracer.span('fetch.parse', endpoint='quotes/latest'):
+                    market_data = self._parse_quotes(response.json())
                 
-                if 'data' in data:
-                    for symbol, info in data['data'].items():
-                        quote = info['quote']['USD']
-                        market_data[symbol] = {
-                            'name': info['name'],
-                            'symbol': info['symbol'],
-                            'price': quote['price'],
-                            'market_cap': quote['market_cap'] or 0,
-                            'volume_24h': quote['volume_24h'] or 0,
-                            'percent_change_1h': quote['percent_change_1h'] or 0,
-                            'percent_change_24h': quote['percent_change_24h'] or 0,
-                            'percent_change_7d': quote['percent_change_7d'] or 0,
-                            'circulating_supply': info['circulating_supply'] or 0,
-                            'total_supply': info['total_supply'] or 0,
-                            'max_supply': info['max_supply'],
-                            'last_updated': quote['last_updated']
-                        }
-                
-                return market_data
+                return FetchResult(market_data)
             else:
-                st.error(f"CoinMarketCap API Error: {response.status_code}")
-                return {}
+                return FetchResult({}, FetchError(
+                    'quotes/latest',
+                    f"CoinMarketCap API Error: {response.status_code}",
+                    response.status_code))
                 
+        except CircuitOpenError as e:
+            return FetchResult({}, FetchError('quotes/latest', f"CoinMarketCap {e}"))
         except requests.exceptions.RequestException as e:
-            st.error(f"Network error fetching market data: {str(e)}")
-            return {}
+            return FetchResult({}, FetchError(
+                'quotes/latest', f"Network error fetching market data: {str(e)}"))
         except Exception as e:
-            st.error(f"Error processing market data: {str(e)}")
-            return {}
+            return FetchResult({}, FetchError(
+                'quotes/latest', f"Error processing market data: {str(e)}"))
+    
+    @staticmethod
+    def _parse_quotes(data: Dict) -> QuoteTable:
+        """Flatten a quotes/latest response into one compact row per symbol"""
+        rows = []
+        for symbol, info in data.get('data', {}).items():
+            quote = info['quote']['USD']
+            # Field order of quotes.QUOTE_DTYPE
+            rows.append((
+                info['symbol'],
+                info['name'],
+                quote['price'],
+                quote['market_cap'] or 0,
+                quote['volume_24h'] or 0,
+                quote['percent_change_1h'] or 0,
+                quote['percent_change_24h'] or 0,
+                quote['percent_change_7d'] or 0,
+                info['circulating_supply'] or 0,
+                info['total_supply'] or 0,
+                info['max_supply'],
+                parse_timestamp(quote['last_updated'])
+            ))
+        
+        return QuoteTable.from_rows(rows)
     
-    def get_top_cryptocurrencies(self, limit: int = 100) -> List[Dict]:
+    def get_market_data(self, symbols: List[str]) -> QuoteTable:
+        """Fetch market data for given symbols; errors are logged and yield {}"""
+        result = self.fetch_market_data(symbols)
+        if not result.ok:
+            logger.error(result.error.message)
+        return result.data
+    
+    def fetch_top_cryptocurrencies(self, limit: int = 100) -> FetchResult:
         """Fetch top cryptocurrencies by market cap"""
         try:
             url = f"{self.cmc_base_url}/cryptocurrency/listings/latest"
@@ -75,34 +188,133 @@ class DataFetcher:
                 'convert': 'USD'
             }
             
-            response = requests.get(url, headers=self.headers_cmc, params=parameters)
+            response = self._request('listings/latest', url,
+                                     headers=self.headers_cmc, params=parameters)
             
             if response.status_code == 200:
                 data = response.json()
-                cryptocurrencies = []
+                rows = []
                 
                 for crypto in data['data']:
                     quote = crypto['quote']['USD']
-                    cryptocurrencies.append({
-                        'id': crypto['id'],
-                        'name': crypto['name'],
-                        'symbol': crypto['symbol'],
-                        'price': quote['price'],
-                        'market_cap': quote['market_cap'] or 0,
-                        'volume_24h': quote['volume_24h'] or 0,
-                        'percent_change_24h': quote['percent_change_24h'] or 0,
-                        'circulating_supply': crypto['circulating_supply'] or 0,
-                        'cmc_rank': crypto['cmc_rank']
-                    })
+                    # Field order of quotes.LISTING_DTYPE
+                    rows.append((
+                        crypto['id'],
+                        crypto['symbol'],
+                        crypto['name'],
+                        quote['price'],
+                        quote['market_cap'] or 0,
+                        quote['volume_24h'] or 0,
+                        quote['percent_change_24h'] or 0,
+                        crypto['circulating_supply'] or 0,
+                        crypto['cmc_rank']
+                    ))
                 
-                return cryptocurrencies
+                return FetchResult(QuoteTable.from_rows(rows, LISTING_DTYPE))
             else:
-                st.error(f"CoinMarketCap API Error: {response.status_code}")
-                return []
+                return FetchResult({}, FetchError(
+                    'listings/latest',
+                    f"CoinMarketCap API Error: {response.status_code}",
+                    response.status_code))
                 
+        except CircuitOpenError as e:
+            return FetchResult({}, FetchError('listings/latest', f"CoinMarketCap {e}"))
         except Exception as e:
-            st.error(f"Error fetching top cryptocurrencies: {str(e)}")
-            return []
+            return FetchResult({}, FetchError(
+                'listings/latest', f"Error fetching top cryptocurrencies: {str(e)}"))
+    
+    def get_top_cryptocurrencies(self, limit: int = 100) -> QuoteTable:
+        """Fetch top cryptocurrencies by market cap, in rank order; errors are logged and yield {}"""
+        result = self.fetch_top_cryptocurrencies(limit)
+        if not result.ok:
+            logger.error(result.error.message)
+        return result.data
+    
+    def fetch_fx_rates(self, currencies: List[str]) -> FetchResult:
+        """Fetch how much of each currency 1 USD buys, one conversion per currency"""
+        rates = {}
+        error = None
+        url = f"{self.cmc_base_url}/tools/price-conversion"
+        for currency in currencies:
+            try:
+                parameters = {
+                    'amount': 1,
+                    'id': USD_CMC_ID,
+                    'convert': currency
+                }
+                response = self._request('tools/price-conversion', url,
+                                         headers=self.headers_cmc, params=parameters)
+                if response.status_code == 200:
+                    rates[currency] = float(
+                        response.json()['data']['quote'][currency]['price'])
+                else:
+                    error = FetchError(
+                        'tools/price-conversion',
+                        f"CoinMarketCap API Error: {response.status_code}",
+                        response.status_code)
+            except CircuitOpenError as e:
+                return FetchResult(rates, FetchError('tools/price-conversion',
+                                                     f"CoinMarketCap {e}"))
+            except Exception as e:
+                error = FetchError('tools/price-conversion',
+                                   f"Error fetching {currency} rate: {str(e)}")
+        return FetchResult(rates, error)
+    
+    def fetch_historical_quotes(self, symbol: str, time_start: datetime,
+                                time_end: datetime,
+                                interval: str = 'daily') -> FetchResult:
+        """Fetch USD quotes for one symbol at interval spacing in [time_start, time_end)"""
+        try:
+            url = f"{self.cmc_base_url}/cryptocurrency/quotes/historical"
+            parameters = {
+                'symbol': symbol,
+                'time_start': time_start.isoformat(),
+                # The endpoint's range is inclusive; stop short of the next unit
+                'time_end': (time_end - timedelta(seconds=1)).isoformat(),
+                'interval': interval,
+                'count': 10000,
+                'convert': 'USD'
+            }
+            
+            response = self._request('quotes/historical', url,
+                                     headers=self.headers_cmc, params=parameters)
+            
+            if response.status_code == 200:
+                with tracer.span('fetch.parse', endpoint='quotes/historical'):
+                    quotes = self._parse_historical_quotes(response.json())
+                return FetchResult(quotes)
+            else:
+                return FetchResult([], FetchError(
+                    'quotes/historical',
+                    f"CoinMarketCap API Error: {response.status_code}",
+                    response.status_code))
+                
+        except CircuitOpenError as e:
+            return FetchResult([], FetchError('quotes/historical', f"CoinMarketCap {e}"))
+        except Exception as e:
+            return FetchResult([], FetchError(
+                'quotes/historical',
+                f"Error fetching {symbol} history: {str(e)}"))
+    
+    @staticmethod
+    def _parse_historical_quotes(data: Dict) -> List[Dict]:
+        """Flatten a quotes/historical response into timestamped USD rows"""
+        payload = data.get('data') or {}
+        if 'quotes' not in payload:
+            # v2 responses are keyed by symbol, with one entry per matching coin
+            entries = next(iter(payload.values()), [])
+            payload = entries[0] if isinstance(entries, list) and entries else entries or {}
+        
+        rows = []
+        for item in payload.get('quotes', []):
+            quote = item['quote']['USD']
+            rows.append({
+                'timestamp': item['timestamp'],
+                'price': quote['price'],
+                'volume_24h': quote.get('volume_24h') or 0,
+                'market_cap': quote.get('market_cap') or 0
+            })
+        return rows
     
     def get_web3_news(self) -> List[Dict]:
         """Fetch Web3 and blockchain related news"""
@@ -115,7 +327,7 @@ class DataFetcher:
                 return self._get_alternative_news()
                 
         except Exception as e:
-            st.error(f"Error fetching news: {str(e)}")
+            logger.error(f"Error fetching news: {str(e)}")
             return []
     
     def _get_newsapi_articles(self) -> List[Dict]:
@@ -127,11 +339,11 @@ class DataFetcher:
                 'language': 'en',
                 'sortBy': 'publishedAt',
                 'pageSize': 20,
-                'from': (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d'),
+                'from': (self.clock.now() - timedelta(days=7)).strftime('%Y-%m-%d'),
                 'apiKey': self.news_api_key
             }
             
-            response = requests.get(url, params=params)
+            response = self._request('newsapi/everything', url, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -153,26 +365,42 @@ class DataFetcher:
         except Exception as e:
             return []
     
+    def get_news_from_all_sources(self) -> List[Dict]:
+        """Fetch articles from every configured news source, for the news store"""
+        articles = []
+        if self.news_api_key:
+            articles.extend(self._get_newsapi_articles())
+        try:
+            articles.extend(self._get_rss_articles())
+        except Exception:
+            pass
+        return articles
+    
+    def _get_rss_articles(self) -> List[Dict]:
+        """Fetch articles from the CoinDesk RSS feed"""
+        import feedparser
+        
+        feed_url = "https://www.coindesk.com/arc/outboundfeeds/rss/"
+        with tracer.span('fetch.rss'):
+            feed = feedparser.parse(feed_url)
+        
+        articles = []
+        for entry in feed.entries[:10]:
+            articles.append({
+                'title': entry.title,
+                'description': entry.get('summary', ''),
+                'url': entry.link,
+                'source': 'CoinDesk',
+                'published_at': entry.get('published', '')
+            })
+        
+        return articles
+    
     def _get_alternative_news(self) -> List[Dict]:
         """Fallback news source when NewsAPI is not available"""
         try:
             # Using CoinDesk RSS feed as alternative
-            import feedparser
-            
-            feed_url = "https://www.coindesk.com/arc/outboundfeeds/rss/"
-            feed = feedparser.parse(feed_url)
-            
-            articles = []
-            for entry in feed.entries[:10]:
-                articles.append({
-                    'title': entry.title,
-                    'description': entry.get('summary', ''),
-                    'url': entry.link,
-                    'source': 'CoinDesk',
-                    'published_at': entry.get('published', '')
-                })
-            
-            return articles
+            return self._get_rss_articles()
             
         except ImportError:
             # If feedparser is not available, return sample structure
@@ -182,7 +410,7 @@ class DataFetcher:
                     'description': 'Please configure NEWS_API_KEY environment variable for live news feed.',
                     'url': '#',
                     'source': 'System',
-                    'published_at': datetime.now().isoformat()
+                    'published_at': self.clock.now().isoformat()
                 }
             ]
         except Exception:
@@ -196,7 +424,8 @@ class DataFetcher:
                 'symbol': ','.join(symbols)
             }
             
-            response = requests.get(url, headers=self.headers_cmc, params=parameters)
+            response = self._request('cryptocurrency/info', url,
+                                     headers=self.headers_cmc, params=parameters)
             
             if response.status_code == 200:
                 data = response.json()
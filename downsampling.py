@@ -0,0 +1,178 @@
+"""
+Point reduction for large charts
+Keeps chart payloads small while preserving the visual shape of the data
+"""
+from datetime import timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# OHLCV rollup resolutions, finest first, with their pandas resample rules
+ROLLUP_RESOLUTIONS: Dict[str, timedelta] = {
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+    '1w': timedelta(weeks=1)
+}
+
+_RESAMPLE_RULES = {'1h': '1h', '1d': '1D', '1w': '1W-MON'}
+
+# A level is used when its points in range are within this multiple of the
+# budget; the excess is then reduced shape-preserving instead of rolled up
+RESOLUTION_OVERSAMPLE = 4
+
+
+def decimate_scatter(x: np.ndarray,
+                     y: np.ndarray,
+                     max_points: int = 5000,
+                     log_x: bool = False,
+                     log_y: bool = False,
+                     weights: Optional[np.ndarray] = None,
+                     outlier_quantile: float = 0.005) -> np.ndarray:
+    """
+    Reduce a scatter to at most about max_points by grid binning
+
+    Points outside the [q, 1 - q] quantile range on either axis are always
+    kept. The remaining points are binned on a regular grid in display space
+    (log10 for log axes), and each occupied cell keeps its heaviest point, or
+    its first point if no weights are given. Returns sorted row positions.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    positions = np.arange(len(x))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if log_x:
+            x = np.log10(np.where(x > 0, x, np.nan))
+        if log_y:
+            y = np.log10(np.where(y > 0, y, np.nan))
+
+    # Points that cannot be drawn on these axes are dropped
+    finite = np.isfinite(x) & np.isfinite(y)
+    positions, x, y = positions[finite], x[finite], y[finite]
+    if len(positions) <= max_points:
+        return positions
+
+    lo_x, hi_x = np.quantile(x, [outlier_quantile, 1 - outlier_quantile])
+    lo_y, hi_y = np.quantile(y, [outlier_quantile, 1 - outlier_quantile])
+    outlier = (x < lo_x) | (x > hi_x) | (y < lo_y) | (y > hi_y)
+
+    budget = max(max_points - int(outlier.sum()), 1)
+    grid = max(int(np.sqrt(budget)), 1)
+    ix = np.clip(((x - lo_x) / max(hi_x - lo_x, 1e-12) * grid).astype(int), 0,
+                 grid - 1)
+    iy = np.clip(((y - lo_y) / max(hi_y - lo_y, 1e-12) * grid).astype(int), 0,
+                 grid - 1)
+    cells = ix * grid + iy
+
+    inliers = np.flatnonzero(~outlier)
+    if weights is not None:
+        w = np.nan_to_num(np.asarray(weights, dtype=float)[finite][inliers],
+                          nan=-np.inf)
+        order = np.lexsort((-w, cells[inliers]))
+    else:
+        order = np.argsort(cells[inliers], kind='stable')
+    _, first = np.unique(cells[inliers][order], return_index=True)
+    representatives = inliers[order[first]]
+
+    keep = np.concatenate([np.flatnonzero(outlier), representatives])
+    return np.sort(positions[keep])
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int = 2000) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets reduction of a line to max_points
+
+    Keeps the first and last points and, from each of max_points - 2 equal
+    buckets in between, the point forming the largest triangle with the point
+    kept before it and the mean of the next bucket. x must be sorted. Returns
+    sorted row positions.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    # Means of every bucket, used as the third vertex of the previous one
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - mean_x[bucket]) * (y[lo:hi] - ay) -
+                      (ax - x[lo:hi]) * (mean_y[bucket] - ay))
+        previous = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        keep[bucket + 1] = previous
+    return keep
+
+
+def minmax_buckets(y: np.ndarray, max_points: int = 2000) -> np.ndarray:
+    """
+    Keep the minimum and maximum of (max_points - 2) // 2 equal-count buckets
+
+    Every spike survives, which suits volume bars and volatile ranges; the
+    first and last points are always kept. Returns sorted row positions.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    buckets = max((max_points - 2) // 2, 1)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    rows = padded.reshape(buckets, size)
+    # All-NaN buckets (only possible at the padded end) keep their first row
+    filled = ~np.isnan(rows).all(axis=1)
+    low = np.zeros(buckets, dtype=np.int64)
+    high = np.zeros(buckets, dtype=np.int64)
+    low[filled] = np.nanargmin(rows[filled], axis=1)
+    high[filled] = np.nanargmax(rows[filled], axis=1)
+    starts = np.arange(buckets) * size
+    keep = np.concatenate([[0, n - 1], starts + low, starts + high])
+    return np.unique(keep[keep < n])
+
+
+def rollup_ohlcv(frame: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """
+    OHLCV bars from a (timestamp, price, volume_24h) series of one symbol
+
+    Volume is the mean rolling 24h volume in the bar scaled to the bar length,
+    i.e. an estimate of what traded within it.
+    """
+    series = frame.set_index('timestamp')
+    resampled = series.resample(_RESAMPLE_RULES[resolution],
+                                label='left',
+                                closed='left')
+    bars = resampled['price'].ohlc()
+    scale = ROLLUP_RESOLUTIONS[resolution] / timedelta(days=1)
+    bars['volume'] = resampled['volume_24h'].mean() * scale
+    return bars.dropna(subset=['close']).reset_index()
+
+
+def pick_resolution(span: timedelta,
+                    raw_step: Optional[timedelta],
+                    max_points: int = 2000) -> str:
+    """
+    Finest level ('raw' or a rollup) that draws span in about max_points
+
+    Levels no coarser than the raw spacing are skipped, and a level is taken
+    once it needs at most RESOLUTION_OVERSAMPLE times the budget.
+    """
+    limit = max_points * RESOLUTION_OVERSAMPLE
+    if raw_step is None or span / raw_step <= limit:
+        return 'raw'
+    for resolution, step in ROLLUP_RESOLUTIONS.items():
+        if step > raw_step and span / step <= limit:
+            return resolution
+    return list(ROLLUP_RESOLUTIONS)[-1]
@@ -0,0 +1,266 @@
+"""
+Zero-copy filter views over a project snapshot
+Selections are boolean masks over one immutable frame; rows and columns are only
+materialized when a chart or table actually needs them
+"""
+import operator
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from aggregates import AGGREGATED_CONDITIONS, CategoryAggregates
+from ranking import RankIndex
+
+# Bound on masks kept per snapshot (search terms are user input)
+MAX_CACHED_MASKS = 256
+
+COMPARISONS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+
+def _mask_columns(key: Tuple) -> Tuple[str, ...]:
+    """
+    Columns a cached mask was computed from
+    """
+    if key[0] == 'category':
+        return ('category', )
+    if key[0] == 'search':
+        return ('name', 'symbol')
+    if key[0] == 'compare':
+        return (key[1], )
+    return ()
+
+
+class FilterIndex:
+    """
+    Cache of read-only selection masks over one snapshot frame
+
+    Built once per snapshot and shared by every session; the frame must not
+    be modified after the index is created.
+    """
+
+    def __init__(self,
+                 frame: pd.DataFrame,
+                 ranks: Optional[RankIndex] = None,
+                 aggregates: Optional[CategoryAggregates] = None):
+        self.frame = frame
+        self.ranks = ranks if ranks is not None else RankIndex(frame)
+        # Identifies this snapshot in cache keys without hashing the frame
+        self.key = uuid.uuid4().hex
+        self._masks: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._symbol_positions: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+        # Card counts per category, answered without touching the rows
+        self.aggregates = aggregates
+        if aggregates is None and 'category' in frame.columns:
+            self.aggregates = CategoryAggregates(
+                frame['category'], self._condition_masks(AGGREGATED_CONDITIONS))
+
+    def _condition_masks(self, conditions) -> Dict[Hashable, np.ndarray]:
+        return {('compare', ) + tuple(condition): self.compare_mask(*condition)
+                for condition in conditions if condition[0] in self.frame.columns}
+
+    def derive(self, frame: pd.DataFrame,
+               changed: Iterable[str]) -> 'FilterIndex':
+        """
+        Index for a new version of the frame that differs only in the changed
+        columns
+
+        Masks and rank orders over unchanged columns carry over, so a streamed
+        price update does not rebuild category or search masks; the category
+        aggregates are adjusted by the rows whose card conditions flipped.
+        """
+        changed = set(changed)
+        carried = self.aggregates is not None and 'category' not in changed
+        index = FilterIndex(frame, self.ranks.derive(frame, changed),
+                            self.aggregates if carried else None)
+        with self._lock:
+            index._masks = OrderedDict(
+                (key, mask) for key, mask in self._masks.items()
+                if not changed & set(_mask_columns(key)))
+            if 'symbol' not in changed:
+                index._symbol_positions = self._symbol_positions
+        if carried:
+            index.aggregates = self.aggregates.derive(
+                index._condition_masks(key[1:]
+                                       for key in self.aggregates.conditions
+                                       if key[1] in changed))
+        return index
+
+    def _cached_mask(self, key: Hashable,
+                     build: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+
+        mask = np.asarray(build(), dtype=bool)
+        mask.flags.writeable = False
+        with self._lock:
+            self._masks[key] = mask
+            if len(self._masks) > MAX_CACHED_MASKS:
+                self._masks.popitem(last=False)
+        return mask
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the cached masks and rank orders, beyond the frame"""
+        with self._lock:
+            masks = sum(mask.nbytes for mask in self._masks.values())
+        return masks + self.ranks.nbytes
+
+    def lookup(self, symbols: Iterable[str]) -> np.ndarray:
+        """
+        Row position of each symbol, -1 where the snapshot has no such row
+        """
+        if self._symbol_positions is None:
+            self._symbol_positions = {
+                symbol: i
+                for i, symbol in enumerate(self.frame['symbol'])
+            }
+        get = self._symbol_positions.get
+        return np.fromiter((get(s, -1) for s in symbols), dtype=np.intp)
+
+    def category_mask(self, category: str) -> np.ndarray:
+        return self._cached_mask(
+            ('category', category),
+            lambda: (self.frame['category'] == category).to_numpy())
+
+    def search_mask(self, term: str) -> np.ndarray:
+        term = term.strip().lower()
+        return self._cached_mask(
+            ('search', term), lambda:
+            (self.frame['name'].str.lower().str.contains(term, regex=False, na=False)
+             | self.frame['symbol'].str.lower().str.contains(
+                 term, regex=False, na=False)).to_numpy())
+
+    def compare_mask(self, column: str, op: str, value: float) -> np.ndarray:
+        return self._cached_mask(
+            ('compare', column, op, value), lambda: COMPARISONS[op](
+                self.frame[column].to_numpy(dtype=float, na_value=np.nan),
+                value))
+
+    def view(self) -> 'FilterView':
+        """
+        Return a view selecting every row of the snapshot
+        """
+        mask = self._cached_mask(('all', ),
+                                 lambda: np.ones(len(self.frame), dtype=bool))
+        return FilterView(self, mask)
+
+
+class FilterView:
+    """
+    A selection over a snapshot, represented by a composed boolean mask
+
+    Views are cheap to derive from each other; key identifies the selection
+    so results built from a view can be cached.
+    """
+
+    def __init__(self,
+                 index: FilterIndex,
+                 mask: np.ndarray,
+                 key: Tuple[Hashable, ...] = ()):
+        self.index = index
+        self.mask = mask
+        self.key = key
+        self._positions: Optional[np.ndarray] = None
+
+    def _narrow(self, key: Hashable, mask: np.ndarray) -> 'FilterView':
+        return FilterView(self.index, self.mask & mask, self.key + (key, ))
+
+    @property
+    def _aggregated_category(self) -> Optional[str]:
+        """
+        The category this view selects, "All" for every row, or None when other
+        filters apply and counts must come from the mask
+        """
+        if self.index.aggregates is None:
+            return None
+        if not self.key:
+            return "All"
+        if len(self.key) == 1 and self.key[0][0] == 'category':
+            return self.key[0][1]
+        return None
+
+    def category(self, category: str) -> 'FilterView':
+        if category == "All":
+            return self
+        return self._narrow(('category', category),
+                            self.index.category_mask(category))
+
+    def search(self, term: str) -> 'FilterView':
+        if not term or not term.strip():
+            return self
+        return self._narrow(('search', term.strip().lower()),
+                            self.index.search_mask(term))
+
+    def where(self, column: str, op: str, value: float) -> 'FilterView':
+        return self._narrow(('compare', column, op, value),
+                            self.index.compare_mask(column, op, value))
+
+    @property
+    def positions(self) -> np.ndarray:
+        if self._positions is None:
+            self._positions = np.flatnonzero(self.mask)
+        return self._positions
+
+    def __len__(self) -> int:
+        category = self._aggregated_category
+        if category is not None and self._positions is None:
+            return self.index.aggregates.rows(category)
+        return len(self.positions)
+
+    def count(self, column: str, op: str, value: float) -> int:
+        """
+        Count selected rows matching a comparison without materializing them
+
+        Card conditions over a category selection are read from the snapshot
+        aggregates.
+        """
+        category = self._aggregated_category
+        if category is not None:
+            count = self.index.aggregates.count(('compare', column, op, value),
+                                                category)
+            if count is not None:
+                return count
+        return int(
+            np.count_nonzero(self.mask
+                             & self.index.compare_mask(column, op, value)))
+
+    def column(self, name: str) -> pd.Series:
+        return self.index.frame[name].take(self.positions)
+
+    def frame_for(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Materialize the selected rows, restricted to the given columns
+        """
+        frame = self.index.frame
+        if columns is None:
+            return frame.take(self.positions)
+        return frame.iloc[self.positions, frame.columns.get_indexer(columns)]
+
+    def value_counts(self, column: str) -> pd.Series:
+        category = self._aggregated_category
+        if column == 'category' and category is not None:
+            return self.index.aggregates.category_counts(category)
+        counts = self.column(column).value_counts()
+        # Categoricals also count categories with no selected rows
+        return counts[counts > 0]
+
+    def nlargest(self,
+                 n: int,
+                 metric: str,
+                 above: Optional[float] = None) -> pd.DataFrame:
+        return self.index.ranks.nlargest(n, metric, self.mask, above)
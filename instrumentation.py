@@ -0,0 +1,287 @@
+"""
+Lightweight timing spans, counters and latency histograms for the dashboard hot paths
+Tracing is off unless DASHBOARD_TRACING=1 is set or it is switched on at runtime;
+when off, span() returns a shared no-op context manager
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    body = ','.join(f'{k}="{v}"' for k, v in pairs)
+    return '{' + body + '}'
+
+
+class Histogram:
+    """Cumulative latency histogram with Prometheus-style buckets"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class _NullSpan:
+    """Shared no-op span used while tracing is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'labels', 'start')
+
+    def __init__(self, tracer: 'Tracer', name: str, labels: Dict[str, object]):
+        self.tracer = tracer
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        self.tracer._record_span(self.name, self.labels, duration, self.start)
+        return False
+
+
+class Tracer:
+    """
+    Process-wide collector of spans, counters and histograms
+
+    Spans feed the 'span_duration_seconds' histogram labelled by span name;
+    observe() records other latencies (e.g. upstream requests) directly.
+    """
+
+    def __init__(self, enabled: bool = False, recent_capacity: int = 1000):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self._recent: Deque[Dict] = deque(maxlen=recent_capacity)
+
+    def span(self, name: str, **labels):
+        """
+        Time a block: `with tracer.span("pipeline.metrics"): ...`
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def traced(self, name: str) -> Callable:
+        """
+        Decorator form of span()
+        """
+
+        def decorate(func):
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name, {}):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorate
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def _record_span(self, name: str, labels: Dict[str, object],
+                     duration: float, start: float):
+        self.observe('span_duration_seconds', duration, span=name, **labels)
+        with self._lock:
+            self._recent.append({
+                'span': name,
+                'labels': {k: str(v) for k, v in labels.items()},
+                'start': time.time() - (time.perf_counter() - start),
+                'duration': duration
+            })
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._recent.clear()
+
+    def counters(self) -> Dict[Tuple[str, LabelKey], float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def span_summary(self) -> List[Dict]:
+        """
+        Per-span count, total, mean and max duration, slowest total first
+        """
+        with self._lock:
+            rows = [{
+                'span': dict(labels).get('span', ''),
+                'labels': ', '.join(f"{k}={v}" for k, v in labels
+                                    if k != 'span'),
+                'count': h.count,
+                'total_ms': h.sum * 1000,
+                'mean_ms': h.sum / h.count * 1000 if h.count else 0.0,
+                'max_ms': h.max * 1000
+            } for (name, labels), h in self._histograms.items()
+                    if name == 'span_duration_seconds']
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def cache_summary(self) -> List[Dict]:
+        """
+        Calls, hits, misses and hit rate for every counted cache
+        """
+        calls: Dict[str, float] = {}
+        misses: Dict[str, float] = {}
+        for (name, labels), value in self.counters().items():
+            if name == 'cache_calls_total':
+                calls[dict(labels)['cache']] = value
+            elif name == 'cache_misses_total':
+                misses[dict(labels)['cache']] = value
+        rows = []
+        for cache in sorted(set(calls) | set(misses)):
+            total = int(calls.get(cache, 0))
+            missed = int(misses.get(cache, 0))
+            hits = max(total - missed, 0)
+            rows.append({
+                'cache': cache,
+                'calls': total,
+                'hits': hits,
+                'misses': missed,
+                'hit_rate': hits / total if total else 0.0
+            })
+        return rows
+
+    def to_prometheus(self, prefix: str = 'dashboard_') -> str:
+        """
+        Render counters and histograms in the Prometheus text exposition format
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(),
+                                key=lambda item: item[0])
+            lines = []
+            seen = set()
+            for (name, labels), value in counters:
+                if name not in seen:
+                    lines.append(f"# TYPE {prefix}{name} counter")
+                    seen.add(name)
+                lines.append(f"{prefix}{name}{_format_labels(labels)} {value:g}")
+            for (name, labels), h in histograms:
+                if name not in seen:
+                    lines.append(f"# TYPE {prefix}{name} histogram")
+                    seen.add(name)
+                for bound, count in zip(h.buckets, h.cumulative()):
+                    bucket_labels = _format_labels(labels, ('le', f"{bound:g}"))
+                    lines.append(f"{prefix}{name}_bucket{bucket_labels} {count}")
+                lines.append(f"{prefix}{name}_bucket"
+                             f"{_format_labels(labels, ('le', '+Inf'))} {h.count}")
+                lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {h.sum:g}")
+                lines.append(
+                    f"{prefix}{name}_count{_format_labels(labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+    def to_json_lines(self) -> str:
+        """
+        Recent spans followed by counter values, one JSON object per line
+        """
+        with self._lock:
+            records = [dict(record, type='span') for record in self._recent]
+            records += [{
+                'type': 'counter',
+                'name': name,
+                'labels': dict(labels),
+                'value': value
+            } for (name, labels), value in sorted(self._counters.items())]
+        return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+tracer = Tracer(enabled=os.getenv("DASHBOARD_TRACING", "") == "1")
+
+
+def counted_cache(name: str, cache_decorator: Callable) -> Callable:
+    """
+    Apply a caching decorator and count its calls and misses
+
+    `@counted_cache("load_table_page", st.cache_data(ttl=300))` records
+    cache_calls_total and cache_misses_total labelled with the cache name; the
+    wrapped function body only runs on a miss.
+    """
+
+    def decorate(func):
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            tracer.inc('cache_misses_total', cache=name)
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            tracer.inc('cache_calls_total', cache=name)
+            return cached(*args, **kwargs)
+
+        call.clear = getattr(cached, 'clear', None)
+        return call
+
+    return decorate
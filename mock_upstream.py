@@ -0,0 +1,282 @@
+"""
+Local stand-in for the CoinMarketCap endpoints the dashboard calls
+Serves deterministic quotes/latest, quotes/historical and tools/price-conversion
+responses, with optional latency, error rate and a calls-per-minute limit, so
+backfills, load tests and the app can run without the real API or its credits
+
+Usage:
+    python mock_upstream.py --port 8765
+    CMC_BASE_URL=http://127.0.0.1:8765/v1 python cli.py backfill history/ --start 2024-01-01
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from data_fetcher import HISTORICAL_INTERVALS
+
+# USD cross rates served by tools/price-conversion
+FX_RATES = {'EUR': 0.92, 'GBP': 0.79, 'JPY': 151.0, 'BTC': 1 / 65000,
+            'ETH': 1 / 3200}
+
+MAX_HISTORICAL_COUNT = 10000
+
+
+def _symbol_seed(symbol: str) -> int:
+    return zlib.crc32(symbol.encode('utf-8'))
+
+
+def synthetic_quote(symbol: str, at: datetime) -> Dict:
+    """
+    Deterministic USD quote for symbol at a time
+
+    Values are a smooth function of the timestamp, so any two windows that
+    cover the same instant agree and a resumed backfill matches a full one.
+    """
+    seed = _symbol_seed(symbol)
+    hours = at.timestamp() / 3600
+    phase = (seed % 1000) / 1000 * 2 * math.pi
+    base_price = 10 ** ((seed % 700) / 100 - 2)
+    wave = (0.35 * math.sin(hours / 900 + phase)
+            + 0.08 * math.sin(hours / 37 + 2 * phase)
+            + 0.02 * math.sin(hours / 3 + 3 * phase))
+    price = base_price * math.exp(wave)
+    supply = 10 ** (6 + (seed >> 10) % 400 / 100)
+    market_cap = price * supply
+    volume = market_cap * (0.02 + 0.015 * math.sin(hours / 11 + phase) ** 2)
+    return {'price': price, 'market_cap': market_cap, 'volume_24h': volume,
+            'supply': supply}
+
+
+def _iso(at: datetime) -> str:
+    return at.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def _parse_time(value: str) -> datetime:
+    if value.replace('.', '', 1).isdigit():
+        return datetime.fromtimestamp(float(value), timezone.utc)
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _align(at: datetime, step: timedelta) -> datetime:
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return epoch + math.ceil((at - epoch) / step) * step
+
+
+def latest_payload(symbols: List[str], now: Optional[datetime] = None) -> Dict:
+    now = now or datetime.now(timezone.utc)
+    data = {}
+    for i, symbol in enumerate(symbols):
+        quote = synthetic_quote(symbol, now)
+        changes = [
+            (quote['price'] / synthetic_quote(symbol, now - delta)['price'] - 1) * 100
+            for delta in (timedelta(hours=1), timedelta(days=1), timedelta(days=7))
+        ]
+        data[symbol] = {
+            'id': i + 1,
+            'name': symbol.title(),
+            'symbol': symbol,
+            'circulating_supply': quote['supply'],
+            'total_supply': quote['supply'] * 1.2,
+            'max_supply': None,
+            'quote': {
+                'USD': {
+                    'price': quote['price'],
+                    'market_cap': quote['market_cap'],
+                    'volume_24h': quote['volume_24h'],
+                    'percent_change_1h': changes[0],
+                    'percent_change_24h': changes[1],
+                    'percent_change_7d': changes[2],
+                    'last_updated': _iso(now)
+                }
+            }
+        }
+    return {'status': {'error_code': 0, 'credit_count': 1}, 'data': data}
+
+
+def historical_payload(symbol: str, time_start: datetime, time_end: datetime,
+                       interval: str, count: int) -> Dict:
+    """
+    quotes/historical (v1) response: points at interval spacing in [start, end]
+    """
+    step = HISTORICAL_INTERVALS[interval]
+    quotes = []
+    at = _align(time_start, step)
+    while at <= time_end and len(quotes) < min(count, MAX_HISTORICAL_COUNT):
+        quote = synthetic_quote(symbol, at)
+        quotes.append({
+            'timestamp': _iso(at),
+            'quote': {
+                'USD': {
+                    'price': quote['price'],
+                    'volume_24h': quote['volume_24h'],
+                    'market_cap': quote['market_cap'],
+                    'timestamp': _iso(at)
+                }
+            }
+        })
+        at += step
+    return {
+        'status': {'error_code': 0,
+                   'credit_count': max(1, math.ceil(len(quotes) / 100))},
+        'data': {'id': _symbol_seed(symbol) % 100000, 'name': symbol.title(),
+                 'symbol': symbol, 'quotes': quotes}
+    }
+
+
+class MockUpstream:
+    """
+    Request accounting and fault injection shared by the handler threads
+    """
+
+    def __init__(self,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 calls_per_minute: Optional[int] = None,
+                 seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls_per_minute = calls_per_minute
+        self.requests: Dict[str, int] = {}
+        self.credits = 0
+        self._recent: Deque[float] = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def admit(self, endpoint: str) -> Optional[int]:
+        """
+        Count a request; returns an HTTP error status to fail it with, if any
+        """
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            now = time.monotonic()
+            if self.calls_per_minute:
+                while self._recent and now - self._recent[0] > 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.calls_per_minute:
+                    return 429
+                self._recent.append(now)
+            if self._random.random() < self.error_rate:
+                return 500
+        return None
+
+    def respond(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict]:
+        endpoint = path.split('/v1/', 1)[-1].strip('/')
+        if self.latency:
+            time.sleep(self.latency)
+        status = self.admit(endpoint)
+        if status is not None:
+            return status, {'status': {'error_code': status,
+                                       'error_message': 'Injected failure'}}
+
+        if endpoint == 'cryptocurrency/quotes/latest':
+            payload = latest_payload([s for s in params.get('symbol', '').split(',')
+                                      if s])
+        elif endpoint == 'cryptocurrency/quotes/historical':
+            interval = params.get('interval', 'daily')
+            if interval not in HISTORICAL_INTERVALS:
+                return 400, {'status': {'error_code': 400,
+                                        'error_message': f"Bad interval {interval}"}}
+            time_end = _parse_time(params['time_end']) if 'time_end' in params \
+                else datetime.now(timezone.utc)
+            time_start = _parse_time(params['time_start']) if 'time_start' in params \
+                else time_end - HISTORICAL_INTERVALS[interval] * 100
+            payload = historical_payload(params.get('symbol', 'BTC'), time_start,
+                                         time_end, interval,
+                                         int(params.get('count', 10)))
+        elif endpoint == 'tools/price-conversion':
+            currency = params.get('convert', 'USD')
+            rate = 1.0 if currency == 'USD' else FX_RATES.get(currency)
+            if rate is None:
+                return 400, {'status': {'error_code': 400,
+                                        'error_message': f"Bad currency {currency}"}}
+            payload = {'status': {'error_code': 0, 'credit_count': 1},
+                       'data': {'quote': {currency: {
+                           'price': float(params.get('amount', 1)) * rate}}}}
+        else:
+            return 404, {'status': {'error_code': 404,
+                                    'error_message': f"Unknown endpoint {endpoint}"}}
+
+        with self._lock:
+            self.credits += payload['status'].get('credit_count', 1)
+        return 200, payload
+
+
+def _handler(upstream: MockUpstream):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            status, payload = upstream.respond(url.path, params)
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 0, host: str = '127.0.0.1',
+          upstream: Optional[MockUpstream] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the mock in a daemon thread; returns the server and its /v1 base URL
+
+    Port 0 picks a free port. Stop it with server.shutdown().
+    """
+    upstream = upstream or MockUpstream()
+    server = ThreadingHTTPServer((host, port), _handler(upstream))
+    server.daemon_threads = True
+    server.upstream = upstream
+    threading.Thread(target=server.serve_forever, name='mock-upstream',
+                     daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Serve a local stand-in for the CoinMarketCap API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency',
+                        type=float,
+                        default=0.0,
+                        help="Seconds added to every response")
+    parser.add_argument('--error-rate',
+                        type=float,
+                        default=0.0,
+                        help="Share of requests failed with HTTP 500")
+    parser.add_argument('--calls-per-minute',
+                        type=int,
+                        help="Answer HTTP 429 beyond this many calls per minute")
+    args = parser.parse_args(argv)
+
+    upstream = MockUpstream(args.latency, args.error_rate, args.calls_per_minute)
+    server, base_url = serve(args.port, args.host, upstream)
+    print(f"Mock upstream at {base_url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,359 @@
+"""
+Persistent, deduplicated store of Web3 news articles
+A background prefetcher fills the store from every configured source, so viewers
+read the latest articles from memory and never wait on a news fetch; articles are
+tagged with the projects they mention on ingest
+"""
+import bisect
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from clock import SYSTEM_CLOCK, Clock
+from news_tagger import ProjectTagger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.getenv("NEWS_STORE_PATH", "news_store.sqlite3")
+
+ARTICLE_COLUMNS = ("articles.key, title, description, url, source, sources, "
+                   "published_at, articles.published_ts, projects")
+
+# Query parameters that identify a referral, not an article
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref')
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of an article URL for deduplication
+    """
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, urlencode(sorted(query)), ''))
+
+
+def normalize_title(title: str) -> str:
+    return ' '.join(''.join(ch for ch in title.lower()
+                            if ch.isalnum() or ch.isspace()).split())
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def parse_published(value: str) -> Optional[float]:
+    """
+    Parse an ISO 8601 (NewsAPI) or RFC 822 (RSS) timestamp to epoch seconds
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class NewsStore:
+    """
+    SQLite-backed article store with an in-memory window of recent articles
+
+    Articles are deduplicated by normalized URL hash and by normalized title
+    hash; a duplicate from another source is merged into the stored article's
+    source list. The most recent articles are kept sorted by publish time in
+    memory, so latest(n) costs O(n) regardless of how much history is stored.
+    """
+
+    def __init__(self,
+                 path: str = DEFAULT_STORE_PATH,
+                 recent_capacity: int = 500,
+                 retention_days: float = 60,
+                 tagger: Optional[ProjectTagger] = None,
+                 clock: Clock = SYSTEM_CLOCK):
+        self.path = path
+        self.recent_capacity = recent_capacity
+        self.retention_days = retention_days
+        self.tagger = tagger
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                key TEXT PRIMARY KEY,
+                title_key TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                description TEXT,
+                url TEXT,
+                source TEXT,
+                sources TEXT,
+                published_at TEXT,
+                published_ts REAL NOT NULL,
+                ingested_ts REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS articles_published
+                ON articles (published_ts);
+            CREATE TABLE IF NOT EXISTS article_projects (
+                symbol TEXT NOT NULL,
+                key TEXT NOT NULL,
+                published_ts REAL NOT NULL,
+                PRIMARY KEY (symbol, key)
+            );
+            CREATE INDEX IF NOT EXISTS article_projects_recent
+                ON article_projects (symbol, published_ts);
+        """)
+        columns = [
+            row[1] for row in self._conn.execute("PRAGMA table_info(articles)")
+        ]
+        if 'projects' not in columns:
+            self._conn.execute("ALTER TABLE articles ADD COLUMN projects TEXT")
+        self._recent: List[Dict] = []
+        self._recent_ts: List[float] = []
+        self._load_recent()
+
+    def _load_recent(self):
+        rows = self._conn.execute(
+            f"SELECT {ARTICLE_COLUMNS} FROM articles "
+            "ORDER BY published_ts DESC LIMIT ?",
+            (self.recent_capacity, )).fetchall()
+        for row in reversed(rows):
+            article = self._row_to_article(row)
+            self._recent.append(article)
+            self._recent_ts.append(article['published_ts'])
+
+    @staticmethod
+    def _row_to_article(row) -> Dict:
+        (key, title, description, url, source, sources, published_at, ts,
+         projects) = row
+        return {
+            'key': key,
+            'title': title,
+            'description': description or '',
+            'url': url,
+            'source': source,
+            'sources': sources.split('\n') if sources else [source],
+            'published_at': published_at,
+            'published_ts': ts,
+            'projects': projects.split('\n') if projects else []
+        }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def ingest(self, articles: List[Dict]) -> List[Dict]:
+        """
+        Add articles to the store, merging duplicates; returns the new articles
+        """
+        added = []
+        now = self.clock.time()
+        with self._lock:
+            for article in articles:
+                title = (article.get('title') or '').strip()
+                if not title:
+                    continue
+                url = article.get('url') or ''
+                title_key = _hash(normalize_title(title))
+                key = _hash(normalize_url(url)) if url.startswith(
+                    'http') else title_key
+                source = article.get('source') or 'Unknown'
+
+                existing = self._conn.execute(
+                    "SELECT key, sources FROM articles "
+                    "WHERE key = ? OR title_key = ?",
+                    (key, title_key)).fetchone()
+                if existing is not None:
+                    self._merge_source(existing[0], existing[1], source)
+                    continue
+
+                published_ts = parse_published(
+                    article.get('published_at', '')) or now
+                projects = self.tagger.tag_article(
+                    article) if self.tagger else []
+                stored = {
+                    'key': key,
+                    'title': title,
+                    'description': article.get('description') or '',
+                    'url': url,
+                    'source': source,
+                    'sources': [source],
+                    'published_at': article.get('published_at', ''),
+                    'published_ts': published_ts,
+                    'projects': projects
+                }
+                self._conn.execute(
+                    "INSERT INTO articles (key, title_key, title, description, "
+                    "url, source, sources, published_at, published_ts, "
+                    "ingested_ts, projects) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, title_key, title, stored['description'], url,
+                     source, source, stored['published_at'], published_ts,
+                     now, '\n'.join(projects)))
+                self._index_projects(key, projects, published_ts)
+                self._add_recent(stored)
+                added.append(stored)
+            self._conn.commit()
+        return added
+
+    def _index_projects(self, key: str, projects: List[str],
+                        published_ts: float):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO article_projects VALUES (?, ?, ?)",
+            [(symbol, key, published_ts) for symbol in projects])
+
+    def retag(self, tagger: ProjectTagger):
+        """
+        Replace the tagger and rebuild project tags for every stored article
+
+        Needed only when the project universe changes.
+        """
+        with self._lock:
+            self.tagger = tagger
+            rows = self._conn.execute(
+                "SELECT key, title, description, published_ts FROM articles"
+            ).fetchall()
+            self._conn.execute("DELETE FROM article_projects")
+            tags = {}
+            for key, title, description, published_ts in rows:
+                projects = tagger.tag_article({
+                    'title': title,
+                    'description': description
+                })
+                tags[key] = projects
+                self._conn.execute(
+                    "UPDATE articles SET projects = ? WHERE key = ?",
+                    ('\n'.join(projects), key))
+                self._index_projects(key, projects, published_ts)
+            self._conn.commit()
+            for article in self._recent:
+                article['projects'] = tags.get(article['key'], [])
+
+    def _merge_source(self, key: str, sources: str, source: str):
+        known = sources.split('\n') if sources else []
+        if source in known:
+            return
+        known.append(source)
+        self._conn.execute("UPDATE articles SET sources = ? WHERE key = ?",
+                           ('\n'.join(known), key))
+        for article in self._recent:
+            if article['key'] == key:
+                article['sources'] = known
+                break
+
+    def _add_recent(self, article: Dict):
+        ts = article['published_ts']
+        if (len(self._recent) >= self.recent_capacity
+                and self._recent_ts and ts <= self._recent_ts[0]):
+            return
+        position = bisect.bisect_right(self._recent_ts, ts)
+        self._recent_ts.insert(position, ts)
+        self._recent.insert(position, article)
+        if len(self._recent) > self.recent_capacity:
+            del self._recent[0]
+            del self._recent_ts[0]
+
+    def latest(self, n: int = 10) -> List[Dict]:
+        """
+        Return the n most recently published articles, newest first
+        """
+        if n <= 0:
+            return []
+        with self._lock:
+            return self._recent[-n:][::-1]
+
+    def latest_for_project(self, symbol: str, n: int = 10) -> List[Dict]:
+        """
+        Return the n most recent articles tagged with a project, newest first
+
+        Served from the project index; article text is never scanned here.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {ARTICLE_COLUMNS} FROM article_projects "
+                "JOIN articles USING (key) WHERE symbol = ? "
+                "ORDER BY article_projects.published_ts DESC LIMIT ?",
+                (symbol, n)).fetchall()
+        return [self._row_to_article(row) for row in rows]
+
+    def between(self, start_ts: float, end_ts: float) -> List[Dict]:
+        """
+        Return articles published in [start_ts, end_ts), newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {ARTICLE_COLUMNS} FROM articles "
+                "WHERE published_ts >= ? AND published_ts < ? "
+                "ORDER BY published_ts DESC", (start_ts, end_ts)).fetchall()
+        return [self._row_to_article(row) for row in rows]
+
+    def prune(self) -> int:
+        """
+        Delete articles older than the retention window; returns rows removed
+        """
+        cutoff = self.clock.time() - self.retention_days * 86400
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM articles WHERE published_ts < ?",
+                (cutoff, )).rowcount
+            self._conn.execute(
+                "DELETE FROM article_projects WHERE published_ts < ?",
+                (cutoff, ))
+            expired = bisect.bisect_left(self._recent_ts, cutoff)
+            del self._recent[:expired]
+            del self._recent_ts[:expired]
+            self._conn.commit()
+        return removed
+
+
+class NewsPrefetcher:
+    """
+    Background thread that periodically fills a NewsStore from a DataFetcher
+    """
+
+    def __init__(self, fetcher, store: NewsStore, interval: float = 900):
+        self.fetcher = fetcher
+        self.store = store
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'NewsPrefetcher':
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run,
+                                            name="news-prefetch",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self) -> int:
+        articles = self.fetcher.get_news_from_all_sources()
+        added = self.store.ingest(articles)
+        self.store.prune()
+        return len(added)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("News prefetch failed")
+            self._stop.wait(self.store.clock.wall_seconds(self.interval))
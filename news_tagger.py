@@ -0,0 +1,131 @@
+"""
+Project tagging for news articles
+A multi-pattern (Aho-Corasick) matcher over project names, symbols and aliases finds
+every project mentioned in an article in a single pass over its text
+"""
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from project_data import get_project_aliases
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over a fixed set of patterns
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(pattern_id)
+
+        # Breadth-first pass sets failure links and merges outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = (self._out[next_state] +
+                                         self._out[self._fail[next_state]])
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Yield (end_index, pattern_id) for every pattern occurrence in text
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in out[state]:
+                yield index, pattern_id
+
+
+class ProjectTagger:
+    """
+    Tags text with the symbols of the projects it mentions
+
+    Built once per project universe. Symbols match case-sensitively, and
+    symbols shorter than three characters only as $cashtags. Multi-word names
+    and aliases match case-insensitively; single-word names match as written,
+    so common words like "flow" or "secret" are not tagged. Every match must
+    sit on word boundaries.
+    """
+
+    def __init__(self,
+                 projects: List[Dict],
+                 aliases: Optional[Dict[str, List[str]]] = None):
+        aliases = get_project_aliases() if aliases is None else aliases
+        # pattern -> (symbol, exact text required, or None if any case)
+        entries: Dict[Tuple[str, str], Tuple[str, Optional[str]]] = {}
+
+        def add(symbol: str, text: str, case_sensitive: bool):
+            text = text.strip()
+            if not text:
+                return
+            exact = text if case_sensitive else None
+            entries[(text.lower(), exact or '')] = (symbol, exact)
+
+        for project in projects:
+            symbol = project['symbol']
+            if len(symbol) < 3:
+                add(symbol, f"${symbol}", True)
+            else:
+                add(symbol, symbol, True)
+            for name in [project['name']] + aliases.get(symbol, []):
+                add(symbol, name, len(name.split()) == 1)
+
+        keys = list(entries)
+        self._targets = [entries[key] for key in keys]
+        self._matcher = AhoCorasick([pattern for pattern, _ in keys])
+
+    def tag(self, text: str) -> Set[str]:
+        """
+        Return the symbols of all projects mentioned in text
+        """
+        if not text:
+            return set()
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Some characters change length when lowercased; keep indexes aligned
+            lowered = ''.join(c.lower() if len(c.lower()) == 1 else c
+                              for c in text)
+
+        found = set()
+        patterns = self._matcher.patterns
+        for end, pattern_id in self._matcher.iter_matches(lowered):
+            symbol, exact = self._targets[pattern_id]
+            if symbol in found:
+                continue
+            start = end - len(patterns[pattern_id]) + 1
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if end + 1 < len(text) and text[end + 1].isalnum():
+                continue
+            if exact is not None and text[start:end + 1] != exact:
+                continue
+            found.add(symbol)
+        return found
+
+    def tag_article(self, article: Dict) -> List[str]:
+        text = f"{article.get('title') or ''}\n{article.get('description') or ''}"
+        return sorted(self.tag(text))
@@ -0,0 +1,139 @@
+"""
+Headless market data pipeline
+Fetches quotes, joins them with the project universe, computes the utils metrics and
+writes snapshots; usable from batch jobs and servers without importing Streamlit
+"""
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from clock import SYSTEM_CLOCK
+from data_fetcher import DataFetcher, FetchError
+from instrumentation import tracer
+from project_data import get_web3_projects
+from quotes import QuoteTable
+from schema import conform
+from utils import (calculate_metrics_batch, calculate_token_velocity_batch,
+                   calculate_burn_rate_estimate_batch,
+                   calculate_market_cap_to_dau_ratio_batch)
+
+SNAPSHOT_FORMATS = ('csv', 'parquet', 'json')
+
+
+@dataclass
+class PipelineResult:
+    """Snapshot frame produced by a pipeline run, with any upstream errors"""
+    frame: pd.DataFrame
+    errors: List[FetchError] = field(default_factory=list)
+    fetched_at: datetime = field(default_factory=SYSTEM_CLOCK.now)
+
+    @property
+    def ok(self) -> bool:
+        return not self.frame.empty
+
+
+def market_metrics(price: np.ndarray, volume_24h: np.ndarray,
+                   market_cap: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    The dashboard metrics that move with price, volume and market cap
+
+    Shared by full snapshot builds and streamed price updates, which
+    recompute them for the updated rows only.
+    """
+    token_velocity = calculate_token_velocity_batch(volume_24h, market_cap)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Derived ranking metric: utility per $1B market cap
+        utility_score = token_velocity / (market_cap / 1e9)
+    return {
+        'revenue_per_user': calculate_metrics_batch(market_cap, volume_24h,
+                                                    price),
+        'token_velocity': token_velocity,
+        'mcap_dau_ratio': calculate_market_cap_to_dau_ratio_batch(
+            market_cap, volume_24h, price),
+        'utility_score': utility_score
+    }
+
+
+def build_project_frame(projects: List[Dict],
+                        market_data: Mapping[str, Dict]) -> pd.DataFrame:
+    """
+    Combine project info with market data and compute the dashboard metrics
+
+    market_data is a QuoteTable, or any symbol -> quote dict mapping. Rows
+    keep the project order; projects without a quote are dropped. Columns
+    have the schema dtypes.
+    """
+    quotes = QuoteTable.from_mapping(market_data)
+
+    with tracer.span('pipeline.frame'):
+        df = pd.DataFrame(projects)
+        if df.empty or not len(quotes):
+            return pd.DataFrame()
+        rows = quotes.lookup(df['symbol'])
+        quoted = rows >= 0
+        df = df[quoted].reset_index(drop=True)
+        if df.empty:
+            return df
+        market = QuoteTable(quotes.records[rows[quoted]]).to_frame()
+        # Quote fields overwrite same-named project fields (e.g. name)
+        for column in market.columns:
+            df[column] = market[column].array
+
+    with tracer.span('pipeline.metrics'):
+        metrics = market_metrics(
+            df['price'].to_numpy(dtype=float, na_value=np.nan),
+            df['volume_24h'].to_numpy(dtype=float, na_value=np.nan),
+            df['market_cap'].to_numpy(dtype=float, na_value=np.nan))
+        df['revenue_per_user'] = metrics['revenue_per_user']
+        df['token_velocity'] = metrics['token_velocity']
+        df['burn_rate_estimate'] = calculate_burn_rate_estimate_batch(
+            df['total_supply'], df['max_supply'])
+        df['mcap_dau_ratio'] = metrics['mcap_dau_ratio']
+        df['utility_score'] = metrics['utility_score']
+        df['supply_ratio'] = (df['circulating_supply'] /
+                              df['total_supply']).where(
+                                  (df['total_supply'] > 0)
+                                  & (df['circulating_supply'] > 0))
+    return conform(df)
+
+
+def run_pipeline(fetcher: Optional[DataFetcher] = None,
+                 projects: Optional[List[Dict]] = None) -> PipelineResult:
+    """
+    Fetch market data for the project universe and build the snapshot frame
+    """
+    fetcher = fetcher or DataFetcher()
+    projects = projects if projects is not None else get_web3_projects()
+
+    with tracer.span('pipeline.fetch'):
+        result = fetcher.fetch_market_data([p['symbol'] for p in projects])
+    errors = [result.error] if result.error else []
+    return PipelineResult(build_project_frame(projects, result.data), errors,
+                          fetcher.clock.now())
+
+
+def write_snapshot(frame: pd.DataFrame,
+                   path: str,
+                   fmt: Optional[str] = None) -> str:
+    """
+    Write a snapshot frame as CSV, Parquet or JSON records; returns the format used
+
+    The format is taken from the file extension unless fmt is given.
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unsupported snapshot format: {fmt!r} "
+                         f"(expected one of {', '.join(SNAPSHOT_FORMATS)})")
+
+    if fmt == 'csv':
+        frame.to_csv(path, index=False)
+    elif fmt == 'parquet':
+        # Requires pyarrow, which is installed alongside streamlit
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_json(path, orient='records', date_format='iso', indent=2)
+    return fmt
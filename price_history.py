@@ -0,0 +1,172 @@
+"""
+Price history for long-range charts
+Reads the backfill directory per symbol and keeps each symbol's raw series and its
+OHLCV rollups in memory; a chart window picks the level that fits its range and
+reduces what is left to the point budget
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from backfill import read_history
+from downsampling import lttb, minmax_buckets, pick_resolution, rollup_ohlcv
+
+DEFAULT_HISTORY_PATH = os.getenv("PRICE_HISTORY_PATH", "history")
+
+# Chart range presets; None is the whole history
+HISTORY_RANGES: Dict[str, Optional[timedelta]] = {
+    '1D': timedelta(days=1),
+    '1W': timedelta(weeks=1),
+    '1M': timedelta(days=30),
+    '3M': timedelta(days=91),
+    '1Y': timedelta(days=365),
+    'All': None
+}
+
+HISTORY_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+@dataclass
+class HistoryWindow:
+    """Chart-ready OHLCV rows for one symbol and range"""
+    symbol: str
+    frame: pd.DataFrame
+    resolution: str
+    # Rows at this resolution in the range, before point reduction
+    total_points: int
+
+    @property
+    def reduced(self) -> bool:
+        return len(self.frame) < self.total_points
+
+
+class _SymbolLevels:
+    """Raw series and lazily built rollups of one symbol"""
+
+    def __init__(self, raw: pd.DataFrame, signature: Tuple):
+        self.signature = signature
+        self.raw = raw
+        steps = raw['timestamp'].diff().dropna()
+        self.raw_step = steps.median().to_pytimedelta() if len(steps) else None
+        self.levels: Dict[str, pd.DataFrame] = {}
+
+    def level(self, resolution: str) -> pd.DataFrame:
+        frame = self.levels.get(resolution)
+        if frame is None:
+            if resolution == 'raw':
+                frame = pd.DataFrame({
+                    'timestamp': self.raw['timestamp'],
+                    'open': self.raw['price'],
+                    'high': self.raw['price'],
+                    'low': self.raw['price'],
+                    'close': self.raw['price'],
+                    # Rolling 24h volume at each tick
+                    'volume': self.raw['volume_24h']
+                })
+            else:
+                frame = rollup_ohlcv(self.raw, resolution)
+            self.levels[resolution] = frame
+        return frame
+
+
+class PriceHistory:
+    """
+    Per-symbol cache over a backfill output directory
+
+    A symbol is read on first use and re-read when its partition changes on
+    disk, e.g. after another backfill run; at most max_symbols stay in memory.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, max_symbols: int = 32):
+        self.path = path
+        self.max_symbols = max_symbols
+        self._symbols: 'OrderedDict[str, _SymbolLevels]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def symbols(self) -> List[str]:
+        """
+        Symbols with history on disk
+        """
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(entry.name.split('=', 1)[1]
+                      for entry in os.scandir(self.path)
+                      if entry.is_dir() and entry.name.startswith('symbol='))
+
+    def _signature(self, symbol: str) -> Tuple:
+        directory = os.path.join(self.path, f"symbol={symbol}")
+        parts = [entry for entry in os.scandir(directory)
+                 if entry.name.endswith('.parquet')]
+        return (len(parts), max((entry.stat().st_mtime_ns for entry in parts),
+                                default=0))
+
+    def _levels(self, symbol: str) -> _SymbolLevels:
+        signature = self._signature(symbol)
+        with self._lock:
+            levels = self._symbols.get(symbol)
+            if levels is not None and levels.signature == signature:
+                self._symbols.move_to_end(symbol)
+                return levels
+
+        # Read outside the lock; a concurrent reader of the same symbol only
+        # duplicates work
+        raw = read_history(self.path, [symbol])[['timestamp', 'price',
+                                                 'volume_24h']]
+        levels = _SymbolLevels(raw, signature)
+        with self._lock:
+            self._symbols[symbol] = levels
+            self._symbols.move_to_end(symbol)
+            while len(self._symbols) > self.max_symbols:
+                self._symbols.popitem(last=False)
+        return levels
+
+    def window(self,
+               symbol: str,
+               span: Optional[timedelta] = None,
+               max_points: int = 2000,
+               method: str = 'lttb') -> HistoryWindow:
+        """
+        The last span of a symbol's history (all of it if None) in max_points rows
+
+        The resolution comes from the span; rows beyond the budget are reduced
+        with LTTB on the close, or min/max per bucket.
+        """
+        levels = self._levels(symbol)
+        if levels.raw.empty:
+            return HistoryWindow(symbol, pd.DataFrame(columns=HISTORY_COLUMNS),
+                                 'raw', 0)
+
+        end = levels.raw['timestamp'].iloc[-1]
+        start = levels.raw['timestamp'].iloc[0] if span is None else end - span
+        resolution = pick_resolution(end - start, levels.raw_step, max_points)
+        frame = levels.level(resolution)
+
+        timestamps = frame['timestamp']
+        lo = timestamps.searchsorted(start, 'left')
+        frame = frame.iloc[lo:]
+        total = len(frame)
+        if total > max_points:
+            close = frame['close'].to_numpy(dtype=float)
+            if method == 'minmax':
+                positions = minmax_buckets(close, max_points)
+            else:
+                seconds = ((frame['timestamp'] - frame['timestamp'].iloc[0]) /
+                           pd.Timedelta(seconds=1)).to_numpy(dtype=float)
+                positions = lttb(seconds, close, max_points)
+            frame = frame.iloc[positions]
+        return HistoryWindow(symbol, frame.reset_index(drop=True), resolution,
+                             total)
+
+    def clear(self):
+        with self._lock:
+            self._symbols.clear()
+
+
+def history_available(path: str = DEFAULT_HISTORY_PATH) -> bool:
+    return os.path.isdir(path) and any(
+        entry.name.startswith('symbol=') for entry in os.scandir(path))
@@ -167,3 +167,28 @@ def get_projects_by_category(category: str):
     if category == 'All':
         return all_projects
     return [p for p in all_projects if p['category'] == category]
+
+def get_project_aliases():
+    """
+    Returns alternative names projects are referred to by in news coverage
+    Keyed by symbol; used to tag news articles with the projects they mention
+    """
+    return {
+        'ETH': ['Ether'],
+        'BNB': ['Binance Coin', 'BNB Chain'],
+        'MKR': ['MakerDAO'],
+        'CRV': ['Curve Finance'],
+        'YFI': ['Yearn Finance'],
+        'AVAX': ['Avalanche'],
+        'MATIC': ['Polygon Labs', 'POL'],
+        'IMX': ['Immutable zkEVM'],
+        'OP': ['OP Mainnet'],
+        'GRT': ['The Graph Protocol'],
+        'ICP': ['DFINITY'],
+        'AXS': ['Axie'],
+        'SOR': ['Sorare'],
+        'RONIN': ['Ronin Network', 'Sky Mavis'],
+        'RUNE': ['THORSwap'],
+        'ANT': ['Aragon DAO'],
+        'WAXP': ['WAX Blockchain']
+    }
@@ -0,0 +1,147 @@
+"""
+Compact quote records
+Fetched quotes are held as one structured NumPy array per response instead of a
+dict of boxed floats per token; the table still reads like the old symbol -> dict
+mapping, and becomes a DataFrame column by column without per-row objects
+"""
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# One quotes/latest row; strings are object references, the rest fixed width
+QUOTE_DTYPE = np.dtype([
+    ('symbol', object),
+    ('name', object),
+    ('price', np.float64),
+    ('market_cap', np.float64),
+    ('volume_24h', np.float64),
+    ('percent_change_1h', np.float64),
+    ('percent_change_24h', np.float64),
+    ('percent_change_7d', np.float64),
+    ('circulating_supply', np.float64),
+    ('total_supply', np.float64),
+    ('max_supply', np.float64),
+    ('last_updated', 'datetime64[ms]')
+])
+
+# One listings/latest row
+LISTING_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('symbol', object),
+    ('name', object),
+    ('price', np.float64),
+    ('market_cap', np.float64),
+    ('volume_24h', np.float64),
+    ('percent_change_24h', np.float64),
+    ('circulating_supply', np.float64),
+    ('cmc_rank', np.int32)
+])
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[str]:
+    """
+    API timestamp ('...Z') in the naive UTC form datetime64 parses; None stays None
+    """
+    if value and value.endswith('Z'):
+        return value[:-1]
+    return value
+
+
+class QuoteTable(Mapping):
+    """
+    Read-only symbol -> quote mapping over a structured array
+
+    Indexing by symbol builds that row's dict on demand, for callers of the old
+    dict-of-dicts form; bulk consumers use `records` or to_frame().
+    """
+
+    __slots__ = ('records', '_positions')
+
+    def __init__(self, records: np.ndarray):
+        self.records = records
+        self._positions: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple],
+                  dtype: np.dtype = QUOTE_DTYPE) -> 'QuoteTable':
+        """
+        Build from tuples in dtype field order; None becomes NaN or NaT
+        """
+        return cls(np.array(list(rows), dtype=dtype))
+
+    @classmethod
+    def from_mapping(cls, market_data: Mapping,
+                     dtype: np.dtype = QUOTE_DTYPE) -> 'QuoteTable':
+        """
+        Build from a symbol -> dict mapping, e.g. the old get_market_data form
+        """
+        if isinstance(market_data, QuoteTable):
+            return market_data
+        fields = dtype.names
+        return cls.from_rows(
+            (tuple(parse_timestamp(info.get(f)) if f == 'last_updated' else
+                   info.get(f, symbol if f == 'symbol' else None)
+                   for f in fields)
+             for symbol, info in market_data.items()), dtype)
+
+    @property
+    def positions(self) -> Dict[str, int]:
+        if self._positions is None:
+            self._positions = {
+                symbol: i
+                for i, symbol in enumerate(self.records['symbol'])
+            }
+        return self._positions
+
+    def __getitem__(self, symbol: str) -> Dict:
+        row = self.records[self.positions[symbol]]
+        quote = {}
+        for name in self.records.dtype.names:
+            value = row[name]
+            if isinstance(value, np.datetime64):
+                value = None if np.isnat(value) else f"{value}Z"
+            elif isinstance(value, np.floating):
+                value = None if np.isnan(value) else float(value)
+            elif isinstance(value, np.integer):
+                value = int(value)
+            quote[name] = value
+        return quote
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.records['symbol'])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the array itself, excluding the strings it references"""
+        return self.records.nbytes
+
+    def lookup(self, symbols: Iterable[str]) -> np.ndarray:
+        """
+        Row position of each symbol, -1 where there is no quote
+        """
+        get = self.positions.get
+        return np.fromiter((get(s, -1) for s in symbols), dtype=np.intp)
+
+    def select(self, symbols: Iterable[str]) -> 'QuoteTable':
+        """
+        Rows for the given symbols, in that order; unknown symbols are skipped
+        """
+        rows = self.lookup(symbols)
+        return QuoteTable(self.records[rows[rows >= 0]])
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        One column per field; last_updated stays naive UTC as in the records
+        """
+        return pd.DataFrame({
+            name: self.records[name]
+            for name in self.records.dtype.names
+        })
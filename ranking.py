@@ -0,0 +1,141 @@
+"""
+Precomputed rank indexes for top-N queries over a project snapshot
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from schema import float_values
+
+# Metrics that back a top-N panel, chart or sortable table column
+RANKED_METRICS = [
+    'token_velocity', 'revenue_per_user', 'mcap_dau_ratio',
+    'burn_rate_estimate', 'percent_change_24h', 'utility_score',
+    'supply_ratio', 'market_cap', 'volume_24h', 'price', 'circulating_supply'
+]
+
+# Re-sort a metric outright once more than 1/RERANK_FRACTION of its rows moved
+RERANK_FRACTION = 8
+
+
+class RankIndex:
+    """
+    Descending sort order of each ranked metric, computed once per snapshot
+
+    A filter mask over the snapshot rows is intersected with the stored order,
+    so a top-N query costs a single O(N) pass instead of a fresh sort.
+    """
+
+    def __init__(self, frame: pd.DataFrame, metrics: Optional[List[str]] = None):
+        self.frame = frame
+        self._values: Dict[str, np.ndarray] = {}
+        self._orders: Dict[str, np.ndarray] = {}
+        self._valid: Dict[str, int] = {}
+
+        for metric in metrics or RANKED_METRICS:
+            if metric in frame.columns:
+                self._rank(metric)
+
+    def _rank(self, metric: str):
+        # float32 snapshots are ranked in float32, without a copy
+        values = float_values(self.frame[metric])
+        # Stable sort keeps ties in row order, matching DataFrame.nlargest
+        self._values[metric] = values
+        self._orders[metric] = np.argsort(-values, kind='stable')
+        # NaNs sort last; top-N queries skip them like nlargest does
+        self._valid[metric] = int(np.count_nonzero(~np.isnan(values)))
+
+    @property
+    def nbytes(self) -> int:
+        """Sort orders plus any values converted rather than viewed from the frame"""
+        return sum(order.nbytes for order in self._orders.values()) + sum(
+            values.nbytes
+            for values in self._values.values() if values.base is None)
+
+    def derive(self, frame: pd.DataFrame,
+               changed: Iterable[str]) -> 'RankIndex':
+        """
+        Rank index for a new version of the frame that differs only in the
+        changed columns; the orders of all other metrics are reused
+        """
+        changed = set(changed)
+        ranks = RankIndex.__new__(RankIndex)
+        ranks.frame = frame
+        ranks._values = dict(self._values)
+        ranks._orders = dict(self._orders)
+        ranks._valid = dict(self._valid)
+        for metric in changed & set(self._orders):
+            ranks._rerank(metric, self._values[metric], self._orders[metric])
+        return ranks
+
+    def _rerank(self, metric: str, previous: np.ndarray, order: np.ndarray):
+        """
+        Merge the rows whose value changed into the previous order instead of
+        sorting every row again; ties still fall in row order
+        """
+        values = float_values(self.frame[metric])
+        same = (values == previous) | (np.isnan(values) & np.isnan(previous))
+        moved = np.flatnonzero(~same)
+        if len(moved) * RERANK_FRACTION > len(values):
+            self._rank(metric)
+            return
+        kept = order[same[order]]
+        moved = moved[np.argsort(-values[moved], kind='stable')]
+        keys = -values[kept]
+        at = np.searchsorted(keys, -values[moved], 'left')
+        ties = np.searchsorted(keys, -values[moved], 'right')
+        for i in np.flatnonzero(ties > at):
+            # Equal values are ordered by row: after the kept rows above this one
+            at[i] += np.searchsorted(kept[at[i]:ties[i]], moved[i])
+        self._values[metric] = values
+        self._orders[metric] = np.insert(kept, at, moved)
+        self._valid[metric] = int(np.count_nonzero(~np.isnan(values)))
+
+    def __contains__(self, metric: str) -> bool:
+        return metric in self._orders
+
+    def top_n(self,
+              metric: str,
+              n: int,
+              mask: Optional[np.ndarray] = None,
+              above: Optional[float] = None) -> np.ndarray:
+        """
+        Return row positions of the n largest values of metric
+
+        mask restricts the candidates to selected rows; above keeps only values
+        strictly greater than the bound, like filtering before nlargest.
+        """
+        order = self._orders[metric][:self._valid[metric]]
+        if mask is not None:
+            order = order[mask[order]]
+        positions = order[:n]
+        if above is not None:
+            # Values are descending, so the bound only trims the tail
+            positions = positions[self._values[metric][positions] > above]
+        return positions
+
+    def sorted_positions(self,
+                         metric: str,
+                         mask: Optional[np.ndarray] = None,
+                         descending: bool = True) -> np.ndarray:
+        """
+        Return positions of all selected rows ordered by metric, NaNs last
+        """
+        order = self._orders[metric]
+        valid = self._valid[metric]
+        if not descending:
+            order = np.concatenate([order[:valid][::-1], order[valid:]])
+        if mask is not None:
+            order = order[mask[order]]
+        return order
+
+    def nlargest(self,
+                 n: int,
+                 metric: str,
+                 mask: Optional[np.ndarray] = None,
+                 above: Optional[float] = None) -> pd.DataFrame:
+        """
+        Return the snapshot rows of the n largest values of metric
+        """
+        return self.frame.iloc[self.top_n(metric, n, mask, above)]
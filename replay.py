@@ -0,0 +1,212 @@
+"""
+Recorded upstream responses
+RecordingFetcher saves what the dashboard fetches, stamped with the time it was
+fetched, to a JSON lines file; ReplayFetcher serves a recording back through the
+DataFetcher interface on a ReplayClock, so a recorded day can be re-run faster
+than real time, or stepped one quotes response at a time with the same
+timestamps on every run
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from clock import Clock, ReplayClock
+from data_fetcher import DataFetcher, FetchError, FetchResult
+from quotes import QuoteTable
+
+logger = logging.getLogger(__name__)
+
+# Recording replayed by the dashboard instead of the live upstream APIs
+DEFAULT_REPLAY_PATH = os.getenv("REPLAY_PATH", "")
+# Replay seconds per wall-clock second; 0 steps one quotes response per refresh
+DEFAULT_REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "100"))
+# Speeds offered in the dashboard, besides the configured one
+REPLAY_SPEEDS = (0.0, 1.0, 10.0, 100.0, 1000.0)
+
+# Recorded calls: quotes/latest, the news feeds and the FX conversions
+RECORD_KINDS = ('quotes', 'news', 'fx')
+
+
+def encode_record(kind: str, when: datetime, result: FetchResult) -> str:
+    """
+    One recording line; quote tables are stored as symbol -> quote dicts
+    """
+    data = result.data
+    if isinstance(data, QuoteTable):
+        data = {symbol: data[symbol] for symbol in data}
+    return json.dumps({
+        'time': when.isoformat(),
+        'kind': kind,
+        'data': data,
+        'error': asdict(result.error) if result.error else None
+    })
+
+
+def decode_record(line: str) -> Tuple[str, datetime, FetchResult]:
+    record = json.loads(line)
+    kind = record['kind']
+    data = record['data']
+    if kind == 'quotes':
+        data = QuoteTable.from_mapping(data)
+    error = FetchError(**record['error']) if record.get('error') else None
+    return kind, datetime.fromisoformat(record['time']), FetchResult(data, error)
+
+
+class Recording:
+    """
+    Responses of a recording by kind, each list in time order
+    """
+
+    def __init__(self):
+        self.times: Dict[str, List[datetime]] = {k: [] for k in RECORD_KINDS}
+        self.results: Dict[str, List[FetchResult]] = {
+            k: []
+            for k in RECORD_KINDS
+        }
+
+    @classmethod
+    def load(cls, path: str) -> 'Recording':
+        """
+        Read a recording; lines that fail to parse are logged and skipped
+        """
+        records = []
+        with open(path) as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(decode_record(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"{path}:{number}: skipping record: {e}")
+        recording = cls()
+        # Stable, so records with equal times keep their file order
+        for kind, when, result in sorted(records, key=lambda r: r[1]):
+            if kind in recording.times:
+                recording.times[kind].append(when)
+                recording.results[kind].append(result)
+        return recording
+
+    def __len__(self) -> int:
+        return sum(len(times) for times in self.times.values())
+
+    @property
+    def start(self) -> Optional[datetime]:
+        return min((times[0] for times in self.times.values() if times),
+                   default=None)
+
+    @property
+    def end(self) -> Optional[datetime]:
+        return max((times[-1] for times in self.times.values() if times),
+                   default=None)
+
+    def position(self, kind: str, when: datetime) -> int:
+        """
+        Index of the last kind record at or before when, -1 if there is none
+        """
+        return bisect.bisect_right(self.times[kind], when) - 1
+
+
+class RecordingFetcher(DataFetcher):
+    """
+    DataFetcher that appends every quotes, news and FX response to a recording
+    """
+
+    def __init__(self, path: str, clock: Optional[Clock] = None):
+        super().__init__(clock)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, kind: str, result: FetchResult):
+        line = encode_record(kind, self.clock.now(), result)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+    def fetch_market_data(self, symbols: List[str]) -> FetchResult:
+        result = super().fetch_market_data(symbols)
+        self._record('quotes', result)
+        return result
+
+    def get_news_from_all_sources(self) -> List[Dict]:
+        articles = super().get_news_from_all_sources()
+        self._record('news', FetchResult(articles))
+        return articles
+
+    def fetch_fx_rates(self, currencies: List[str]) -> FetchResult:
+        result = super().fetch_fx_rates(currencies)
+        self._record('fx', result)
+        return result
+
+
+class ReplayFetcher(DataFetcher):
+    """
+    DataFetcher that answers from a recording, as of its clock's time
+
+    Each call returns the last response of its kind recorded at or before the
+    clock's time (the first one before that). While the clock is stepped
+    (speed 0), every fetch_market_data() call first moves the clock to the next
+    recorded quotes response. Calls that were not recorded fail as if the
+    upstream were unreachable; nothing goes to the network.
+    """
+
+    def __init__(self,
+                 recording: Recording,
+                 clock: Optional[ReplayClock] = None,
+                 speed: float = DEFAULT_REPLAY_SPEED):
+        if not recording.times['quotes']:
+            raise ValueError("Recording has no quotes responses")
+        super().__init__(clock or ReplayClock(recording.start, speed))
+        self.recording = recording
+        # Index of the last quotes response served
+        self.served = -1
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls,
+                  path: str,
+                  speed: float = DEFAULT_REPLAY_SPEED) -> 'ReplayFetcher':
+        return cls(Recording.load(path), speed=speed)
+
+    @property
+    def finished(self) -> bool:
+        """Whether the last recorded quotes response has been served"""
+        return self.served >= len(self.recording.times['quotes']) - 1
+
+    def _request(self, endpoint: str, url: str, **kwargs):
+        raise ConnectionError(f"{endpoint} is not part of the replayed recording")
+
+    def _replayed(self, kind: str) -> FetchResult:
+        position = self.recording.position(kind, self.clock.now())
+        results = self.recording.results[kind]
+        if not results:
+            return FetchResult(None, FetchError(kind, "Not in the recording"))
+        return results[max(position, 0)]
+
+    def fetch_market_data(self, symbols: List[str]) -> FetchResult:
+        with self._lock:
+            times = self.recording.times['quotes']
+            position = self.recording.position('quotes', self.clock.now())
+            if (self.clock.speed <= 0 and position <= self.served
+                    and position + 1 < len(times)):
+                position += 1
+                self.clock.advance_to(times[position])
+            position = max(position, 0)
+            self.served = position
+            result = self.recording.results['quotes'][position]
+        return FetchResult(result.data.select(symbols), result.error)
+
+    def get_news_from_all_sources(self) -> List[Dict]:
+        return self._replayed('news').data or []
+
+    def get_web3_news(self) -> List[Dict]:
+        return self.get_news_from_all_sources()
+
+    def fetch_fx_rates(self, currencies: List[str]) -> FetchResult:
+        result = self._replayed('fx')
+        rates = result.data or {}
+        return FetchResult({c: rates[c] for c in currencies if c in rates},
+                           result.error)
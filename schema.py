@@ -0,0 +1,120 @@
+"""
+Snapshot column schema
+Declares the dtype of every snapshot column (categoricals for repeated labels,
+Arrow-backed strings, UTC datetimes, float measures with NaN for missing values,
+optionally float32) and reports how much memory a frame or a session holds
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Store float measures as float32 in the shared snapshot: half the bytes, about
+# 7 significant digits, which is more than any dashboard view displays
+SNAPSHOT_FLOAT32 = os.getenv("SNAPSHOT_FLOAT32", "") == "1"
+
+# Few distinct values repeated across rows
+CATEGORY_COLUMNS = ['category']
+STRING_COLUMNS = ['name', 'symbol']
+# UTC, stored without a timezone so the column is a plain NumPy array
+DATETIME_COLUMNS = ['last_updated']
+# Missing upstream values and undefined metrics are NaN
+FLOAT_COLUMNS = [
+    'price', 'market_cap', 'volume_24h', 'percent_change_1h',
+    'percent_change_24h', 'percent_change_7d', 'circulating_supply',
+    'total_supply', 'max_supply', 'revenue_per_user', 'token_velocity',
+    'burn_rate_estimate', 'mcap_dau_ratio', 'utility_score', 'supply_ratio'
+]
+
+# The pandas 3 default string dtype, also on pandas 2.3 (needs pyarrow)
+STRING_DTYPE = pd.StringDtype('pyarrow', na_value=np.nan)
+
+
+def _float_dtype(float32: bool) -> np.dtype:
+    return np.dtype(np.float32 if float32 else np.float64)
+
+
+def conform(frame: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """
+    Return frame with the schema dtypes; columns already conforming are not copied
+
+    Unparseable numbers and timestamps become NaN/NaT, so a None in max_supply
+    or a string last_updated from an older snapshot file never yields an
+    object column. Columns outside the schema are kept as they are.
+    """
+    columns = {}
+    for name in frame.columns:
+        series = frame[name]
+        if name in CATEGORY_COLUMNS:
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype('category')
+        elif name in STRING_COLUMNS:
+            if series.dtype != STRING_DTYPE:
+                series = series.astype(STRING_DTYPE)
+        elif name in DATETIME_COLUMNS:
+            if series.dtype != np.dtype('datetime64[ms]'):
+                series = pd.to_datetime(series, utc=True, errors='coerce')
+                series = series.dt.tz_localize(None).astype('datetime64[ms]')
+        elif name in FLOAT_COLUMNS or series.dtype.kind == 'f':
+            dtype = _float_dtype(float32)
+            if series.dtype != dtype:
+                series = pd.to_numeric(series, errors='coerce').astype(dtype)
+        columns[name] = series
+    return pd.DataFrame(columns, index=frame.index, copy=False)
+
+
+def float_values(series: pd.Series) -> np.ndarray:
+    """
+    A column as a float array; float32 and float64 columns are returned without a copy
+    """
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind == 'f':
+        return series.to_numpy()
+    return series.to_numpy(dtype=float, na_value=np.nan)
+
+
+def memory_report(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bytes held by each column, strings included, largest first
+    """
+    usage = frame.memory_usage(deep=True, index=False)
+    rows = max(len(frame), 1)
+    return pd.DataFrame({
+        'column': usage.index,
+        'dtype': [str(frame[name].dtype) for name in usage.index],
+        'bytes': usage.to_numpy(),
+        'bytes_per_row': usage.to_numpy() / rows
+    }).sort_values('bytes', ascending=False, ignore_index=True)
+
+
+def deep_size(obj, _seen=None) -> int:
+    """
+    Approximate bytes reachable from obj: containers are followed, frames and
+    arrays report their buffers, shared objects are counted once
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is not None else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen)
+                    for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
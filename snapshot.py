@@ -0,0 +1,313 @@
+"""
+Process-wide market snapshot shared by every dashboard session
+The snapshot is held once per process as a read-only, NumPy-backed frame and handed
+out by reference; a refresh publishes a new version and swaps it in atomically.
+Streamed price updates publish versions that replace only the columns they change.
+The last good frame is also written to disk, so a replica that starts during an
+upstream outage can serve it, tagged as stale
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from clock import SYSTEM_CLOCK, Clock
+from data_fetcher import FetchError
+from filters import FilterIndex
+from instrumentation import tracer
+from pipeline import PipelineResult, write_snapshot
+from schema import SNAPSHOT_FLOAT32, conform
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERSIST_PATH = os.getenv("SNAPSHOT_CACHE_PATH", "last_snapshot.parquet")
+
+
+def freeze_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a copy of frame whose column arrays are read-only
+
+    Any in-place write on the result raises instead of silently changing the
+    data every session is looking at. Categoricals keep their dtype with
+    read-only codes; Arrow string buffers are immutable already.
+    """
+    columns = {}
+    for name in frame.columns:
+        series = frame[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy(copy=True)
+            codes.flags.writeable = False
+            columns[name] = pd.Categorical.from_codes(codes, dtype=series.dtype)
+        elif isinstance(series.dtype, pd.StringDtype):
+            columns[name] = series.array.copy()
+        else:
+            values = series.to_numpy(copy=True)
+            values.flags.writeable = False
+            columns[name] = values
+    return pd.DataFrame(columns, index=frame.index.copy(), copy=False)
+
+
+def replace_columns(frame: pd.DataFrame,
+                    columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Return a frozen frame with some NumPy columns replaced
+
+    The replacements are frozen in the existing column dtypes; every other
+    column is shared with frame, not copied.
+    """
+    values = {}
+    for name in frame.columns:
+        series = frame[name]
+        if name in columns:
+            replaced = np.array(columns[name], dtype=series.dtype)
+            replaced.flags.writeable = False
+            values[name] = replaced
+        elif isinstance(series.dtype, np.dtype):
+            values[name] = series.to_numpy()
+        else:
+            values[name] = series.array
+    return pd.DataFrame(values, index=frame.index, copy=False)
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """One immutable version of the combined project and market data"""
+    version: int
+    frame: pd.DataFrame
+    index: FilterIndex
+    # Both read from clock, by the store that published the snapshot
+    created_at: datetime
+    created_monotonic: float
+    # Restored from the on-disk copy rather than freshly fetched
+    stale: bool = False
+    # When streamed updates last changed this data after the full load
+    updated_at: Optional[datetime] = None
+    # The clock created_at and created_monotonic were read from
+    clock: Clock = field(default=SYSTEM_CLOCK, repr=False, compare=False)
+
+    @property
+    def age_seconds(self) -> float:
+        return self.clock.monotonic() - self.created_monotonic
+
+
+class SnapshotStore:
+    """
+    Holds the current MarketSnapshot for the process
+
+    Readers get the current snapshot by reference without locking. Once the
+    first snapshot is loaded, an expired one keeps being served while a single
+    background refresh builds its replacement (stale-while-revalidate); loads
+    are serialized so concurrent sessions never build a snapshot twice.
+    """
+
+    def __init__(self,
+                 loader: Callable[[], PipelineResult],
+                 ttl: float = 300,
+                 persist_path: Optional[str] = None,
+                 float32: bool = SNAPSHOT_FLOAT32,
+                 clock: Clock = SYSTEM_CLOCK):
+        self.loader = loader
+        self.ttl = ttl
+        # Ages and the TTL run on this clock; a replay clock speeds them up
+        self.clock = clock
+        # Hold float columns as float32; the persisted copy stays float64
+        self.float32 = float32
+        # Last known good frame on disk, restored when the first load fails
+        self.persist_path = persist_path
+        # Upstream errors from the most recent load, for the UI to report
+        self.last_errors: List[FetchError] = []
+        self._current: Optional[MarketSnapshot] = None
+        self._version = 0
+        self._lock = threading.Lock()
+        # Serializes publishers, so an update always builds on the current version
+        self._publish_lock = threading.Lock()
+        # Serializes loads so only one session calls the loader at a time
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self._subscribers: List[Callable[[MarketSnapshot], None]] = []
+
+    def subscribe(self, callback: Callable[[MarketSnapshot], None]):
+        """
+        Call callback with every snapshot published from now on
+
+        Callbacks run on the publishing thread, usually the background refresh.
+        """
+        self._subscribers.append(callback)
+
+    @property
+    def current(self) -> Optional[MarketSnapshot]:
+        return self._current
+
+    @property
+    def refreshing(self) -> bool:
+        """Whether a background refresh is in flight"""
+        return self._refreshing
+
+    def publish(self,
+                frame: pd.DataFrame,
+                created_at: Optional[datetime] = None,
+                stale: bool = False) -> MarketSnapshot:
+        """
+        Conform frame to the schema, freeze and index it, and swap it in as the
+        current snapshot
+
+        created_at backdates a snapshot whose data is older than now.
+        """
+        with self._publish_lock:
+            with tracer.span('snapshot.publish'):
+                frozen = freeze_frame(conform(frame, self.float32))
+                index = FilterIndex(frozen)
+            now = self.clock.now()
+            created_at = created_at or now
+            age = max((now - created_at).total_seconds(), 0)
+            snapshot = self._swap(frame=frozen,
+                                  index=index,
+                                  created_at=created_at,
+                                  created_monotonic=self.clock.monotonic() - age,
+                                  stale=stale)
+        self._notify(snapshot)
+        return snapshot
+
+    def update(
+        self, change: Callable[[MarketSnapshot], Dict[str, np.ndarray]]
+    ) -> Optional[MarketSnapshot]:
+        """
+        Publish a version of the current snapshot with some columns replaced
+
+        change gets the current snapshot and returns full-length replacement
+        columns, or nothing to skip the update. Unchanged columns, and the masks
+        and rank orders built from them, are shared with the previous version;
+        the load time and staleness carry over, so the TTL refresh still runs.
+        """
+        with self._publish_lock:
+            base = self._current
+            if base is None:
+                return None
+            columns = change(base)
+            if not columns:
+                return None
+            with tracer.span('snapshot.update'):
+                frame = replace_columns(base.frame, columns)
+                index = base.index.derive(frame, columns)
+            snapshot = self._swap(frame=frame,
+                                  index=index,
+                                  created_at=base.created_at,
+                                  created_monotonic=base.created_monotonic,
+                                  stale=base.stale,
+                                  updated_at=self.clock.now())
+        self._notify(snapshot)
+        return snapshot
+
+    def _swap(self, **fields) -> MarketSnapshot:
+        with self._lock:
+            self._version += 1
+            snapshot = MarketSnapshot(version=self._version,
+                                      clock=self.clock,
+                                      **fields)
+            # Single reference assignment: readers see the old or new version
+            self._current = snapshot
+        return snapshot
+
+    def _notify(self, snapshot: MarketSnapshot):
+        for callback in self._subscribers:
+            try:
+                callback(snapshot)
+            except Exception:
+                logger.exception("Snapshot subscriber failed")
+
+    def is_expired(self, snapshot: Optional[MarketSnapshot] = None) -> bool:
+        snapshot = snapshot or self._current
+        # A restored snapshot is refreshed as soon as the upstream allows
+        return (snapshot is None or snapshot.stale
+                or snapshot.age_seconds >= self.ttl)
+
+    def get(self) -> Optional[MarketSnapshot]:
+        """
+        Return the current snapshot, starting a background refresh if it has expired
+
+        Only the very first load blocks the caller; it returns None if the
+        loader produces no rows.
+        """
+        snapshot = self._current
+        if snapshot is None:
+            return self._load_initial()
+        if self.is_expired(snapshot):
+            self.refresh()
+        return snapshot
+
+    def refresh(self) -> bool:
+        """
+        Rebuild the snapshot in a background thread; returns False if one is running
+
+        The current snapshot stays in place until the new one is published.
+        """
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self._refresh_worker,
+                         name="snapshot-refresh",
+                         daemon=True).start()
+        return True
+
+    def _refresh_worker(self):
+        try:
+            with self._load_lock:
+                self._load()
+        except Exception:
+            logger.exception("Snapshot refresh failed")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _load_initial(self) -> Optional[MarketSnapshot]:
+        with self._load_lock:
+            # Another session may have loaded while we waited
+            snapshot = self._current
+            if snapshot is not None:
+                return snapshot
+            return self._load() or self._restore()
+
+    def _load(self) -> Optional[MarketSnapshot]:
+        # Caller holds _load_lock
+        result = self.loader()
+        self.last_errors = result.errors
+        if not result.ok:
+            return self._current
+        snapshot = self.publish(result.frame)
+        self._persist(result.frame)
+        return snapshot
+
+    def _persist(self, frame: pd.DataFrame):
+        if not self.persist_path:
+            return
+        partial = f"{self.persist_path}.partial"
+        try:
+            write_snapshot(frame, partial, 'parquet')
+            # Atomic replace: a crash mid-write never leaves a torn file
+            os.replace(partial, self.persist_path)
+        except Exception:
+            logger.exception("Could not persist the market snapshot")
+
+    def _restore(self) -> Optional[MarketSnapshot]:
+        """
+        Publish the on-disk last known good frame as a stale snapshot
+        """
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return None
+        try:
+            frame = pd.read_parquet(self.persist_path)
+            # The file's age is wall time; carry it over to the store's clock
+            file_age = max(time.time() - os.path.getmtime(self.persist_path), 0)
+            saved_at = self.clock.now() - timedelta(seconds=file_age)
+        except Exception:
+            logger.exception("Could not restore the persisted market snapshot")
+            return None
+        logger.warning(f"Serving the last known good snapshot from {saved_at}")
+        return self.publish(frame, created_at=saved_at, stale=True)
@@ -0,0 +1,446 @@
+"""
+Streaming price ingestion
+Tick sources push individual price updates between the periodic quotes/latest
+refreshes; an ingestor thread coalesces them into batches (the newest tick per token
+wins) and applies each batch to the shared snapshot as a new version that replaces
+only the columns ticks change. A source is any object with read(timeout), close()
+and exhausted: a replay of a recorded tick log or of backfilled history, or a tail
+of a JSON lines file another process appends to
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import tracer
+from pipeline import market_metrics
+from schema import float_values
+
+logger = logging.getLogger(__name__)
+
+# Where streamed prices come from: "replay:ticks.jsonl", "replay:history/" (a
+# backfill directory) or "tail:ticks.jsonl"; empty disables streaming
+DEFAULT_STREAM_SOURCE = os.getenv("PRICE_STREAM", "")
+# Replay pace relative to the recorded timestamps; 0 replays without pauses
+DEFAULT_REPLAY_SPEED = float(os.getenv("PRICE_STREAM_SPEED", "1"))
+# Ticks within this many seconds of the last applied batch join the next one
+DEFAULT_BATCH_INTERVAL = float(os.getenv("STREAM_BATCH_SECONDS", "0.25"))
+
+PERCENT_CHANGE_COLUMNS = [
+    'percent_change_1h', 'percent_change_24h', 'percent_change_7d'
+]
+
+# How long an idle ingestor waits on its source before checking for stop
+IDLE_READ_TIMEOUT = 0.5
+
+
+def utc_now() -> datetime:
+    """Naive UTC, like the snapshot's last_updated"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_time(value) -> datetime:
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return timestamp.to_pydatetime()
+
+
+def _optional_float(value) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+@dataclass(frozen=True)
+class Tick:
+    """One price update for one token; fields left out keep the snapshot's value"""
+    symbol: str
+    price: float
+    # Naive UTC
+    timestamp: datetime
+    volume_24h: Optional[float] = None
+    market_cap: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, record: Dict) -> 'Tick':
+        """
+        {symbol, price, timestamp?, volume_24h?, market_cap?}; ISO timestamps
+        without an offset are UTC, a missing one is now
+        """
+        timestamp = record.get('timestamp')
+        return cls(symbol=str(record['symbol']),
+                   price=float(record['price']),
+                   timestamp=_parse_time(timestamp) if timestamp else utc_now(),
+                   volume_24h=_optional_float(record.get('volume_24h')),
+                   market_cap=_optional_float(record.get('market_cap')))
+
+    def to_dict(self) -> Dict:
+        record = {'symbol': self.symbol, 'price': self.price,
+                  'timestamp': f"{self.timestamp.isoformat()}Z"}
+        if self.volume_24h is not None:
+            record['volume_24h'] = self.volume_24h
+        if self.market_cap is not None:
+            record['market_cap'] = self.market_cap
+        return record
+
+    def merge(self, newer: 'Tick') -> 'Tick':
+        """
+        newer, with the optional fields it leaves out taken from this tick
+        """
+        return replace(newer,
+                       volume_24h=(newer.volume_24h if newer.volume_24h is not None
+                                   else self.volume_24h),
+                       market_cap=(newer.market_cap if newer.market_cap is not None
+                                   else self.market_cap))
+
+
+def coalesce(pending: Dict[str, Tick], ticks: Iterable[Tick]) -> Dict[str, Tick]:
+    """
+    Fold ticks into pending, one merged tick per symbol; returns pending
+    """
+    for tick in ticks:
+        previous = pending.get(tick.symbol)
+        pending[tick.symbol] = tick if previous is None else previous.merge(tick)
+    return pending
+
+
+def parse_tick_lines(lines: Iterable[str], source: str = '') -> Iterator[Tick]:
+    """
+    Ticks from JSON lines; blank and malformed lines are skipped with a warning
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield Tick.from_dict(json.loads(line))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Skipping malformed tick in {source or 'stream'}: {e}")
+
+
+def apply_ticks(snapshot, ticks: Iterable[Tick]) -> Dict[str, np.ndarray]:
+    """
+    Replacement columns for one batch of ticks, for SnapshotStore.update
+
+    Market cap moves with price unless a tick carries its own (circulating
+    supply is unchanged between refreshes), the percent changes keep their
+    reference prices, and the price-driven metrics are recomputed for the
+    ticked rows only. Ticks for tokens outside the snapshot, or older than a
+    row's last_updated, are dropped.
+    """
+    ticks = list(ticks)
+    frame = snapshot.frame
+    rows = snapshot.index.lookup(tick.symbol for tick in ticks)
+    timestamps = np.array([tick.timestamp for tick in ticks],
+                          dtype='datetime64[ms]')
+    keep = rows >= 0
+    if 'last_updated' in frame.columns:
+        last_updated = frame['last_updated'].to_numpy()
+        keep[keep] = ~(timestamps[keep] < last_updated[rows[keep]])
+    if not keep.any():
+        return {}
+    rows, timestamps = rows[keep], timestamps[keep]
+    ticks = [tick for tick, kept in zip(ticks, keep) if kept]
+
+    def old(name: str) -> np.ndarray:
+        return float_values(frame[name])[rows].astype(np.float64)
+
+    def given(field: str) -> np.ndarray:
+        return np.array([np.nan if getattr(tick, field) is None else
+                         getattr(tick, field) for tick in ticks])
+
+    price = given('price')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moved = price / old('price')
+    # No usable previous price: nothing to scale from
+    moved[~np.isfinite(moved)] = np.nan
+
+    updates = {'price': price, 'last_updated': timestamps}
+    old_market_cap = old('market_cap')
+    market_cap = given('market_cap')
+    updates['market_cap'] = np.where(
+        np.isnan(market_cap),
+        np.where(np.isnan(moved), old_market_cap, old_market_cap * moved),
+        market_cap)
+    volume_24h = given('volume_24h')
+    if not np.isnan(volume_24h).all():
+        updates['volume_24h'] = np.where(np.isnan(volume_24h),
+                                         old('volume_24h'), volume_24h)
+    for name in PERCENT_CHANGE_COLUMNS:
+        if name in frame.columns:
+            change = old(name)
+            updates[name] = np.where(np.isnan(moved), change,
+                                     ((1 + change / 100) * moved - 1) * 100)
+    updates.update(
+        market_metrics(price, updates.get('volume_24h', old('volume_24h')),
+                       updates['market_cap']))
+
+    columns = {}
+    for name, values in updates.items():
+        if name in frame.columns:
+            column = frame[name].to_numpy(copy=True)
+            column[rows] = values
+            columns[name] = column
+    return columns
+
+
+class ReplaySource:
+    """
+    Replays recorded ticks in timestamp order, spaced by their recorded gaps
+    divided by speed
+
+    Ticks are stamped with the time they are replayed, so the snapshot takes
+    them as current prices whatever period they were recorded in.
+    """
+
+    def __init__(self, ticks: Iterable[Tick], speed: float = DEFAULT_REPLAY_SPEED):
+        self.ticks = sorted(ticks, key=lambda tick: tick.timestamp)
+        self.speed = speed
+        self._next = 0
+        self._started: Optional[float] = None
+        if self.ticks and speed > 0:
+            origin = self.ticks[0].timestamp
+            self._offsets = np.array([
+                (tick.timestamp - origin).total_seconds() / speed
+                for tick in self.ticks
+            ])
+        else:
+            self._offsets = np.zeros(len(self.ticks))
+
+    @classmethod
+    def from_json_lines(cls, path: str,
+                        speed: float = DEFAULT_REPLAY_SPEED) -> 'ReplaySource':
+        with open(path) as f:
+            return cls(list(parse_tick_lines(f, path)), speed)
+
+    @classmethod
+    def from_history(cls,
+                     path: str,
+                     speed: float = DEFAULT_REPLAY_SPEED,
+                     symbols: Optional[List[str]] = None) -> 'ReplaySource':
+        """
+        Replay a backfill directory (see backfill.py), all symbols interleaved
+        """
+        from backfill import read_history
+
+        history = read_history(path, symbols)
+        timestamps = history['timestamp'].dt.tz_convert('UTC').dt.tz_localize(None)
+        return cls((Tick(symbol=symbol,
+                         price=float(price),
+                         timestamp=timestamp.to_pydatetime(),
+                         volume_24h=_optional_float(volume),
+                         market_cap=_optional_float(market_cap))
+                    for symbol, price, timestamp, volume, market_cap in zip(
+                        history['symbol'], history['price'], timestamps,
+                        history['volume_24h'], history['market_cap'])
+                    if not pd.isna(price)), speed)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._next >= len(self.ticks)
+
+    def read(self, timeout: float) -> List[Tick]:
+        """
+        Ticks now due, waiting up to timeout for the next one
+        """
+        if self.exhausted:
+            return []
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        wait = self._started + self._offsets[self._next] - now
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+        elapsed = time.monotonic() - self._started
+        end = int(np.searchsorted(self._offsets, elapsed, 'right'))
+        due = self.ticks[self._next:end]
+        self._next = max(end, self._next)
+        stamp = utc_now()
+        return [replace(tick, timestamp=stamp) for tick in due]
+
+    def close(self):
+        self._next = len(self.ticks)
+
+
+class TailSource:
+    """
+    Follows a JSON lines file of ticks as another process appends to it
+
+    Starts at the current end of the file unless from_start; a truncated or
+    replaced file is read again from its beginning. The file may not exist yet.
+    """
+
+    def __init__(self, path: str, from_start: bool = False,
+                 poll_interval: float = 0.05):
+        self.path = path
+        self.from_start = from_start
+        self.poll_interval = poll_interval
+        self._file = None
+        self._inode: Optional[int] = None
+        self._partial = b''
+
+    # A tail never runs out; it waits for more lines
+    exhausted = False
+
+    def _open(self) -> bool:
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            # Everything in a file created after we started is new
+            self.from_start = True
+            return False
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        if not self.from_start:
+            self._file.seek(0, os.SEEK_END)
+        # Anything written after the first open is new
+        self.from_start = True
+        self._partial = b''
+        return True
+
+    def _rotated(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return stat.st_ino != self._inode or stat.st_size < self._file.tell()
+
+    def _read_available(self) -> List[Tick]:
+        if self._file is None and not self._open():
+            return []
+        if self._rotated():
+            self._file.close()
+            if not self._open():
+                return []
+        data = self._partial + self._file.read()
+        lines = data.split(b'\n')
+        # The last piece is an incomplete line until its newline arrives
+        self._partial = lines.pop()
+        return list(parse_tick_lines((line.decode('utf-8', 'replace')
+                                      for line in lines), self.path))
+
+    def read(self, timeout: float) -> List[Tick]:
+        """
+        Ticks appended since the last read, waiting up to timeout for some
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            ticks = self._read_available()
+            remaining = deadline - time.monotonic()
+            if ticks or remaining <= 0:
+                return ticks
+            time.sleep(min(self.poll_interval, remaining))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_source(spec: str, speed: float = DEFAULT_REPLAY_SPEED):
+    """
+    A tick source from a "replay:PATH" or "tail:PATH" spec; a replay PATH is a
+    JSON lines tick log or a backfill directory
+    """
+    kind, separator, path = spec.partition(':')
+    if not separator or not path or kind not in ('replay', 'tail'):
+        raise ValueError(f"Unsupported price stream: {spec!r} "
+                         "(expected replay:PATH or tail:PATH)")
+    if kind == 'tail':
+        return TailSource(path)
+    if os.path.isdir(path):
+        return ReplaySource.from_history(path, speed)
+    return ReplaySource.from_json_lines(path, speed)
+
+
+class StreamIngestor:
+    """
+    Background thread that applies ticks from a source to a SnapshotStore
+
+    The first tick after a quiet period is applied at once; ticks arriving
+    within batch_interval of the last applied batch are coalesced into the next,
+    which bounds snapshot versions to one per interval under any tick rate.
+    Ticks read before the first snapshot is loaded are dropped.
+    """
+
+    def __init__(self, source, store,
+                 batch_interval: float = DEFAULT_BATCH_INTERVAL):
+        self.source = source
+        self.store = store
+        self.batch_interval = batch_interval
+        self.ticks_received = 0
+        self.batches_applied = 0
+        self.last_applied_at: Optional[datetime] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> 'StreamIngestor':
+        if not self.running:
+            self._thread = threading.Thread(target=self._run,
+                                            name="price-stream",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def apply(self, ticks: Iterable[Tick]):
+        """
+        Apply one batch of ticks; returns the published snapshot, if any
+        """
+        batch = list(ticks)
+        with tracer.span('stream.apply'):
+            snapshot = self.store.update(lambda current: apply_ticks(current, batch))
+        if snapshot is not None:
+            self.batches_applied += 1
+            self.last_applied_at = self.store.clock.now()
+        return snapshot
+
+    def _run(self):
+        pending: Dict[str, Tick] = {}
+        # When the oldest pending tick arrived, and the last batch was applied
+        first_pending = 0.0
+        last_applied = float('-inf')
+        try:
+            while not self._stop.is_set():
+                if pending:
+                    timeout = max(last_applied + self.batch_interval -
+                                  time.monotonic(), 0)
+                else:
+                    timeout = IDLE_READ_TIMEOUT
+                try:
+                    ticks = self.source.read(timeout)
+                except Exception:
+                    logger.exception("Price stream read failed")
+                    self._stop.wait(1)
+                    continue
+                if ticks:
+                    if not pending:
+                        first_pending = time.monotonic()
+                    self.ticks_received += len(ticks)
+                    tracer.inc('stream_ticks_total', len(ticks))
+                    coalesce(pending, ticks)
+                if pending and (time.monotonic() - last_applied >=
+                                self.batch_interval):
+                    try:
+                        self.apply(pending.values())
+                    except Exception:
+                        logger.exception("Applying streamed prices failed")
+                    tracer.observe('stream_batch_delay_seconds',
+                                   time.monotonic() - first_pending)
+                    pending = {}
+                    last_applied = time.monotonic()
+                elif not pending and self.source.exhausted:
+                    logger.info("Price stream ended")
+                    break
+        finally:
+            self.source.close()
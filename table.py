@@ -0,0 +1,103 @@
+"""
+Project Details table preparation: server-side sorting, paging and display formatting
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from currency import BASE_CURRENCY, DisplayCurrency
+from filters import FilterView
+from instrumentation import tracer
+from utils import format_number
+
+DISPLAY_COLUMNS = [
+    'name', 'symbol', 'category', 'price', 'market_cap', 'volume_24h',
+    'revenue_per_user', 'token_velocity', 'burn_rate_estimate',
+    'mcap_dau_ratio', 'percent_change_24h', 'circulating_supply'
+]
+
+
+def format_display_frame(
+        frame: pd.DataFrame,
+        currency: DisplayCurrency = BASE_CURRENCY) -> pd.DataFrame:
+    """
+    Select the display columns and format values as strings for the table
+
+    Money columns are converted from USD into currency first.
+    """
+    display_df = currency.convert_frame(frame[DISPLAY_COLUMNS].copy())
+    symbol = currency.symbol
+    price_decimals = currency.price_decimals
+    amount_decimals = currency.amount_decimals
+
+    display_df['price'] = display_df['price'].apply(
+        lambda x: f"{symbol}{x:.{price_decimals}f}" if pd.notnull(x) else "N/A")
+    display_df['market_cap'] = display_df['market_cap'].apply(
+        lambda x: f"{symbol}{format_number(float(x))}" if pd.notnull(x) else "N/A")
+    display_df['volume_24h'] = display_df['volume_24h'].apply(
+        lambda x: f"{symbol}{format_number(float(x))}" if pd.notnull(x) else "N/A")
+    display_df['revenue_per_user'] = display_df['revenue_per_user'].apply(
+        lambda x: f"{symbol}{x:.{amount_decimals}f}"
+        if pd.notnull(x) and x > 0 else "N/A")
+    display_df['token_velocity'] = display_df['token_velocity'].apply(
+        lambda x: f"{x:.4f}" if pd.notnull(x) and x > 0 else "N/A")
+    display_df['burn_rate_estimate'] = display_df['burn_rate_estimate'].apply(
+        lambda x: f"{x:.2f}%" if pd.notnull(x) and x > 0 else "N/A")
+    display_df['mcap_dau_ratio'] = display_df['mcap_dau_ratio'].apply(
+        lambda x: f"{symbol}{format_number(float(x))}"
+        if pd.notnull(x) and x > 0 else "N/A")
+    display_df['percent_change_24h'] = display_df['percent_change_24h'].apply(
+        lambda x: f"{x:.2f}%" if pd.notnull(x) else "N/A")
+    display_df['circulating_supply'] = display_df['circulating_supply'].apply(
+        lambda x: format_number(float(x)) if pd.notnull(x) else "N/A")
+
+    return display_df
+
+
+def sort_positions(view: FilterView,
+                   sort_by: Optional[str],
+                   descending: bool = True) -> np.ndarray:
+    """
+    Return positions of the selected rows in table order
+
+    Ranked metrics reuse the snapshot's precomputed sort order; other columns
+    are sorted over the selected rows only.
+    """
+    if sort_by is None:
+        return view.positions
+    ranks = view.index.ranks
+    if sort_by in ranks:
+        return ranks.sorted_positions(sort_by, view.mask, descending)
+
+    column = view.column(sort_by).reset_index(drop=True)
+    order = column.sort_values(ascending=not descending,
+                               kind='stable',
+                               na_position='last').index.to_numpy()
+    return view.positions[order]
+
+
+def get_table_page(view: FilterView,
+                   sort_by: Optional[str] = None,
+                   descending: bool = True,
+                   page: int = 1,
+                   page_size: int = 50,
+                   currency: DisplayCurrency = BASE_CURRENCY
+                   ) -> Tuple[pd.DataFrame, int]:
+    """
+    Sort and slice the selected rows server-side and format only the visible page
+
+    Returns the formatted page and the total number of selected rows. Sorting
+    uses the USD ranks; converting by a positive rate keeps the order.
+    """
+    with tracer.span('table.sort'):
+        positions = sort_positions(view, sort_by, descending)
+    total_rows = len(positions)
+
+    start = max(page - 1, 0) * page_size
+    page_positions = positions[start:start + page_size]
+    frame = view.index.frame
+    page_df = frame.iloc[page_positions,
+                         frame.columns.get_indexer(DISPLAY_COLUMNS)]
+    with tracer.span('table.format'):
+        return format_display_frame(page_df, currency), total_rows
@@ -187,7 +187,7 @@ def calculate_sharpe_ratio(returns: List[float], risk_free_rate: float = 0.02) -
     Calculate Sharpe ratio for risk-adjusted returns
     """
     try:
-        if not returns or len(returns) < 2:
+        if returns is None or len(returns) < 2:
             return 0.0
         
         mean_return = np.mean(returns)
@@ -260,3 +260,69 @@ def categorize_project_stage(market_cap: float, velocity: float, revenue_per_use
                 return "Legacy"
     except (TypeError, ValueError):
         return "Unknown"
+
+# Batch (array) forms of the metric functions above. Each takes NumPy arrays or
+# pandas Series and returns a float64 array with the same values the scalar
+# function gives row by row; missing (NaN) inputs yield 0.0 like None does there.
+
+def _as_float_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+def calculate_metrics_batch(market_cap, volume_24h, price) -> np.ndarray:
+    """
+    Revenue per user approximation for whole columns, see calculate_metrics
+    """
+    market_cap = _as_float_array(market_cap)
+    volume_24h = _as_float_array(volume_24h)
+    price = _as_float_array(price)
+    valid = (market_cap > 0) & (volume_24h > 0) & (price > 0)
+    
+    result = np.zeros(valid.shape)
+    estimated_transactions = volume_24h[valid] / (price[valid] * 5)
+    estimated_dau = np.maximum(1, estimated_transactions / 3)
+    result[valid] = (volume_24h[valid] * 0.003) / estimated_dau
+    return result
+
+def calculate_token_velocity_batch(volume_24h, market_cap) -> np.ndarray:
+    """
+    Token velocity (Volume / Market Cap) for whole columns
+    """
+    volume_24h = _as_float_array(volume_24h)
+    market_cap = _as_float_array(market_cap)
+    valid = market_cap > 0
+    
+    result = np.zeros(valid.shape)
+    result[valid] = volume_24h[valid] / market_cap[valid]
+    return np.nan_to_num(result, nan=0.0)
+
+def calculate_burn_rate_estimate_batch(total_supply, max_supply) -> np.ndarray:
+    """
+    Burn rate estimate for whole columns, see calculate_burn_rate_estimate
+    """
+    total_supply = _as_float_array(total_supply)
+    max_supply = _as_float_array(max_supply)
+    valid = (max_supply > 0) & (total_supply != 0) & ~np.isnan(total_supply)
+    
+    result = np.zeros(valid.shape)
+    burn_estimate = ((max_supply[valid] - total_supply[valid]) /
+                     max_supply[valid]) * 100
+    result[valid] = np.maximum(0, burn_estimate)
+    return result
+
+def calculate_market_cap_to_dau_ratio_batch(market_cap, volume_24h, price) -> np.ndarray:
+    """
+    Market Cap to Daily Active Users ratio for whole columns
+    """
+    market_cap = _as_float_array(market_cap)
+    volume_24h = _as_float_array(volume_24h)
+    price = _as_float_array(price)
+    valid = (price > 0) & (volume_24h > 0)
+    
+    result = np.zeros(valid.shape)
+    estimated_daily_transactions = volume_24h[valid] / (price[valid] * 10)
+    estimated_dau = estimated_daily_transactions / 5
+    ratio = np.zeros(estimated_dau.shape)
+    positive = estimated_dau > 0
+    ratio[positive] = market_cap[valid][positive] / estimated_dau[positive]
+    result[valid] = ratio
+    return np.nan_to_num(result, nan=0.0)